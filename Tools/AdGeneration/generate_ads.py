@@ -12,26 +12,42 @@ Usage:
     python generate_ads.py prompts          # Print Suno prompts for all jingle ads
     python generate_ads.py prompts <id>     # Print prompt for specific ad
     python generate_ads.py process          # Process downloaded MP3s to OGG
+    python generate_ads.py process -j 4     # ...with 4 ffmpeg workers (default: CPU count)
+    python generate_ads.py process --rebuild    # Re-encode even up-to-date outputs
+    python generate_ads.py process --profile    # Where the time goes (hash, loudness, ffmpeg, disk)
     python generate_ads.py status           # Show which ads have audio
 """
 
+import argparse
 import json
 import os
 import sys
-import subprocess
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.ffmpeg import FFmpegResult, run_ffmpeg
+from common import metrics, process_downloads, profiling
+from common.loudness import gain_filter
+from common.paths import AD_AUDIO_DIR
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 ADS_DIR = SCRIPT_DIR / "ads"
 DOWNLOADS_DIR = SCRIPT_DIR / "downloads"
-OUTPUT_DIR = SCRIPT_DIR.parent.parent / "kbtv" / "Assets" / "Audio" / "Ads"
+OUTPUT_DIR = AD_AUDIO_DIR
+LOUDNESS_CACHE = SCRIPT_DIR / ".loudness_cache.json"
+BUILD_MANIFEST = SCRIPT_DIR / ".build_manifest.json"
 
 # Audio settings
 TARGET_SAMPLE_RATE = 44100
 TARGET_CHANNELS = 2
 TARGET_FORMAT = "ogg"
 NORMALIZE_LUFS = -16  # Broadcast standard
+TRUE_PEAK_DBTP = -1.5
+VORBIS_QUALITY = 6  # Quality level (0-10, 6 is good)
+
+ENCODE_SETTINGS = process_downloads.encode_settings(TARGET_SAMPLE_RATE, TARGET_CHANNELS, VORBIS_QUALITY,
+                                                    NORMALIZE_LUFS, TRUE_PEAK_DBTP, TARGET_FORMAT)
 
 
 def load_ad(ad_id: str) -> dict:
@@ -39,7 +55,7 @@ def load_ad(ad_id: str) -> dict:
     path = ADS_DIR / f"{ad_id}.json"
     if not path.exists():
         raise FileNotFoundError(f"Ad not found: {ad_id}")
-    with open(path, "r", encoding="utf-8") as f:
+    with profiling.stage("json_load"), open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
@@ -47,7 +63,7 @@ def load_all_ads() -> list:
     """Load all ad JSON files."""
     ads = []
     for path in sorted(ADS_DIR.glob("*.json")):
-        with open(path, "r", encoding="utf-8") as f:
+        with profiling.stage("json_load"), open(path, "r", encoding="utf-8") as f:
             ads.append(json.load(f))
     return ads
 
@@ -95,52 +111,27 @@ def cmd_prompts(ad_id: str = None):
             print_suno_prompt(ad)
 
 
-def check_ffmpeg() -> bool:
-    """Check if ffmpeg is available."""
-    try:
-        subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
-
-
-def process_audio_file(input_path: Path, output_path: Path):
-    """Convert and normalize an audio file using ffmpeg."""
-    # Ensure output directory exists
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # ffmpeg command: normalize to -16 LUFS, convert to OGG
+def encode_ogg(input_path: Path, output_path: Path, gain_db: float, label: str) -> FFmpegResult:
+    """Apply the normalization gain and convert to OGG in one ffmpeg pass."""
     # -vn: strip any video/image streams (like album art)
     # -map_metadata -1: strip all metadata to avoid issues
-    cmd = [
-        "ffmpeg", "-y",
+    args = [
+        "-y",
         "-i", str(input_path),
         "-vn",  # No video - strip album art
         "-map_metadata", "-1",  # Strip all metadata
-        "-af", f"loudnorm=I={NORMALIZE_LUFS}:TP=-1.5:LRA=11",
+        "-af", gain_filter(gain_db),
         "-ar", str(TARGET_SAMPLE_RATE),
         "-ac", str(TARGET_CHANNELS),
         "-c:a", "libvorbis",
-        "-q:a", "6",  # Quality level (0-10, 6 is good)
+        "-q:a", str(VORBIS_QUALITY),
         str(output_path)
     ]
-    
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"  Error: {result.stderr}")
-        return False
-    return True
-
-
-def cmd_process():
-    """Process downloaded MP3s to OGG format."""
-    if not check_ffmpeg():
-        print("Error: ffmpeg not found. Install ffmpeg first.")
-        print("  Windows: choco install ffmpeg")
-        print("  Mac: brew install ffmpeg")
-        print("  Linux: sudo apt install ffmpeg")
-        return
-    
+    return run_ffmpeg(args, label)
+
+
+def cmd_process(jobs: int = None, rebuild: bool = False):
+    """Process downloaded MP3s to OGG format (see common/process_downloads.py)."""
     # Create downloads folder if it doesn't exist
     DOWNLOADS_DIR.mkdir(exist_ok=True)
     
@@ -156,43 +147,35 @@ def cmd_process():
         print("  etc.")
         return
     
-    print(f"Found {len(audio_files)} audio files to process")
+    print(f"Found {len(audio_files)} audio files")
     print(f"Output directory: {OUTPUT_DIR}")
     print()
     
     # Load all ad IDs for validation
     valid_ids = {ad["id"] for ad in load_all_ads()}
     
-    processed = 0
+    tasks = []
     for audio_file in audio_files:
         # Parse filename: {ad_id}_v{n}.mp3
         name = audio_file.stem  # e.g., "big_earls_auto_v1"
-        
-        # Extract ad_id (everything before _v{n})
-        parts = name.rsplit("_v", 1)
-        if len(parts) != 2:
+        take = process_downloads.split_take_name(name)
+        if take is None:
             print(f"  Skipping {audio_file.name} (invalid format, expected {'{ad_id}'}_v{'{n}'}.mp3)")
             continue
         
-        ad_id = parts[0]
+        ad_id = take[0]
         if ad_id not in valid_ids:
             print(f"  Skipping {audio_file.name} (unknown ad_id: {ad_id})")
             continue
         
         # Output path: Assets/Audio/Ads/{ad_id}/{ad_id}_v{n}.ogg
         output_path = OUTPUT_DIR / ad_id / f"{name}.{TARGET_FORMAT}"
-        
-        print(f"  Processing: {audio_file.name} -> {ad_id}/{name}.{TARGET_FORMAT}")
-        
-        if process_audio_file(audio_file, output_path):
-            processed += 1
+        tasks.append((audio_file, output_path))
     
-    print()
-    print(f"Processed {processed}/{len(audio_files)} files")
-    print()
-    print("Next steps:")
-    print("  1. Open Godot")
-    print("  2. Import the generated audio files")
+    process_downloads.process_downloads(
+        tasks, encode_ogg, ENCODE_SETTINGS, OUTPUT_DIR, BUILD_MANIFEST, LOUDNESS_CACHE,
+        (f.name for f in audio_files), DOWNLOADS_DIR, jobs, rebuild
+    )
 
 
 def cmd_status():
@@ -226,18 +209,25 @@ def main():
         print(__doc__)
         return
     
-    command = sys.argv[1].lower()
+    parser = argparse.ArgumentParser(description="Suno ad generation helper")
+    subparsers = parser.add_subparsers(dest="command")
+    prompts = subparsers.add_parser("prompts", help="Print Suno prompts for jingle ads")
+    prompts.add_argument("ad_id", nargs="?", help="Only this ad")
+    process = subparsers.add_parser("process", help="Process downloaded MP3s to OGG")
+    process_downloads.add_arguments(process)
+    profiling.add_arguments(process)
+    subparsers.add_parser("status", help="Show which ads have audio")
+    
+    args = parser.parse_args([sys.argv[1].lower()] + sys.argv[2:])
     
-    if command == "prompts":
-        ad_id = sys.argv[2] if len(sys.argv) > 2 else None
-        cmd_prompts(ad_id)
-    elif command == "process":
-        cmd_process()
-    elif command == "status":
+    if args.command == "prompts":
+        cmd_prompts(args.ad_id)
+    elif args.command == "process":
+        metrics.configure("generate_ads")
+        profiling.configure("generate_ads", args.profile, args.profile_out)
+        cmd_process(args.jobs, args.rebuild)
+    elif args.command == "status":
         cmd_status()
-    else:
-        print(f"Unknown command: {command}")
-        print(__doc__)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+audit_audio.py - Loudness and signal-health audit of the audio library
+
+Vern's ElevenLabs lines, the Suno ads and bumpers (normalized to -16 LUFS),
+music and sfx all end up in one broadcast. This decodes every file in the
+audio library (assets/audio plus the processed ad and bumper OGGs) in a
+process pool, counting a voice line once (its OGG, or the mp3 master if it
+hasn't been transcoded), and measures, with vectorized NumPy:
+
+- Integrated loudness (ITU-R BS.1770 / EBU R128: K-weighting, 400 ms blocks
+  with 75% overlap, -70 LUFS absolute and -10 LU relative gates). The
+  K-weighting filters are applied in the frequency domain, per 100 ms
+  sub-block, so no sample-by-sample IIR loop is needed.
+- True peak (4x oversampled with a windowed-sinc interpolator) and sample peak
+- Clipping ratio (share of samples at full scale)
+- DC offset (largest per-channel mean)
+- Leading and trailing silence (below -60 dBFS)
+
+Results are cached per content hash, so reruns only decode new or changed
+files. Files are flagged when they break a fixed limit (true peak, clipping,
+DC offset, long silences) or when their loudness is an outlier within their
+category (voice, ads, bumpers, music).
+
+Usage:
+    python audit_audio.py                          # Audit the library, print flagged files
+    python audit_audio.py --category ads bumpers
+    python audit_audio.py --json audit.json --csv audit.csv
+"""
+
+import csv
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.audio_headers import HeaderError, read_header
+from common.audio_library import CATEGORIES, ContentHashes, LibraryFile, library_files, played_files
+from common.decode import DecodeError, decode_audio
+
+SCRIPT_DIR = Path(__file__).parent
+CACHE_PATH = SCRIPT_DIR / ".audit_cache.json"
+HASHES_PATH = SCRIPT_DIR / ".content_hashes.json"
+
+SAMPLE_RATE = 48000     # The BS.1770 K-weighting coefficients are specified at 48 kHz
+SUB_BLOCK = 4800        # 100 ms; a 400 ms gating block is 4 sub-blocks, stepped by one
+BLOCKS_PER_CHUNK = 512  # Sub-blocks per FFT batch (bounds memory on long music)
+ABSOLUTE_GATE = -70.0   # LUFS
+RELATIVE_GATE = -10.0   # LU below the absolutely gated loudness
+OVERSAMPLE = 4          # True-peak interpolation factor
+INTERP_TAPS = 12        # Taps per interpolation phase
+CLIP_LEVEL = 0.999      # |sample| at or above this counts as clipped
+SILENCE_DB = -60.0      # dBFS peak below which a 10 ms frame is silent
+SILENCE_FRAME = 480     # 10 ms
+
+# Stored measurements are only comparable with the same parameters
+AUDIT_PARAMS = {"version": 1, "sample_rate": SAMPLE_RATE, "oversample": OVERSAMPLE,
+                "taps": INTERP_TAPS, "clip": CLIP_LEVEL, "silence_db": SILENCE_DB}
+
+# Fixed limits, checked in every category
+MAX_TRUE_PEAK = -1.0        # dBTP; the ad/bumper normalizer aims for -1.5
+MAX_CLIP_RATIO = 1e-4
+MAX_DC_OFFSET = 0.01
+# Loudness and silence are only judged where the file is meant to be heard as is
+OUTLIER_CATEGORIES = ("voice", "ads", "bumpers", "music")
+MAX_LEADING_SILENCE = 0.5   # Seconds
+MAX_TRAILING_SILENCE = 1.0
+MIN_CATEGORY_FILES = 3      # Files needed before a category median means anything
+MIN_LOUDNESS_TOLERANCE = 2.0    # LU from the category median that's always fine
+OUTLIER_SIGMAS = 3.0            # ...or this many robust standard deviations (1.4826 * MAD)
+
+# K-weighting at 48 kHz (BS.1770-4 table 1 and 2): high-shelf pre-filter, then RLB high-pass
+K_SHELF = ([1.53512485958697, -2.69169618940638, 1.19839281085285],
+           [1.0, -1.69065929318241, 0.73248077421585])
+K_HIGHPASS = ([1.0, -2.0, 1.0],
+              [1.0, -1.99004745483398, 0.99007225036621])
+
+
+def k_weighting_gain(n_fft: int) -> np.ndarray:
+    """|H(f)|^2 of the two K-weighting biquads at the rfft bins of an n_fft-point frame"""
+    z = np.exp(-1j * np.pi * np.arange(n_fft // 2 + 1) / (n_fft // 2))  # z^-1 per bin
+    gain = np.ones(len(z))
+    for b, a in (K_SHELF, K_HIGHPASS):
+        response = (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+        gain *= np.abs(response) ** 2
+    return gain.astype(np.float32)
+
+
+def integrated_loudness(samples: np.ndarray) -> Optional[float]:
+    """Gated integrated loudness in LUFS of (frames, channels) samples at 48 kHz (None if silent)"""
+    n_sub = len(samples) // SUB_BLOCK
+    if n_sub < 4:
+        return None  # Shorter than one gating block
+    gain = k_weighting_gain(SUB_BLOCK)
+    # Parseval: a frame's mean square from its one-sided spectrum (DC and Nyquist counted once)
+    weights = np.full(len(gain), 2.0, dtype=np.float32)
+    weights[0] = weights[-1] = 1.0
+    weights *= gain / float(SUB_BLOCK * SUB_BLOCK)
+
+    sub_power = np.zeros(n_sub)
+    for channel in range(samples.shape[1]):
+        frames = samples[:n_sub * SUB_BLOCK, channel].reshape(n_sub, SUB_BLOCK)
+        for start in range(0, n_sub, BLOCKS_PER_CHUNK):
+            spectrum = np.fft.rfft(frames[start:start + BLOCKS_PER_CHUNK], axis=1)
+            power = spectrum.real ** 2 + spectrum.imag ** 2
+            sub_power[start:start + BLOCKS_PER_CHUNK] += power @ weights  # L/R weights are 1
+
+    # 400 ms blocks: mean of 4 consecutive sub-blocks
+    block_power = np.convolve(sub_power, np.full(4, 0.25), mode="valid")
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(block_power)
+    gated = block_power[block_loudness > ABSOLUTE_GATE]
+    if len(gated) == 0:
+        return None
+    relative = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE
+    gated = block_power[block_loudness > max(ABSOLUTE_GATE, relative)]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+
+def interpolation_kernels() -> np.ndarray:
+    """(OVERSAMPLE - 1, INTERP_TAPS) Hann-windowed sinc kernels for the in-between phases"""
+    half = INTERP_TAPS // 2
+    k = np.arange(-half, half)
+    kernels = []
+    for phase in range(1, OVERSAMPLE):
+        t = k + phase / OVERSAMPLE
+        kernel = np.sinc(t) * (0.5 + 0.5 * np.cos(np.pi * t / half))
+        kernels.append(kernel / kernel.sum())
+    return np.array(kernels, dtype=np.float32)
+
+
+def true_peak(samples: np.ndarray) -> float:
+    """Highest absolute value of the 4x oversampled signal, linear"""
+    peak = float(np.abs(samples).max()) if samples.size else 0.0
+    if len(samples) < INTERP_TAPS:
+        return peak
+    for kernel in interpolation_kernels():
+        for channel in range(samples.shape[1]):
+            between = np.convolve(samples[:, channel], kernel, mode="valid")
+            peak = max(peak, float(np.abs(between).max()))
+    return peak
+
+
+def silence_bounds(samples: np.ndarray) -> Tuple[float, float]:
+    """(leading, trailing) seconds below SILENCE_DB"""
+    duration = len(samples) / SAMPLE_RATE
+    n_frames = len(samples) // SILENCE_FRAME
+    if n_frames == 0:
+        return duration, 0.0
+    frame_peaks = np.abs(samples[:n_frames * SILENCE_FRAME]).reshape(n_frames, -1).max(axis=1)
+    audible = np.nonzero(frame_peaks > 10 ** (SILENCE_DB / 20))[0]
+    if len(audible) == 0:
+        return duration, 0.0
+    leading = audible[0] * SILENCE_FRAME / SAMPLE_RATE
+    trailing = duration - (audible[-1] + 1) * SILENCE_FRAME / SAMPLE_RATE
+    return leading, trailing
+
+
+def to_db(value: float) -> Optional[float]:
+    return round(20 * math.log10(value), 2) if value > 0 else None
+
+
+def measure_samples(samples: np.ndarray) -> dict:
+    """All audit measurements of (frames, channels) float32 samples at 48 kHz"""
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    loudness = integrated_loudness(samples)
+    leading, trailing = silence_bounds(samples)
+    total = samples.size
+    return {
+        "duration": round(len(samples) / SAMPLE_RATE, 3),
+        "channels": samples.shape[1],
+        "loudness": round(loudness, 2) if loudness is not None else None,
+        "true_peak": to_db(true_peak(samples)),
+        "sample_peak": to_db(float(np.abs(samples).max()) if total else 0.0),
+        "clip_ratio": round(float(np.count_nonzero(np.abs(samples) >= CLIP_LEVEL)) / total, 6) if total else 0.0,
+        "dc_offset": round(float(np.abs(samples.mean(axis=0)).max()), 5) if total else 0.0,
+        "leading_silence": round(float(leading), 2),
+        "trailing_silence": round(float(trailing), 2),
+    }
+
+
+def audit_file(path: str) -> dict:
+    """Worker: decode one file at 48 kHz in its own channel layout (mono or stereo) and measure it"""
+    try:
+        channels = min(read_header(Path(path)).channels, 2) or 2
+    except HeaderError:
+        channels = 2
+    return measure_samples(decode_audio(Path(path), SAMPLE_RATE, channels=channels))
+
+
+class AuditCache:
+    """content hash -> measurements, stored as JSON"""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("params") == AUDIT_PARAMS:
+                self.entries = data.get("results", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def put(self, digest: str, entry: dict):
+        self.entries[digest] = entry
+        self._dirty = True
+
+    def prune(self, keep):
+        """Drop measurements no library file has any more"""
+        keep = set(keep)
+        for digest in [d for d in self.entries if d not in keep]:
+            del self.entries[digest]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"params": AUDIT_PARAMS, "results": self.entries}, f,
+                      separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def update_cache(files: List[LibraryFile], cache: AuditCache, hashes: ContentHashes,
+                 workers: Optional[int] = None) -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
+    """Measure files whose content isn't cached yet.
+
+    Returns (rel path -> content hash for every measured file, [(rel, error)]).
+    """
+    digests = {file.rel: hashes.hash(file) for file in files}
+    todo: Dict[str, LibraryFile] = {}
+    for file in files:
+        if digests[file.rel] not in cache.entries:
+            todo.setdefault(digests[file.rel], file)
+    print(f"Library: {len(files)} files ({len(set(digests.values()))} distinct), "
+          f"{len(todo)} to measure")
+
+    failures = []
+    if todo:
+        start = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(audit_file, str(file.path)): (digest, file)
+                       for digest, file in todo.items()}
+            for future in as_completed(futures):
+                digest, file = futures[future]
+                try:
+                    cache.put(digest, future.result())
+                except (DecodeError, OSError, ValueError) as e:
+                    failures.append((file.rel, str(e)))
+        print(f"Measured {len(todo) - len(failures)} files in {time.monotonic() - start:.1f}s")
+
+    failed = {rel for rel, _ in failures}
+    return {rel: d for rel, d in digests.items() if rel not in failed and d in cache.entries}, failures
+
+
+def category_stats(rows: List[dict]) -> Dict[str, dict]:
+    """Per category: file count, median loudness and the band outside which loudness is flagged"""
+    stats = {}
+    for category in CATEGORIES:
+        values = np.array([row["loudness"] for row in rows
+                           if row["category"] == category and row["loudness"] is not None])
+        if len(values) == 0:
+            continue
+        median = float(np.median(values))
+        spread = 1.4826 * float(np.median(np.abs(values - median)))
+        stats[category] = {
+            "files": len(values),
+            "median_loudness": round(median, 2),
+            "spread": round(spread, 2),
+            "tolerance": round(max(MIN_LOUDNESS_TOLERANCE, OUTLIER_SIGMAS * spread), 2),
+            "max_true_peak": max((row["true_peak"] for row in rows
+                                  if row["category"] == category and row["true_peak"] is not None),
+                                 default=None),
+        }
+    return stats
+
+
+def flag_row(row: dict, stats: Dict[str, dict]) -> List[str]:
+    flags = []
+    if row["true_peak"] is not None and row["true_peak"] > MAX_TRUE_PEAK:
+        flags.append(f"true peak {row['true_peak']:+.1f} dBTP")
+    if row["clip_ratio"] > MAX_CLIP_RATIO:
+        flags.append(f"clipping {row['clip_ratio'] * 100:.2f}%")
+    if row["dc_offset"] > MAX_DC_OFFSET:
+        flags.append(f"DC offset {row['dc_offset']:.3f}")
+    if row["category"] not in OUTLIER_CATEGORIES:
+        return flags
+    if row["loudness"] is None:
+        flags.append("silent")
+        return flags
+    category = stats.get(row["category"])
+    if category and category["files"] >= MIN_CATEGORY_FILES:
+        deviation = row["loudness"] - category["median_loudness"]
+        if abs(deviation) > category["tolerance"]:
+            flags.append(f"loudness {deviation:+.1f} LU from {row['category']} median")
+    if row["leading_silence"] > MAX_LEADING_SILENCE:
+        flags.append(f"leading silence {row['leading_silence']:.1f}s")
+    if row["trailing_silence"] > MAX_TRAILING_SILENCE:
+        flags.append(f"trailing silence {row['trailing_silence']:.1f}s")
+    return flags
+
+
+def build_report(files: List[LibraryFile], digests: Dict[str, str], cache: AuditCache) -> dict:
+    rows = [{"path": file.rel, "category": file.category, **cache.entries[digests[file.rel]]}
+            for file in files if file.rel in digests]
+    stats = category_stats(rows)
+    for row in rows:
+        row["flags"] = flag_row(row, stats)
+    return {"categories": stats, "files": rows}
+
+
+def print_report(report: dict, limit: int = 30):
+    print()
+    print(f"{'Category':<10}{'Files':>7}{'Median':>10}{'Spread':>9}{'Max TP':>9}")
+    for category, stats in report["categories"].items():
+        max_tp = f"{stats['max_true_peak']:+.1f}" if stats["max_true_peak"] is not None else "-"
+        print(f"{category:<10}{stats['files']:>7}{stats['median_loudness']:>10.1f}"
+              f"{stats['spread']:>9.1f}{max_tp:>9}")
+    print("(median loudness in LUFS, spread in LU, max true peak in dBTP)")
+
+    flagged = [row for row in report["files"] if row["flags"]]
+    print()
+    print(f"Flagged: {len(flagged)} of {len(report['files'])} files")
+    for row in flagged[:limit]:
+        loudness = f"{row['loudness']:.1f} LUFS" if row["loudness"] is not None else "silent"
+        print(f"  {row['path']}  ({loudness})")
+        print(f"      {'; '.join(row['flags'])}")
+    if len(flagged) > limit:
+        print(f"  ... {len(flagged) - limit} more (see --json/--csv)")
+
+
+CSV_COLUMNS = ["path", "category", "duration", "channels", "loudness", "true_peak", "sample_peak",
+               "clip_ratio", "dc_offset", "leading_silence", "trailing_silence", "flags"]
+
+
+def write_csv(report: dict, csv_path: Path):
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for row in report["files"]:
+            writer.writerow({**row, "flags": "; ".join(row["flags"])})
+
+
+def audit_audio(categories: Optional[List[str]] = None, workers: Optional[int] = None,
+                json_path: Optional[Path] = None, csv_path: Optional[Path] = None,
+                limit: int = 30) -> dict:
+    # Audit what the game plays: a voice line's transcoded OGG, its mp3 master only as a fallback
+    files = played_files(library_files())
+    if categories:
+        files = [file for file in files if file.category in categories]
+    cache = AuditCache()
+    hashes = ContentHashes(HASHES_PATH)
+    try:
+        digests, failures = update_cache(files, cache, hashes, workers)
+        if not categories:
+            # Only a full scan knows which files are gone
+            hashes.prune(file.rel for file in files)
+            cache.prune(digests.values())
+    finally:
+        hashes.save()
+        cache.save()
+
+    report = build_report(files, digests, cache)
+    report["failed"] = [{"path": rel, "error": error} for rel, error in failures]
+    print_report(report, limit)
+    if failures:
+        print()
+        print(f"Failed to decode {len(failures)} files:")
+        for rel, error in failures:
+            print(f"  {rel}: {error.splitlines()[-1] if error else 'unknown error'}")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {json_path}")
+    if csv_path:
+        write_csv(report, csv_path)
+        print(f"Table written to {csv_path}")
+    return report
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Audit loudness and signal health of the audio library")
+    parser.add_argument("--category", nargs="*", choices=CATEGORIES,
+                        help="Only these library categories (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="Decoder processes (default: CPU count)")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Also write the full report as JSON")
+    parser.add_argument("--csv", type=Path, metavar="FILE", help="Also write one row per file as CSV")
+    parser.add_argument("--limit", type=int, default=30, help="Flagged files printed (default: 30)")
+    args = parser.parse_args()
+
+    audit_audio(args.category, args.workers, args.json, args.csv, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+fingerprint_audio.py - Find redundant takes and near-identical lines
+
+Fingerprints every file in the audio library (assets/audio plus the processed
+ad and bumper OGGs) and reports clusters of exact and near duplicates, e.g.
+two Suno takes of the same ad, or a voice line whose mood variants came out
+the same, so the redundant ones can be dropped from the build.
+
+Each file is decoded to mono 11.025 kHz and split into 186 ms frames every
+5.8 ms; the small hop keeps two copies that start a few milliseconds apart
+within a fraction of a frame of each other, so their bits still agree.
+One vectorized FFT pass gives each frame's energy in 33 log-spaced bands
+(300-3000 Hz). A frame's 32-bit sub-fingerprint has one bit per pair of
+adjacent bands: whether the energy difference between them rose or fell
+since the previous frame. That survives gain changes, re-encoding and
+resampling. Two files are near duplicates when their fingerprints, aligned
+within a few frames, differ in at most --threshold of their bits (bit error
+rate). Candidate pairs are first narrowed by duration and by the cosine
+similarity of their average band spectrum, so only plausible pairs are
+compared bit by bit.
+
+Fingerprints are stored in an index keyed by content hash, so reruns only
+decode new or changed files.
+
+Usage:
+    python fingerprint_audio.py                     # Update the index, report clusters
+    python fingerprint_audio.py --threshold 0.15    # Stricter near-duplicate match
+    python fingerprint_audio.py --category ads bumpers
+    python fingerprint_audio.py --json clusters.json
+"""
+
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.audio_library import CATEGORIES, ContentHashes, LibraryFile, library_files, played_files
+from common.decode import DecodeError, decode_audio
+
+SCRIPT_DIR = Path(__file__).parent
+INDEX_PATH = SCRIPT_DIR / ".fingerprint_index.json"
+HASHES_PATH = SCRIPT_DIR / ".content_hashes.json"
+
+SAMPLE_RATE = 11025
+FRAME_SIZE = 2048       # ~186 ms
+HOP_SIZE = FRAME_SIZE // 32  # ~5.8 ms between sub-fingerprints, so any offset is within 1/64 frame
+BAND_EDGES_HZ = np.geomspace(300.0, 3000.0, 34)  # 33 bands -> 32 bits per frame
+FRAMES_PER_CHUNK = 1024  # Frames per FFT batch (bounds memory on long music)
+
+# Stored fingerprints are only comparable with the same parameters
+FINGERPRINT_PARAMS = {"version": 2, "sample_rate": SAMPLE_RATE, "frame": FRAME_SIZE,
+                      "hop": HOP_SIZE, "bands": len(BAND_EDGES_HZ) - 1}
+
+DEFAULT_THRESHOLD = 0.20   # Bit error rate at or below which two files match
+MAX_SHIFT = FRAME_SIZE // HOP_SIZE  # Frames of misalignment tried (~186 ms either way)
+COARSE_STEP = 4            # Offsets first tried every 4 frames, then refined around the best
+POPCOUNT = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)  # Set bits per uint16
+MIN_PROFILE_SIMILARITY = 0.80
+MAX_DURATION_RATIO = 1.25
+BLOCK = 512                # Rows per block of the candidate similarity matrix
+
+
+def band_matrix() -> np.ndarray:
+    """(FFT bins, bands) 0/1 matrix summing power spectrum bins into bands"""
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1.0 / SAMPLE_RATE)
+    lower, upper = BAND_EDGES_HZ[:-1], BAND_EDGES_HZ[1:]
+    return ((freqs[:, None] >= lower) & (freqs[:, None] < upper)).astype(np.float32)
+
+
+def fingerprint_samples(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(uint32 sub-fingerprint per frame, normalized mean log-band profile)"""
+    if len(samples) < FRAME_SIZE:
+        samples = np.pad(samples, (0, FRAME_SIZE - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]  # A view
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    bands = band_matrix()
+    energies = np.empty((len(frames), bands.shape[1]), dtype=np.float32)  # (frames, 33)
+    for start in range(0, len(frames), FRAMES_PER_CHUNK):
+        spectrum = np.fft.rfft(frames[start:start + FRAMES_PER_CHUNK] * window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        energies[start:start + FRAMES_PER_CHUNK] = power.astype(np.float32) @ bands
+
+    band_diff = energies[:, :-1] - energies[:, 1:]                   # (frames, 32)
+    bits = (band_diff[1:] - band_diff[:-1]) > 0                      # (frames - 1, 32)
+    if len(bits) == 0:
+        bits = np.zeros((1, 32), dtype=bool)
+    packed = np.packbits(bits, axis=1, bitorder="little")            # (frames - 1, 4) bytes
+    words = np.ascontiguousarray(packed).view("<u4").ravel()
+
+    # Gain-independent spectral shape: mean log energy per band, centered and unit length
+    profile = np.log10(energies + 1e-10).mean(axis=0)
+    profile -= profile.mean()
+    norm = np.linalg.norm(profile)
+    return words, (profile / norm if norm > 1e-6 else np.zeros_like(profile))
+
+
+def fingerprint_file(path: str) -> dict:
+    """Worker: decode one file and fingerprint it"""
+    samples = decode_audio(Path(path), SAMPLE_RATE, channels=1)
+    words, profile = fingerprint_samples(samples)
+    return {
+        "duration": round(len(samples) / SAMPLE_RATE, 3),
+        "profile": [round(float(v), 4) for v in profile],
+        "bits": base64.b64encode(words.astype("<u4").tobytes()).decode("ascii"),
+    }
+
+
+def decode_bits(entry: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(entry["bits"]), dtype="<u4")
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray, max_shift: int = MAX_SHIFT) -> float:
+    """Lowest fraction of differing bits over the overlap, for offsets up to max_shift
+
+    `b` is zero-padded by max_shift words on each side and viewed as one row
+    per offset, lined up against `a` (the padding is masked out of each row's
+    overlap). Every COARSE_STEP-th offset is compared first, then the offsets
+    around the best of those; neighbouring offsets overlap by 31/32 of a frame,
+    so the coarse minimum is already within a couple of frames of the true one.
+    """
+    if len(a) == 0 or len(b) == 0:
+        return 1.0
+    tail = max(0, len(a) + max_shift - len(b))
+    padded = np.concatenate([np.zeros(max_shift, np.uint32), b, np.zeros(tail, np.uint32)])
+    present = np.concatenate([np.zeros(max_shift, bool), np.ones(len(b), bool), np.zeros(tail, bool)])
+    aligned = np.lib.stride_tricks.sliding_window_view(padded, len(a))
+    overlap = np.lib.stride_tricks.sliding_window_view(present, len(a))
+
+    def rates(rows: np.ndarray) -> np.ndarray:
+        differing = np.where(overlap[rows], np.bitwise_xor(aligned[rows], a), 0)
+        bits = POPCOUNT[differing.view(np.uint16)].sum(axis=1, dtype=np.int64)
+        n = overlap[rows].sum(axis=1)
+        return np.where(n > 0, bits / (32.0 * np.maximum(n, 1)), 1.0)
+
+    coarse = np.arange(0, 2 * max_shift + 1, COARSE_STEP)
+    best = int(coarse[np.argmin(rates(coarse))])
+    fine = np.arange(max(0, best - COARSE_STEP + 1), min(2 * max_shift, best + COARSE_STEP - 1) + 1)
+    return float(rates(fine).min())
+
+
+class FingerprintIndex:
+    """content hash -> fingerprint, stored as JSON"""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("params") == FINGERPRINT_PARAMS:
+                self.entries = data.get("fingerprints", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def put(self, digest: str, entry: dict):
+        self.entries[digest] = entry
+        self._dirty = True
+
+    def prune(self, keep):
+        """Drop fingerprints no library file has any more"""
+        keep = set(keep)
+        for digest in [d for d in self.entries if d not in keep]:
+            del self.entries[digest]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"params": FINGERPRINT_PARAMS, "fingerprints": self.entries}, f,
+                      separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def update_index(files: List[LibraryFile], index: FingerprintIndex, hashes: ContentHashes,
+                 workers: Optional[int] = None) -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
+    """Fingerprint files whose content isn't indexed yet.
+
+    Returns (rel path -> content hash for every fingerprinted file, [(rel, error)]).
+    """
+    digests = {file.rel: hashes.hash(file) for file in files}
+    todo: Dict[str, LibraryFile] = {}
+    for file in files:
+        if digests[file.rel] not in index.entries:
+            todo.setdefault(digests[file.rel], file)
+    print(f"Library: {len(files)} files ({len(set(digests.values()))} distinct), "
+          f"{len(todo)} to fingerprint")
+
+    failures = []
+    if todo:
+        start = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(fingerprint_file, str(file.path)): (digest, file)
+                       for digest, file in todo.items()}
+            for future in as_completed(futures):
+                digest, file = futures[future]
+                try:
+                    index.put(digest, future.result())
+                except (DecodeError, OSError, ValueError) as e:
+                    failures.append((file.rel, str(e)))
+        print(f"Fingerprinted {len(todo) - len(failures)} files in {time.monotonic() - start:.1f}s")
+
+    failed = {rel for rel, _ in failures}
+    return {rel: d for rel, d in digests.items() if rel not in failed and d in index.entries}, failures
+
+
+def candidate_pairs(digests: List[str], index: FingerprintIndex) -> List[Tuple[int, int]]:
+    """Pairs (i < j) with similar duration and average spectrum, blockwise over the matrix"""
+    if len(digests) < 2:
+        return []
+    profiles = np.array([index.entries[d]["profile"] for d in digests], dtype=np.float32)
+    durations = np.array([index.entries[d]["duration"] for d in digests], dtype=np.float32)
+    pairs = []
+    for start in range(0, len(digests), BLOCK):
+        rows = slice(start, start + BLOCK)
+        similar = profiles[rows] @ profiles.T >= MIN_PROFILE_SIMILARITY
+        ratio = np.maximum(durations[rows, None], durations) / np.maximum(
+            np.minimum(durations[rows, None], durations), 1e-3)
+        upper = np.arange(start, start + similar.shape[0])[:, None] < np.arange(len(digests))
+        i, j = np.nonzero(similar & (ratio <= MAX_DURATION_RATIO) & upper)
+        pairs.extend(zip((i + start).tolist(), j.tolist()))
+    return pairs
+
+
+def near_duplicate_clusters(digests: List[str], index: FingerprintIndex,
+                            threshold: float) -> List[Dict[str, float]]:
+    """Clusters of distinct contents that match, as {digest: BER against the cluster's first}"""
+    parent = list(range(len(digests)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bits = {}
+    for i, j in candidate_pairs(digests, index):
+        for k in (i, j):
+            if k not in bits:
+                bits[k] = decode_bits(index.entries[digests[k]])
+        if bit_error_rate(bits[i], bits[j]) <= threshold:
+            parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(digests)):
+        groups.setdefault(find(i), []).append(i)
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        first = bits[members[0]]
+        clusters.append({digests[k]: (0.0 if k == members[0] else bit_error_rate(first, bits[k]))
+                         for k in members})
+    return clusters
+
+
+def find_duplicates(files: List[LibraryFile], digests: Dict[str, str], index: FingerprintIndex,
+                    threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """Exact (same content) and near (fingerprint match) duplicate groups with reclaimable bytes"""
+    by_rel = {file.rel: file for file in files}
+    by_digest: Dict[str, List[str]] = {}
+    for rel, digest in sorted(digests.items()):
+        by_digest.setdefault(digest, []).append(rel)
+
+    def describe(rels: List[str], ber: Dict[str, float]) -> dict:
+        # Keep the first path (lowest take number); the rest are redundant
+        members = [{"path": rel, "category": by_rel[rel].category,
+                    "duration": index.entries[digests[rel]]["duration"],
+                    "bytes": by_rel[rel].path.stat().st_size,
+                    "ber": round(ber.get(digests[rel], 0.0), 4)} for rel in rels]
+        return {"keep": rels[0], "files": members,
+                "redundant_bytes": sum(m["bytes"] for m in members[1:])}
+
+    exact = [describe(rels, {}) for rels in by_digest.values() if len(rels) > 1]
+
+    near = []
+    for cluster in near_duplicate_clusters(sorted(by_digest), index, threshold):
+        # One path per content; extra copies are already listed as exact duplicates
+        rels = sorted(by_digest[digest][0] for digest in cluster)
+        near.append(describe(rels, cluster))
+    near.sort(key=lambda group: group["redundant_bytes"], reverse=True)
+    exact.sort(key=lambda group: group["redundant_bytes"], reverse=True)
+    return {"threshold": threshold, "exact": exact, "near": near}
+
+
+def print_report(report: dict, limit: int = 20):
+    for kind, title in (("exact", "Exact duplicates (same content)"),
+                        ("near", f"Near duplicates (bit error rate <= {report['threshold']:.2f})")):
+        groups = report[kind]
+        redundant = sum(len(g["files"]) - 1 for g in groups)
+        reclaim = sum(g["redundant_bytes"] for g in groups)
+        print()
+        print(f"{title}: {len(groups)} groups, {redundant} redundant files, {reclaim / 1e6:.1f} MB")
+        for n, group in enumerate(groups[:limit], 1):
+            print(f"  [{n}] {len(group['files'])} files, {group['redundant_bytes'] / 1e6:.2f} MB redundant")
+            for member in group["files"]:
+                mark = "keep" if member["path"] == group["keep"] else "    "
+                ber = f"  BER {member['ber']:.2f}" if kind == "near" and mark != "keep" else ""
+                print(f"      {mark}  {member['path']}  {member['duration']:.1f}s{ber}")
+        if len(groups) > limit:
+            print(f"  ... {len(groups) - limit} more (see --json)")
+
+
+def fingerprint_audio(categories: Optional[List[str]] = None, threshold: float = DEFAULT_THRESHOLD,
+                      workers: Optional[int] = None, json_path: Optional[Path] = None,
+                      limit: int = 20) -> dict:
+    # A voice line's mp3 master and its transcoded OGG are one line, not a redundant take
+    files = played_files(library_files())
+    if categories:
+        files = [file for file in files if file.category in categories]
+    index = FingerprintIndex()
+    hashes = ContentHashes(HASHES_PATH)
+    try:
+        digests, failures = update_index(files, index, hashes, workers)
+        if not categories:
+            # Only a full scan knows which files and fingerprints are gone
+            hashes.prune(file.rel for file in files)
+            index.prune(digests.values())
+    finally:
+        hashes.save()
+        index.save()
+
+    report = find_duplicates(files, digests, index, threshold)
+    report["failed"] = [{"path": rel, "error": error} for rel, error in failures]
+    print_report(report, limit)
+    if failures:
+        print()
+        print(f"Failed to decode {len(failures)} files:")
+        for rel, error in failures:
+            print(f"  {rel}: {error.splitlines()[-1] if error else 'unknown error'}")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {json_path}")
+    return report
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find redundant takes and near-identical audio")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Max bit error rate for a near-duplicate match (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--category", nargs="*", choices=CATEGORIES,
+                        help="Only these library categories (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="Decoder processes (default: CPU count)")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Also write the clusters as JSON")
+    parser.add_argument("--limit", type=int, default=20, help="Groups printed per kind (default: 20)")
+    args = parser.parse_args()
+
+    fingerprint_audio(args.category, args.threshold, args.workers, args.json, args.limit)
+
+
+if __name__ == "__main__":
+    main()
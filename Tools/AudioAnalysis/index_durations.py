@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+index_durations.py - Header-only duration table for the game
+
+Reads duration, sample rate, channels and bitrate of every file in the audio
+library (assets/audio plus the processed ad and bumper OGGs) from its headers
+alone (MP3 frame headers and Xing/Info/VBRI tags, OGG granule positions, WAV
+chunks; see common/audio_headers.py) and writes assets/audio/audio_durations.json:
+
+    {
+      "version": 1,
+      "columns": ["duration", "sample_rate", "channels", "kbps"],
+      "lines": {"<line id>": [3.42, 44100, 1, 128], ...},
+      "files": {"res://assets/audio/music/intro_music.wav": [...], ...}
+    }
+
+Voice lines are keyed by line id (the transcoded OGG when there is one, as in
+voice_paths.json); every other file by its res:// path, or its repo-relative
+path outside assets/. BroadcastTimer, AudioDialoguePlayer and the ad break can
+plan timing and prefetch from it without loading a clip.
+
+Files whose mtime and size haven't changed since the last run are not re-read.
+
+Usage:
+    python index_durations.py                 # Update assets/audio/audio_durations.json
+    python index_durations.py --output -      # Print the table instead
+    python index_durations.py --no-cache      # Re-read every header
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.audio_headers import HeaderError, read_header
+from common.audio_library import TRANSCODED_EXTENSION, LibraryFile, library_files
+from common.dialogue import load_catalog
+from common.paths import AUDIO_DURATIONS, REPO_ROOT, VOICE_DIR
+
+SCRIPT_DIR = Path(__file__).parent
+CACHE_PATH = SCRIPT_DIR / ".duration_cache.json"
+CACHE_VERSION = 2  # 2: WAV lengths from block_align
+
+COLUMNS = ["duration", "sample_rate", "channels", "kbps"]
+
+
+class HeaderCache:
+    """rel path -> header row, reused while the file's mtime and size match"""
+
+    def __init__(self, path: Path = CACHE_PATH, enabled: bool = True):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        if enabled:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data.get("files", {})
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+
+    def row(self, file: LibraryFile) -> Tuple[Optional[list], Optional[str]]:
+        """([duration, sample_rate, channels, kbps], None) or (None, error)"""
+        st = file.path.stat()
+        entry = self.entries.get(file.rel)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            self.hits += 1
+            return entry.get("row"), entry.get("error")
+        self.misses += 1
+        try:
+            header = read_header(file.path)
+            row, error = [round(header.duration, 3), header.sample_rate, header.channels,
+                          header.bitrate], None
+        except (HeaderError, OSError) as e:
+            row, error = None, str(e)
+        self.entries[file.rel] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                                  "row": row, "error": error}
+        return row, error
+
+    def save(self, keep):
+        if not self.enabled:
+            return
+        keep = set(keep)
+        data = {"version": CACHE_VERSION,
+                "files": {rel: entry for rel, entry in self.entries.items() if rel in keep}}
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+def runtime_key(rel: str) -> str:
+    """res:// path for files in the Godot project, repo-relative otherwise"""
+    return f"res://{rel}" if rel.startswith("assets/") else rel
+
+
+def voice_rel(audio_path: str, rows: Dict[str, list]) -> Optional[str]:
+    """Repo-relative path of the file the game plays for a line, if it has been indexed"""
+    master = Path(os.path.relpath(VOICE_DIR / audio_path, REPO_ROOT))
+    for candidate in (master.with_suffix(TRANSCODED_EXTENSION), master):
+        if candidate.as_posix() in rows:
+            return candidate.as_posix()
+    return None
+
+
+def build_table(cache: HeaderCache) -> Tuple[dict, List[LibraryFile], List[Tuple[str, str]]]:
+    """(duration table, library files, [(rel, error)])"""
+    files = library_files()
+    rows = {}
+    failures = []
+    for file in files:
+        row, error = cache.row(file)
+        if row is None:
+            failures.append((file.rel, error))
+        else:
+            rows[file.rel] = row
+
+    lines = {}
+    claimed = set()
+    for line in load_catalog():
+        rel = voice_rel(line.audio_path, rows)
+        if rel and line.line_id:
+            lines[line.line_id] = rows[rel]
+            claimed.add(rel)
+    # Both the transcoded file and its master belong to the line
+    claimed |= {str(Path(rel).with_suffix(".mp3").as_posix()) for rel in claimed}
+
+    table = {
+        "version": 1,
+        "columns": COLUMNS,
+        "lines": dict(sorted(lines.items())),
+        "files": {runtime_key(rel): row for rel, row in sorted(rows.items()) if rel not in claimed},
+    }
+    return table, files, failures
+
+
+def print_summary(table: dict, files: List[LibraryFile], failures: List[Tuple[str, str]]):
+    category = {file.rel: file.category for file in files}
+    totals = defaultdict(lambda: [0, 0.0])
+    rel_by_key = {runtime_key(file.rel): file.rel for file in files}
+    for key, row in table["files"].items():
+        entry = totals[category.get(rel_by_key.get(key, key), "other")]
+        entry[0] += 1
+        entry[1] += row[0]
+    voice = totals["voice lines"]
+    voice[0] = len(table["lines"])
+    voice[1] = sum(row[0] for row in table["lines"].values())
+
+    print("Audio Durations")
+    print("=" * 60)
+    for name, (count, seconds) in sorted(totals.items()):
+        if count:
+            print(f"  {name:<14}{count:>7} files{seconds / 60:>10.1f} min")
+    if failures:
+        print()
+        print(f"Unreadable headers: {len(failures)}")
+        for rel, error in failures:
+            print(f"  {rel}: {error}")
+
+
+def index_durations(output: str = str(AUDIO_DURATIONS), use_cache: bool = True) -> dict:
+    start = time.monotonic()
+    cache = HeaderCache(enabled=use_cache)
+    table, files, failures = build_table(cache)
+    cache.save(file.rel for file in files)
+
+    if output == "-":
+        json.dump(table, sys.stdout, separators=(",", ":"))
+        print()
+        return table
+
+    output_path = Path(output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(table, f, separators=(",", ":"))
+    os.replace(tmp_path, output_path)
+
+    print_summary(table, files, failures)
+    print()
+    print(f"Table written to {output_path} ({output_path.stat().st_size / 1024:.1f} KB) in "
+          f"{(time.monotonic() - start) * 1000:.0f} ms ({cache.hits} cached, {cache.misses} read)")
+    return table
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index audio durations from file headers")
+    parser.add_argument("--output", default=str(AUDIO_DURATIONS),
+                        help="Where to write the table, or - for stdout (default: assets/audio/audio_durations.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-read every file's headers")
+    args = parser.parse_args()
+
+    index_durations(args.output, use_cache=not args.no_cache)
+
+
+if __name__ == "__main__":
+    main()
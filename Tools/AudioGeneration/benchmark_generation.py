@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the audio generators
+Runs generate_arc_audio / generate_break_audio over the real assets/dialogue
+catalog against mock_elevenlabs.py, writing into a throwaway directory, and
+reports lines/sec, p50/p95 latency and wasted retries
+
+Usage:
+    python benchmark_generation.py
+    python benchmark_generation.py --max-in-flight 4 --rate 5 --max-concurrent 3 --error-rate 0.05
+    python benchmark_generation.py --batch    # Whole catalog through generate_catalog_audio
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from elevenlabs_setup import ElevenLabsVoiceCloner
+from generate_arc_audio import generate_arc_audio
+from generate_break_audio import generate_break_audio
+from generate_catalog_audio import generate_catalog_audio
+from mock_elevenlabs import MockElevenLabsServer, add_mock_arguments, config_from_args
+from tts_cache import TTSCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.dialogue import load_catalog
+
+def discover_arc_ids():
+    """Arc IDs as generate_arc_audio expects them: the line-id prefix before _vern_/_caller_"""
+    arc_ids = []
+    for line in load_catalog(include_vern=False):
+        if line.arc_prefix and line.arc_prefix not in arc_ids:
+            arc_ids.append(line.arc_prefix)
+    return arc_ids
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def run_benchmark(args):
+    """Run the generators against the mock and return a report dict"""
+    work_dir = tempfile.mkdtemp(prefix="kbtv_tts_bench_")
+    output_root = os.path.join(work_dir, "voice")
+    cache = TTSCache(cache_dir=os.path.join(work_dir, "cache"),
+                     manifest_path=os.path.join(work_dir, "voice_manifest.json"))
+
+    arc_ids = args.arcs or discover_arc_ids()
+    results = []
+
+    with MockElevenLabsServer(config_from_args(args)) as server:
+        cloner = ElevenLabsVoiceCloner(api_key="mock", base_url=server.base_url,
+                                       pool_size=args.max_in_flight)
+        cloner.voice_id = cloner.voice_id or "mockvern0000000000000"
+        options = dict(max_in_flight=args.max_in_flight, rate=args.rate, cloner=cloner,
+                       cache=cache, output_root=output_root, verbose=args.verbose)
+
+        # Generator progress output is noise here unless asked for
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        start = time.monotonic()
+        with quiet:
+            if args.batch:
+                results.extend(generate_catalog_audio(arcs=args.arcs, **options))
+            else:
+                for arc_id in arc_ids:
+                    results.extend(generate_arc_audio(arc_id, **options))
+                if not args.skip_breaks:
+                    results.extend(generate_break_audio(**options))
+        elapsed = time.monotonic() - start
+        cloner.close()
+        mock_stats = server.stats.snapshot()
+
+    if not args.keep_output:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    synthesized = [r for r in results if r.ok and r.source == "api"]
+    latencies = [r.latency for r in synthesized]
+    engine_retries = sum(max(0, r.attempts - 1) for r in results)
+    return {
+        "arcs": len(arc_ids),
+        "lines": len(results),
+        "synthesized": len(synthesized),
+        "from_cache": sum(1 for r in results if r.source == "cache"),
+        "failed": sum(1 for r in results if not r.ok),
+        "elapsed_s": round(elapsed, 3),
+        "lines_per_s": round(len(synthesized) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "bytes_received": sum(r.bytes_received for r in synthesized),
+        "engine_retries": engine_retries,
+        # Every request that didn't yield audio was paid for in time (and possibly quota)
+        "wasted_requests": mock_stats["requests"] - mock_stats["ok"],
+        "mock": mock_stats,
+        "output_dir": work_dir if args.keep_output else None
+    }
+
+def print_report(report):
+    print("TTS Generation Benchmark")
+    print("=" * 50)
+    print(f"  Arcs:              {report['arcs']}")
+    print(f"  Lines:             {report['lines']} ({report['synthesized']} synthesized, "
+          f"{report['from_cache']} from cache, {report['failed']} failed)")
+    print(f"  Elapsed:           {report['elapsed_s']:.2f}s")
+    print(f"  Throughput:        {report['lines_per_s']:.2f} lines/s")
+    print(f"  Latency p50/p95:   {report['latency_p50_s']:.3f}s / {report['latency_p95_s']:.3f}s")
+    print(f"  Bytes received:    {report['bytes_received']:,}")
+    print(f"  Engine retries:    {report['engine_retries']}")
+    mock = report['mock']
+    print(f"  Wasted requests:   {report['wasted_requests']} "
+          f"({mock['throttled']} throttled, {mock['server_errors']} server errors)")
+    print(f"  Peak in flight:    {mock['peak_in_flight']}")
+    if report['output_dir']:
+        print(f"  Output kept in:    {report['output_dir']}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark TTS generation against a mock ElevenLabs server')
+    parser.add_argument('--arcs', nargs='*', help='Arc IDs to generate (default: every arc in assets/dialogue)')
+    parser.add_argument('--skip-breaks', action='store_true', help="Don't run generate_break_audio")
+    parser.add_argument('--batch', action='store_true',
+                        help='Run the whole catalog (all Vern line types too) through generate_catalog_audio')
+    parser.add_argument('--max-in-flight', type=int, default=2,
+                        help='Maximum concurrent API requests (default: 2)')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='Maximum requests per second (default: 2.0)')
+    parser.add_argument('--keep-output', action='store_true', help='Keep the generated files')
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Show generator output')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
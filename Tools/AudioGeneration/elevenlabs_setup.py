@@ -5,17 +5,93 @@ Upload reference audio and generate voice cloned audio for KBTV
 """
 
 import os
+import random
+import sys
+import tempfile
+import time
 import requests
 import json
+from dataclasses import dataclass
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics, profiling
+
+# Caller voice archetypes mapped to stock ElevenLabs voices
+ARCHETYPE_VOICE_IDS = {
+    "default_male": "29vD33N1CtxCmqQRPOHJ",      # Drew
+    "default_female": "21m00Tcm4TlvDq8ikWAM",    # Rachel
+    "gruff": "29vD33N1CtxCmqQRPOHJ",             # Drew (deeper)
+    "nervous": "AZnzlk1XvdvUeBnXmlld",          # Dani
+    "enthusiastic": "EXAVITQu4vr4xnSDxMaL",      # Bella
+    "conspiracy": "ErXwobaYiN019PkySvjV",        # Antoni
+    "elderly_male": "29vD33N1CtxCmqQRPOHJ",      # Drew (can adjust speed/pitch)
+    "elderly_female": "21m00Tcm4TlvDq8ikWAM"     # Rachel (can adjust for elderly)
+}
+
+# Voice settings used when a caller doesn't override them
+DEFAULT_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.8,
+    "style": 0.5
+}
+
+def resolve_voice_id(voice_id):
+    """Map a caller archetype name to its ElevenLabs voice ID (other IDs pass through)"""
+    return ARCHETYPE_VOICE_IDS.get(voice_id, voice_id)
+
+def saved_voice_id():
+    """Vern's cloned voice ID from voice_id.txt, or None if it hasn't been uploaded yet"""
+    voice_id_path = os.path.join(os.path.dirname(__file__), 'voice_id.txt')
+    try:
+        with open(voice_id_path, 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+@dataclass
+class SynthesisResult:
+    """Per-request stats for one synthesized line"""
+    output_path: str
+    bytes_received: int
+    latency: float          # Seconds from sending the request to the last byte on disk
+    time_to_first_byte: float
+    attempts: int = 1       # Includes connection-level retries
+    write_seconds: float = 0.0  # fsync + rename of the finished file
+
+class ElevenLabsAPIError(Exception):
+    """Raised by synthesize_to_file (and generate_audio(raise_for_status=True)) when a request fails"""
+
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(f"{status_code}: {message}" if status_code else message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        """Rate limits, server errors and dropped connections are worth retrying"""
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
 
 class ElevenLabsVoiceCloner:
-    def __init__(self, api_key=None):
+    # Connection-level failures worth retrying on a fresh pooled connection
+    RETRYABLE_EXCEPTIONS = (requests.ConnectionError, requests.Timeout,
+                            requests.exceptions.ChunkedEncodingError)
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, api_key=None, pool_size=8, max_retries=3, backoff_base=0.5, timeout=(10, 120),
+                 base_url=None):
         """
         Initialize ElevenLabs integration
 
         Args:
             api_key: Your ElevenLabs API key (get from https://elevenlabs.io/app/profile)
+            pool_size: Keep-alive connections kept open (match your max in-flight requests)
+            max_retries: Retries for dropped connections/timeouts, with jittered backoff
+            backoff_base: First retry delay in seconds (doubles per attempt)
+            timeout: (connect, read) timeout in seconds
+            base_url: API root; defaults to ELEVENLABS_BASE_URL or the public API
+                (point it at mock_elevenlabs.py to run offline)
         """
         # Load API key from config file, or use provided key, or environment variable
         if api_key:
@@ -33,16 +109,27 @@ class ElevenLabsVoiceCloner:
                     raise ValueError("No API key found in config file")
             except (FileNotFoundError, json.JSONDecodeError, KeyError):
                 raise ValueError("Could not load API key from config file. Please create elevenlabs_config.json or set ELEVENLABS_API_KEY environment variable")
-        self.base_url = "https://api.elevenlabs.io/v1"
+        self.base_url = base_url or os.getenv('ELEVENLABS_BASE_URL') or "https://api.elevenlabs.io/v1"
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+
+        # One pooled keep-alive session so lines don't each pay a TLS handshake.
+        # HTTP status errors are not retried here: 429/5xx go back to the caller
+        # (tts_engine) so it can shrink concurrency.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({'xi-api-key': self.api_key})
+
         self.voice_id = None  # Will be set after uploading reference audio or loaded from file
 
         # Try to load existing voice ID from file
-        voice_id_path = os.path.join(os.path.dirname(__file__), 'voice_id.txt')
-        try:
-            with open(voice_id_path, 'r') as f:
-                self.voice_id = f.read().strip()
-                print(f"Loaded voice ID from file: {self.voice_id}")
-        except FileNotFoundError:
+        self.voice_id = saved_voice_id()
+        if self.voice_id:
+            print(f"Loaded voice ID from file: {self.voice_id}")
+        else:
             print("No voice_id.txt file found. Voice ID will be set after uploading reference audio.")
 
         if not self.api_key:
@@ -65,9 +152,6 @@ class ElevenLabsVoiceCloner:
         url = f"{self.base_url}/voices/add"
 
         # Prepare multipart form data
-        files = {
-            'files': (os.path.basename(audio_file_path), open(audio_file_path, 'rb'), 'audio/wav')
-        }
 
         data = {
             'name': voice_name,
@@ -80,14 +164,14 @@ class ElevenLabsVoiceCloner:
             })
         }
 
-        headers = {
-            'xi-api-key': self.api_key
-        }
-
         print(f"Uploading voice reference: {audio_file_path}")
         print(f"Voice name: {voice_name}")
 
-        response = requests.post(url, files=files, data=data, headers=headers)
+        with open(audio_file_path, 'rb') as audio_file:
+            files = {
+                'files': (os.path.basename(audio_file_path), audio_file, 'audio/wav')
+            }
+            response = self.session.post(url, files=files, data=data, timeout=self.timeout)
 
         if response.status_code == 200:
             result = response.json()
@@ -100,7 +184,7 @@ class ElevenLabsVoiceCloner:
             return None
 
     def generate_audio(self, text, output_path=None, voice_id=None, model="eleven_flash_v2",
-                      stability=0.5, similarity_boost=0.8, style=0.5):
+                      stability=0.5, similarity_boost=0.8, style=0.5, raise_for_status=False):
         """
         Generate audio using the cloned voice or voice archetype
 
@@ -112,26 +196,60 @@ class ElevenLabsVoiceCloner:
             stability: Voice stability (0-1)
             similarity_boost: Similarity to reference (0-1)
             style: Style exaggeration (0-1)
+            raise_for_status: Raise ElevenLabsAPIError instead of returning None on failure
 
         Returns:
             output_path: Path to the generated audio file
         """
-        # Handle voice archetypes vs voice IDs
-        archetype_to_voice_id = {
-            "default_male": "29vD33N1CtxCmqQRPOHJ",      # Drew
-            "default_female": "21m00Tcm4TlvDq8ikWAM",    # Rachel
-            "gruff": "29vD33N1CtxCmqQRPOHJ",             # Drew (deeper)
-            "nervous": "AZnzlk1XvdvUeBnXmlld",          # Dani
-            "enthusiastic": "EXAVITQu4vr4xnSDxMaL",      # Bella
-            "conspiracy": "ErXwobaYiN019PkySvjV",        # Antoni
-            "elderly_male": "29vD33N1CtxCmqQRPOHJ",      # Drew (can adjust speed/pitch)
-            "elderly_female": "21m00Tcm4TlvDq8ikWAM"     # Rachel (can adjust for elderly)
-        }
+        # Auto-generate output path if not provided
+        if not output_path:
+            output_path = f"vern_audio_{hash(text)}.mp3"
+
+        print(f"Generating audio for text: '{text[:50]}...'")
+
+        try:
+            result = self.synthesize_to_file(
+                text, output_path, voice_id=voice_id, model=model,
+                voice_settings={
+                    "stability": stability,
+                    "similarity_boost": similarity_boost,
+                    "style": style
+                }
+            )
+        except ElevenLabsAPIError as e:
+            if raise_for_status:
+                raise
+            print(f"Generation failed: {e.status_code}")
+            print(f"Response: {e}")
+            return None
+
+        print(f"Audio generated: {result.output_path}")
+        return result.output_path
+
+    def synthesize_to_file(self, text, output_path, voice_id=None, model="eleven_flash_v2",
+                           voice_settings=None):
+        """
+        Stream synthesized audio to output_path over the pooled session
+
+        Audio is written in chunks to a temp file next to output_path and renamed
+        into place only once complete, so an interrupted run never leaves a
+        truncated mp3 behind.
 
-        # Check if voice_id is an archetype (string in our mapping) vs cloned voice ID
-        archetype_names = set(archetype_to_voice_id.keys())
-        if voice_id and voice_id in archetype_names:  # It's an archetype
-            voice_id = archetype_to_voice_id.get(voice_id, "21m00Tcm4TlvDq8ikWAM")  # Default to Rachel
+        Args:
+            text: Text to convert to speech
+            output_path: Where to save the audio file
+            voice_id: Voice ID (for cloned voices) or voice archetype name
+            model: TTS model to use
+            voice_settings: stability / similarity_boost / style overrides
+
+        Returns:
+            SynthesisResult with bytes received and latency
+
+        Raises:
+            ElevenLabsAPIError: on HTTP errors, or once connection retries are exhausted
+        """
+        # Handle voice archetypes vs voice IDs
+        voice_id = resolve_voice_id(voice_id)
 
         # Use stored voice ID if no voice_id provided
         voice_id = voice_id or self.voice_id
@@ -142,40 +260,97 @@ class ElevenLabsVoiceCloner:
 
         headers = {
             "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": self.api_key
+            "Content-Type": "application/json"
         }
 
+        settings = dict(DEFAULT_VOICE_SETTINGS)
+        settings.update(voice_settings or {})
         data = {
             "text": text,
             "model_id": model,
             "voice_settings": {
-                "stability": 0.5,        # Voice stability (0-1)
-                "similarity_boost": 0.8, # How similar to reference (0-1)
-                "style": 0.5,           # Style exaggeration (0-1)
+                "stability": settings["stability"],               # Voice stability (0-1)
+                "similarity_boost": settings["similarity_boost"], # How similar to reference (0-1)
+                "style": settings["style"],                       # Style exaggeration (0-1)
                 "use_speaker_boost": True
             }
         }
 
-        print(f"Generating audio for text: '{text[:50]}...'")
-
-        response = requests.post(url, json=data, headers=headers)
-
-        if response.status_code == 200:
-            # Auto-generate output path if not provided
-            if not output_path:
-                output_path = f"vern_audio_{hash(text)}.mp3"
-
-            # Save the audio file
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
-
-            print(f"Audio generated: {output_path}")
-            return output_path
-        else:
-            print(f"Generation failed: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
+        attempts = 0
+        start = time.monotonic()
+        while True:
+            attempts += 1
+            try:
+                with profiling.stage("network"):
+                    result = self._stream_to_file(url, data, headers, output_path)
+                result.attempts = attempts
+                metrics.event("tts_request", model=model, voice_id=voice_id, chars=len(text),
+                              bytes=result.bytes_received, seconds=round(result.latency, 6),
+                              ttfb=round(result.time_to_first_byte, 6),
+                              write_seconds=round(result.write_seconds, 6), retries=attempts - 1, ok=True)
+                return result
+            except self.RETRYABLE_EXCEPTIONS as e:
+                if attempts > self.max_retries:
+                    self._record_failure(model, voice_id, text, start, attempts, None)
+                    raise ElevenLabsAPIError(None, f"{type(e).__name__}: {e}") from e
+                delay = self.backoff_base * (2 ** (attempts - 1))
+                time.sleep(random.uniform(0, delay))  # Full jitter
+            except ElevenLabsAPIError as e:
+                self._record_failure(model, voice_id, text, start, attempts, e.status_code)
+                raise
+
+    def _record_failure(self, model, voice_id, text, start, attempts, status_code):
+        metrics.event("tts_request", model=model, voice_id=voice_id, chars=len(text),
+                      seconds=round(time.monotonic() - start, 6), retries=attempts - 1,
+                      status=status_code, ok=False)
+
+    def _stream_to_file(self, url, data, headers, output_path):
+        """Send one request and stream the response body into output_path atomically"""
+        start = time.monotonic()
+        with self.session.post(url, json=data, headers=headers, stream=True,
+                               timeout=self.timeout) as response:
+            if response.status_code != 200:
+                raise ElevenLabsAPIError(response.status_code, response.text,
+                                         retry_after=response.headers.get('Retry-After'))
+            time_to_first_byte = time.monotonic() - start
+
+            output_dir = os.path.dirname(output_path) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".part")
+            bytes_received = 0
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                        f.write(chunk)
+                        bytes_received += len(chunk)
+                    write_start = time.monotonic()
+                    with profiling.stage("disk_write"):
+                        f.flush()
+                        os.fsync(f.fileno())
+                with profiling.stage("disk_write"):
+                    os.replace(tmp_path, output_path)
+                write_seconds = time.monotonic() - write_start
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        return SynthesisResult(
+            output_path=output_path,
+            bytes_received=bytes_received,
+            latency=time.monotonic() - start,
+            time_to_first_byte=time_to_first_byte,
+            write_seconds=write_seconds
+        )
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def synthesize_job(self, job):
+        """Generate audio for a tts_engine.TTSJob, returning its SynthesisResult"""
+        os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+        return self.synthesize_to_file(job.text, job.output_path, voice_id=job.voice_id,
+                                       model=job.model, voice_settings=job.voice_settings)
 
     def test_basic_generation(self, test_text="Good evening, truth-seekers. You're tuned to KBTV, Beyond the Veil AM."):
         """
@@ -1,29 +1,25 @@
 #!/usr/bin/env python3
-import re
+import os
+import sys
 
-def extract_arc_ids():
-    """Extract unique arc IDs from missing_audio.txt"""
-    arc_ids = set()
+from verify_audio import StatCache, build_index, missing_line_ids
 
-    with open('../../missing_audio.txt', 'r') as f:
-        for line in f:
-            if line.startswith('Vern/ConversationArcs/'):
-                # Extract arc ID from path like:
-                # Vern/ConversationArcs/Conspiracies/patterns/conspiracies_questionable_patterns_vern_amused_1.mp3
-                # The arc ID is everything before '_vern_'
-                parts = line.strip().split('/')
-                if len(parts) >= 4:
-                    filename = parts[-1]  # e.g., "conspiracies_questionable_patterns_vern_amused_1.mp3"
-                    # Extract everything before '_vern_'
-                    vern_index = filename.find('_vern_')
-                    if vern_index > 0:
-                        arc_id = filename[:vern_index]
-                        arc_ids.add(arc_id)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.dialogue import arc_prefix_from_id
 
-    return sorted(list(arc_ids))
+def extract_arc_ids(speaker='vern'):
+    """Extract unique arc IDs (line-id prefix before _vern_/_caller_) with missing audio"""
+    stat_cache = StatCache()
+    index = build_index(stat_cache)
+    stat_cache.save()
+
+    arc_ids = {arc_prefix_from_id(line_id) for line_id in missing_line_ids(index, 'arc', speaker)}
+    arc_ids.discard(None)
+    arc_ids.discard("")
+    return sorted(arc_ids)
 
 if __name__ == "__main__":
     arc_ids = extract_arc_ids()
     print(f"Found {len(arc_ids)} unique arc IDs:")
     for arc_id in arc_ids:
-        print(arc_id)
\ No newline at end of file
+        print(arc_id)
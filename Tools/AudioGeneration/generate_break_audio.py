@@ -1,115 +1,84 @@
 #!/usr/bin/env python3
 """
-Generate audio for break transitions from VernDialogue.json
+Generate audio for break transitions from vern/break-transitions.json
 Only generates the break transition lines needed for ad breaks
 """
 
 import os
-import json
-import time
+import sys
 from elevenlabs_setup import ElevenLabsVoiceCloner
+from tts_cache import TTSCache
+from tts_engine import ConcurrentTTSEngine, print_summary
+from tts_jobs import VOICE_OUTPUT_DIR, build_jobs
+from tts_journal import TTSJournal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics, profiling
+from common.dialogue import load_vern_file
+from common.paths import VERN_DIALOGUE_DIR
+
+def collect_break_jobs(cloner, output_root=VOICE_OUTPUT_DIR):
+    """Build TTS jobs for every break transition line
+
+    Returns:
+        List of TTSJob, or None if the dialogue file is missing
+    """
+    # Vern's lines are split per line type; break transitions live in their own file
+    break_dialogue_path = VERN_DIALOGUE_DIR / "break-transitions.json"
+    if not break_dialogue_path.exists():
+        print(f"ERROR: break-transitions.json not found at {break_dialogue_path}")
+        return None
+
+    break_transitions = load_vern_file(break_dialogue_path)
+    print(f"Found {len(break_transitions)} break transitions")
+    return build_jobs(break_transitions, cloner.voice_id, output_root)
 
-def get_mood_voice_settings(mood):
-    """Get voice settings based on mood"""
-    base_settings = {
-        'stability': 0.5,
-        'similarity_boost': 0.8,
-        'style': 0.5
-    }
-
-    mood_settings = {
-        'neutral': {'stability': 0.5, 'similarity_boost': 0.8, 'style': 0.5},
-        'tired': {'stability': 0.3, 'similarity_boost': 0.7, 'style': 0.3},
-        'energized': {'stability': 0.7, 'similarity_boost': 0.9, 'style': 0.8},
-        'irritated': {'stability': 0.6, 'similarity_boost': 0.8, 'style': 0.4},
-        'amused': {'stability': 0.6, 'similarity_boost': 0.8, 'style': 0.7},
-        'focused': {'stability': 0.8, 'similarity_boost': 0.8, 'style': 0.3},
-        'gruff': {'stability': 0.7, 'similarity_boost': 0.7, 'style': 0.2}
-    }
-
-    return mood_settings.get(mood, base_settings)
+def generate_break_audio(force_regenerate=False, verbose=False, max_in_flight=2, rate=2.0,
+                         cloner=None, cache=None, output_root=VOICE_OUTPUT_DIR):
+    """Generate audio for break transitions only
 
-def generate_break_audio(force_regenerate=False, verbose=False):
-    """Generate audio for break transitions only"""
+    Returns:
+        List of tts_engine.JobResult
+    """
 
     print("Generating break transition audio...")
     print("=" * 50)
 
     # Initialize ElevenLabs
-    cloner = ElevenLabsVoiceCloner()
+    cloner = cloner or ElevenLabsVoiceCloner()
     if not cloner.voice_id:
         print("ERROR: No Vern voice ID available. Run elevenlabs_setup.py first.")
-        return
-
-    # Load VernDialogue.json
-    vern_dialogue_path = os.path.join("..", "..", "assets", "dialogue", "vern", "VernDialogue.json")
-    if not os.path.exists(vern_dialogue_path):
-        print(f"ERROR: VernDialogue.json not found at {vern_dialogue_path}")
-        return
-
-    with open(vern_dialogue_path, 'r', encoding='utf-8') as f:
-        vern_data = json.load(f)
-
-    break_transitions = vern_data.get('breakTransitions', [])
-    print(f"Found {len(break_transitions)} break transitions")
-
-    generated_count = 0
-    skipped_count = 0
-
-    # Output directory for break audio
-    output_base = os.path.join("..", "..", "assets", "audio", "voice", "Vern", "Broadcast")
-    os.makedirs(output_base, exist_ok=True)
-
-    for transition in break_transitions:
-        line_id = transition.get('id', '')
-        text = transition.get('voiceText', transition.get('text', ''))
-        mood = transition.get('mood', 'neutral')
-
-        if not line_id or not text:
-            print(f"Skipping invalid transition: {transition}")
-            continue
-
-        # Output path
-        output_path = os.path.join(output_base, f"{line_id}.mp3")
-
-        # Check if file exists
-        if os.path.exists(output_path) and not force_regenerate:
-            if verbose:
-                print(f"SKIPPING: {line_id} (already exists)")
-            skipped_count += 1
-            continue
-
-        # Get mood-based voice settings
-        voice_settings = get_mood_voice_settings(mood)
-
-        try:
-            result_path = cloner.generate_audio(
-                text=text,
-                output_path=output_path,
-                voice_id=cloner.voice_id,
-                stability=voice_settings['stability'],
-                similarity_boost=voice_settings['similarity_boost'],
-                style=voice_settings['style']
-            )
-            print(f"GENERATED: {line_id} (mood: {mood})")
-            generated_count += 1
-
-        except Exception as e:
-            print(f"ERROR generating {line_id}: {e}")
-
-        # Rate limiting - be gentle with API
-        time.sleep(2)  # 2 second delay between requests
-
-    print(f"\nCompleted: {generated_count} generated, {skipped_count} skipped")
-    print(f"Break transition audio saved to: {output_base}")
+        return []
+
+    jobs = collect_break_jobs(cloner, output_root)
+    if jobs is None:
+        return []
+
+    # Shares the content-addressed cache with generate_arc_audio.py
+    cache = cache or TTSCache(journal=TTSJournal())
+    engine = ConcurrentTTSEngine(cloner.synthesize_job, max_in_flight=max_in_flight,
+                                 rate=rate, verbose=verbose,
+                                 cache=cache, force=force_regenerate, journal=cache.journal)
+    results = engine.run(jobs)
+    print_summary(results)
+    print(f"Break transition audio saved to: {os.path.join(output_root, 'Vern', 'Broadcast')}")
+    return results
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description='Generate audio for break transitions')
-    parser.add_argument('--force', action='store_true', help='Regenerate existing files')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerate every line, ignoring the TTS cache')
     parser.add_argument('--verbose', action='store_true', help='Verbose output')
+    parser.add_argument('--max-in-flight', type=int, default=2,
+                        help='Maximum concurrent API requests (default: 2)')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='Maximum requests per second (default: 2.0)')
+    profiling.add_arguments(parser)
 
     args = parser.parse_args()
+    metrics.configure("generate_break_audio")
+    profiling.configure("generate_break_audio", args.profile, args.profile_out)
 
-    generate_break_audio(args.force, args.verbose)
\ No newline at end of file
+    generate_break_audio(args.force, args.verbose, max_in_flight=args.max_in_flight, rate=args.rate)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Generate audio for the whole dialogue catalog in one process
+Reads every arc JSON under assets/dialogue/arcs and every Vern line-type file
+under assets/dialogue/vern, builds one global work queue and generates every
+missing or changed line with a single pooled ElevenLabs client, or with local
+Piper models for speakers routed to Piper (config.json `tts_backends`)
+
+Usage:
+    python generate_catalog_audio.py                      # Everything missing
+    python generate_catalog_audio.py --speaker vern       # Vern only
+    python generate_catalog_audio.py --topic UFOs --source arc
+    python generate_catalog_audio.py --line-type openings closings
+    python generate_catalog_audio.py --lines-from new_moods.json   # Change list from expand_arc_moods.py
+    python generate_catalog_audio.py --plan                # Characters and cost, no requests
+    python generate_catalog_audio.py --resume              # Finish an interrupted/failed run
+    python generate_catalog_audio.py --caller-backend piper --workers 8   # Callers offline
+    python generate_catalog_audio.py --profile --profile-out run.collapsed  # Stage breakdown + flamegraph
+
+Lines with the same normalized voiceText, voice and settings are synthesized
+once and hardlinked (or copied) to every line id that shares them.
+"""
+
+import json
+import os
+import sys
+from collections import Counter
+from elevenlabs_setup import ElevenLabsVoiceCloner, saved_voice_id
+from tts_backends import BACKENDS, ElevenLabsBackend, PiperBackend
+from tts_cache import TTSCache
+from tts_engine import ConcurrentTTSEngine, ProgressReporter, print_summary
+from tts_jobs import VOICE_OUTPUT_DIR, build_jobs
+from tts_journal import JOURNAL_PATH, TTSJournal
+from tts_plan import DEFAULT_USD_PER_1K_CREDITS, plan_budget, print_plan
+from voice_config import backend_routes
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics, profiling
+from common.dialogue import load_catalog
+
+def load_change_list(path):
+    """Line ids from a change list (expand_arc_moods.py --changes)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {entry['id'] if isinstance(entry, dict) else entry for entry in data.get('lines', [])}
+
+def select_lines(lines, topics=None, source='all', line_types=None, arcs=None, line_ids=None):
+    """Filter catalog lines by topic, source (arc/vern), Vern line type, arc and line id"""
+    topics = {t.lower() for t in topics} if topics else None
+    selected = []
+    for line in lines:
+        if source != 'all' and line.source != source:
+            continue
+        if topics and line.topic.lower() not in topics:
+            continue
+        if line_types and line.source == 'vern' and line.group not in line_types:
+            continue
+        if arcs and line.source == 'arc' and line.arc_prefix not in arcs and line.group not in arcs:
+            continue
+        if line_ids is not None and line.line_id not in line_ids:
+            continue
+        selected.append(line)
+    return selected
+
+def open_journal(plan_only=False):
+    """The run's TTSJournal, or None for a --plan run when there isn't one yet
+
+    A plan writes nothing: without a journal it reads the manifest's records,
+    and an existing journal is only read (it is already seeded).
+    """
+    if plan_only and not os.path.exists(JOURNAL_PATH):
+        return None
+    return TTSJournal()
+
+def generate_catalog_audio(force_regenerate=False, verbose=False, speaker_filter='both',
+                           topics=None, source='all', line_types=None, arcs=None, line_ids=None,
+                           max_in_flight=2, rate=2.0, cloner=None, cache=None,
+                           output_root=VOICE_OUTPUT_DIR, plan_only=False,
+                           usd_per_1k_credits=DEFAULT_USD_PER_1K_CREDITS, resume=False,
+                           routes=None, workers=None):
+    """Generate every missing or changed line in the catalog
+
+    With plan_only, print the character budget and cost instead (no API key
+    or requests needed). With resume, only the lines the journal says an
+    earlier run left queued, in flight or failed are generated.
+    routes maps speakers to backends ('elevenlabs' / 'piper'), overriding
+    config.json; workers sizes the Piper process pool.
+
+    Returns:
+        List of tts_engine.JobResult (the tts_plan.BudgetPlan with plan_only)
+    """
+    cache = cache or TTSCache(journal=open_journal(plan_only))
+    unfinished = cache.journal.unfinished() if cache.journal is not None else {}
+    if resume:
+        print(f"Resuming {len(unfinished)} unfinished lines from the journal")
+        line_ids = set(unfinished) if line_ids is None else line_ids & set(unfinished)
+    elif unfinished:
+        print(f"Note: {len(unfinished)} lines from an earlier run never finished (--resume runs just those)")
+
+    lines = select_lines(load_catalog(), topics, source, line_types, arcs, line_ids)
+    if line_ids is not None and len(lines) < len(line_ids):
+        print(f"Warning: {len(line_ids) - len(lines)} listed line ids are not in the selected catalog")
+    by_source = Counter(line.source for line in lines)
+    print(f"Catalog: {len(lines)} lines ({by_source['arc']} arc, {by_source['vern']} Vern broadcast)")
+
+    routes = dict(backend_routes(), **(routes or {}))
+    needs_elevenlabs = 'elevenlabs' in (routes[speaker] for speaker in ('vern', 'caller')
+                                        if speaker_filter in (speaker, 'both'))
+
+    if plan_only:
+        jobs = build_jobs(lines, saved_voice_id() or "vern", output_root, speaker_filter, verbose,
+                          routes=routes)
+        plan = plan_budget(jobs, cache, force_regenerate)
+        print_plan(plan, usd_per_1k_credits)
+        return plan
+
+    backends = {}
+    owned = []  # Backends created here (an injected cloner is closed by its owner)
+    if needs_elevenlabs:
+        # One client for the whole run so every request reuses the same connection pool
+        if cloner is None:
+            cloner = ElevenLabsVoiceCloner(pool_size=max_in_flight)
+            owned.append(cloner)
+        backends['elevenlabs'] = ElevenLabsBackend(cloner, max_in_flight, rate)
+    if 'piper' in routes.values():
+        backends['piper'] = PiperBackend(workers)
+        owned.append(backends['piper'])
+    jobs = build_jobs(lines, cloner.voice_id if cloner else None, output_root, speaker_filter, verbose,
+                      routes=routes)
+
+    results = []
+    try:
+        for name, backend in backends.items():
+            backend_jobs = [job for job in jobs if (job.model == 'piper') == (name == 'piper')]
+            if not backend_jobs:
+                continue
+            print(f"{name}: {len(backend_jobs)} lines ({backend.max_in_flight} in flight)")
+            backend.prepare(backend_jobs)
+            engine = ConcurrentTTSEngine(backend.synthesize_job, max_in_flight=backend.max_in_flight,
+                                         rate=backend.rate, verbose=verbose,
+                                         cache=cache, force=force_regenerate, journal=cache.journal,
+                                         progress=ProgressReporter())
+            results.extend(engine.run(backend_jobs))
+    finally:
+        for resource in owned:
+            resource.close()
+    print_summary(results)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate audio for every line in assets/dialogue')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerate every line, ignoring the TTS cache')
+    parser.add_argument('--verbose', action='store_true', help='Verbose output')
+    parser.add_argument('--speaker', choices=['vern', 'caller', 'both'], default='both',
+                        help='Which speakers to generate audio for (default: both)')
+    parser.add_argument('--source', choices=['arc', 'vern', 'all'], default='all',
+                        help='Conversation arcs, Vern broadcast lines, or both (default: all)')
+    parser.add_argument('--topic', nargs='*', help='Only these topics (e.g. UFOs Ghosts)')
+    parser.add_argument('--line-type', nargs='*',
+                        help='Only these Vern line types (e.g. openings break-transitions)')
+    parser.add_argument('--arc', nargs='*', help='Only these arcs (line-id prefix or arcId)')
+    parser.add_argument('--lines-from', metavar='CHANGES_JSON',
+                        help='Only the line ids in this change list (e.g. from expand_arc_moods.py --changes)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Print total/deduped characters and estimated cost, send nothing')
+    parser.add_argument('--usd-per-1k-credits', type=float, default=DEFAULT_USD_PER_1K_CREDITS,
+                        help=f'Price used for the --plan estimate (default: {DEFAULT_USD_PER_1K_CREDITS})')
+    parser.add_argument('--resume', action='store_true',
+                        help='Only lines an interrupted or failed run left unfinished (see the journal)')
+    parser.add_argument('--copy', action='store_true',
+                        help='Copy shared audio to each line instead of hardlinking it')
+    parser.add_argument('--vern-backend', choices=BACKENDS,
+                        help='Backend for Vern lines (default: config.json tts_backends)')
+    parser.add_argument('--caller-backend', choices=BACKENDS,
+                        help='Backend for caller lines (default: config.json tts_backends)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Piper worker processes (default: CPU count)')
+    parser.add_argument('--max-in-flight', type=int, default=2,
+                        help='Maximum concurrent API requests (default: 2)')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='Maximum requests per second (default: 2.0)')
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    metrics.configure("generate_catalog_audio")
+    profiling.configure("generate_catalog_audio", args.profile, args.profile_out)
+    line_ids = load_change_list(args.lines_from) if args.lines_from else None
+    routes = {speaker: backend for speaker, backend in (('vern', args.vern_backend),
+                                                        ('caller', args.caller_backend)) if backend}
+
+    generate_catalog_audio(args.force, args.verbose, args.speaker, topics=args.topic,
+                           source=args.source, line_types=args.line_type, arcs=args.arc,
+                           line_ids=line_ids, cache=TTSCache(link=not args.copy, journal=open_journal(args.plan)),
+                           plan_only=args.plan, usd_per_1k_credits=args.usd_per_1k_credits,
+                           resume=args.resume, routes=routes, workers=args.workers,
+                           max_in_flight=args.max_in_flight, rate=args.rate)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the ElevenLabs API
+Serves /v1/text-to-speech/{voice_id} and /v1/voices/add with configurable
+latency, payload size, error rate and 429 behavior so the generators can be
+benchmarked and regression-tested without an API key
+
+Usage:
+    python mock_elevenlabs.py --port 8765 --latency-ms 400 --max-concurrent 3
+    ELEVENLABS_BASE_URL=http://127.0.0.1:8765/v1 ELEVENLABS_API_KEY=mock python generate_arc_audio.py ...
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, 417 bytes (26 ms).
+# Zeroed side info decodes as silence, so the payload is a playable mp3.
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC4]) + bytes(413)
+
+TTS_PATH = re.compile(r"^/v1/text-to-speech/([^/?]+)")
+
+
+@dataclass
+class MockConfig:
+    """Behavior knobs for the mock server"""
+    latency_ms: float = 300.0     # Base time before the first byte
+    jitter_ms: float = 100.0      # Uniform +/- jitter on latency
+    bytes_per_char: int = 1100    # ~16 KB/s of 128 kbps audio at ~15 chars/s of speech
+    error_rate: float = 0.0       # Probability of a 500/503 response
+    throttle_rate: float = 0.0    # Probability of a 429 response regardless of load
+    max_concurrent: int = 0       # Requests beyond this many in flight get 429 (0 = unlimited)
+    retry_after: float = 1.0      # Retry-After header sent with 429s
+
+
+class MockStats:
+    """Thread-safe request counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.ok = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.characters = 0
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def enter(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return self.in_flight
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: value for name, value in vars(self).items() if not name.startswith('_')}
+
+
+def make_mp3_payload(num_bytes):
+    """Whole silent frames totalling at least num_bytes"""
+    return MP3_FRAME * max(1, math.ceil(num_bytes / len(MP3_FRAME)))
+
+
+class MockElevenLabsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    @property
+    def config(self) -> MockConfig:
+        return self.server.config
+
+    @property
+    def stats(self) -> MockStats:
+        return self.server.stats
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _sleep_latency(self):
+        delay = self.config.latency_ms + random.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000.0)
+
+    def do_GET(self):
+        if self.path == "/_mock/stats":
+            self._send_json(200, self.stats.snapshot())
+        else:
+            self._send_json(404, {"detail": "not found"})
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path.startswith("/v1/voices/add"):
+            self._sleep_latency()
+            self._send_json(200, {"voice_id": "mockvern0000000000000"})
+            return
+
+        match = TTS_PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"detail": "not found"})
+            return
+        if not self.headers.get("xi-api-key"):
+            self._send_json(401, {"detail": "missing xi-api-key"})
+            return
+
+        in_flight = self.stats.enter()
+        try:
+            config = self.config
+            over_limit = config.max_concurrent and in_flight > config.max_concurrent
+            if over_limit or random.random() < config.throttle_rate:
+                self.stats.add(throttled=1)
+                self._send_json(429, {"detail": "too_many_concurrent_requests"},
+                                headers={"Retry-After": f"{config.retry_after:g}"})
+                return
+
+            self._sleep_latency()
+            if random.random() < config.error_rate:
+                self.stats.add(server_errors=1)
+                self._send_json(random.choice([500, 503]), {"detail": "mock server error"})
+                return
+
+            try:
+                text = json.loads(body or b"{}").get("text", "")
+            except json.JSONDecodeError:
+                self._send_json(400, {"detail": "invalid json"})
+                return
+
+            payload = make_mp3_payload(len(text) * config.bytes_per_char)
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            self.stats.add(ok=1, characters=len(text), bytes_sent=len(payload))
+        finally:
+            self.stats.leave()
+
+
+class MockElevenLabsServer:
+    """Runs the mock API on a background thread (port 0 picks a free port)"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, verbose=False):
+        self.httpd = ThreadingHTTPServer((host, port), MockElevenLabsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = config or MockConfig()
+        self.httpd.stats = MockStats()
+        self.httpd.verbose = verbose
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def stats(self):
+        return self.httpd.stats
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_mock_arguments(parser):
+    """Register MockConfig options on an argparse parser"""
+    defaults = MockConfig()
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms,
+                        help=f'Base response latency (default: {defaults.latency_ms:g})')
+    parser.add_argument('--jitter-ms', type=float, default=defaults.jitter_ms,
+                        help=f'Latency jitter (default: {defaults.jitter_ms:g})')
+    parser.add_argument('--bytes-per-char', type=int, default=defaults.bytes_per_char,
+                        help=f'Audio bytes returned per input character (default: {defaults.bytes_per_char})')
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate,
+                        help='Probability of a 500/503 response (default: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=defaults.throttle_rate,
+                        help='Probability of a random 429 response (default: 0)')
+    parser.add_argument('--max-concurrent', type=int, default=defaults.max_concurrent,
+                        help='Return 429 above this many in-flight requests (default: unlimited)')
+    parser.add_argument('--retry-after', type=float, default=defaults.retry_after,
+                        help=f'Retry-After seconds on 429 (default: {defaults.retry_after:g})')
+
+def config_from_args(args):
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        bytes_per_char=args.bytes_per_char,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_concurrent=args.max_concurrent,
+        retry_after=args.retry_after
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run an offline ElevenLabs stand-in server')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port (default: 8765)')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    server = MockElevenLabsServer(config, host=args.host, port=args.port, verbose=args.verbose)
+    print(f"Mock ElevenLabs API listening on {server.base_url}")
+    print(f"Config: {asdict(config)}")
+    print(f"Stats: GET http://{args.host}:{args.port}/_mock/stats")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"\nFinal stats: {server.stats.snapshot()}")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Pack voice lines into per-arc / per-line-type bundles
+Concatenates the audio of every line in a conversation arc (Vern and caller)
+or in a Vern line type into one bundle file, with a JSON sidecar of byte
+offsets, lengths and durations keyed by line id, so the game can open one
+file per arc and read slices of it
+
+Each member is stored as its complete encoded file (the transcoded .ogg when
+transcode_voice.py has produced one, otherwise the .mp3 master), so any slice
+is a valid stream on its own.
+
+Layout under assets/audio/voice/Bundles:
+    Arcs/{topic}/{arcId}.bundle + .json
+    Vern/{lineType}.bundle + .json
+    index.json                       # line id -> bundle res:// path
+
+Usage:
+    python pack_voice_bundles.py             # Repack bundles whose members changed
+    python pack_voice_bundles.py --rebuild   # Repack everything
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.dialogue import load_catalog
+from common.ffmpeg import probe_duration
+from common.paths import VOICE_DIR
+
+BUNDLE_DIR = os.path.join(str(VOICE_DIR), "Bundles")
+RES_VOICE_PREFIX = "res://assets/audio/voice/"
+MEMBER_EXTENSIONS = ('.ogg', '.mp3')  # Preference order
+INDEX_VERSION = 1
+
+def bundle_name(line):
+    """Bundle path relative to BUNDLE_DIR, without extension"""
+    if line.source == 'arc':
+        return f"Arcs/{line.topic}/{line.group}"
+    return f"Vern/{line.group}"
+
+def member_file(line, voice_dir=VOICE_DIR):
+    """Audio file to pack for a line, or None if it hasn't been generated"""
+    stem = os.path.splitext(os.path.join(str(voice_dir), *line.audio_path.split('/')))[0]
+    for extension in MEMBER_EXTENSIONS:
+        if os.path.exists(stem + extension):
+            return stem + extension
+    return None
+
+def group_bundles(lines, voice_dir=VOICE_DIR):
+    """bundle name -> [(line_id, member path)], in catalog order"""
+    bundles = OrderedDict()
+    missing = 0
+    for line in lines:
+        path = member_file(line, voice_dir)
+        if path is None:
+            missing += 1
+            continue
+        bundles.setdefault(bundle_name(line), []).append((line.line_id, path))
+    return bundles, missing
+
+def signature(members):
+    """Changes whenever a member is added, removed, reordered, or rewritten"""
+    digest = hashlib.md5()
+    for line_id, path in members:
+        st = os.stat(path)
+        digest.update(f"{line_id}\0{os.path.basename(path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def read_sidecar(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if data.get('version') == INDEX_VERSION else None
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def write_json_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def pack_bundle(name, members, sig, bundle_dir=BUNDLE_DIR):
+    """Write one bundle and its sidecar index; returns the bundle size"""
+    bundle_path = os.path.join(bundle_dir, *name.split('/')) + ".bundle"
+    os.makedirs(os.path.dirname(bundle_path), exist_ok=True)
+
+    entries = OrderedDict()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(bundle_path), suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for line_id, path in members:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                entries[line_id] = {
+                    'offset': out.tell(),
+                    'length': len(data),
+                    'duration': probe_duration(path),
+                    'format': os.path.splitext(path)[1][1:]
+                }
+                out.write(data)
+            size = out.tell()
+        os.replace(tmp_path, bundle_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    write_json_atomic(os.path.splitext(bundle_path)[0] + ".json", {
+        'version': INDEX_VERSION,
+        'bundle': os.path.basename(bundle_path),
+        'size': size,
+        'signature': sig,
+        'lines': entries
+    })
+    return size
+
+def pack_voice_bundles(rebuild=False, verbose=False, voice_dir=VOICE_DIR, bundle_dir=BUNDLE_DIR):
+    start = time.monotonic()
+    bundles, missing = group_bundles(load_catalog(), voice_dir)
+    print(f"Bundles: {len(bundles)} ({missing} lines without audio skipped)")
+
+    packed = skipped = 0
+    packed_bytes = 0
+    line_index = {}
+    for name, members in bundles.items():
+        sig = signature(members)
+        bundle_path = os.path.join(bundle_dir, *name.split('/')) + ".bundle"
+        sidecar = read_sidecar(os.path.splitext(bundle_path)[0] + ".json")
+        if (not rebuild and sidecar and sidecar.get('signature') == sig
+                and os.path.exists(bundle_path)):
+            skipped += 1
+        else:
+            size = pack_bundle(name, members, sig, bundle_dir)
+            packed += 1
+            packed_bytes += size
+            if verbose:
+                print(f"  PACKED: {name} ({len(members)} lines, {size / 1024:.0f} KB)")
+        bundle_res = RES_VOICE_PREFIX + os.path.relpath(bundle_path, str(voice_dir)).replace(os.sep, '/')
+        for line_id, _path in members:
+            line_index[line_id] = bundle_res
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    write_json_atomic(os.path.join(bundle_dir, "index.json"), {
+        'version': INDEX_VERSION,
+        'lines': dict(sorted(line_index.items()))
+    })
+
+    elapsed = time.monotonic() - start
+    print(f"Packed {packed} bundles ({packed_bytes / 1e6:.2f} MB), {skipped} up to date, in {elapsed:.1f}s")
+    return packed, skipped
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pack voice lines into per-arc bundles with offset indexes')
+    parser.add_argument('--rebuild', action='store_true', help='Repack every bundle')
+    parser.add_argument('--verbose', action='store_true', help='List every packed bundle')
+
+    args = parser.parse_args()
+
+    pack_voice_bundles(args.rebuild, args.verbose)
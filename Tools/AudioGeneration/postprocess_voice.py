@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Post-synthesis cleanup for generated voice lines
+Trims leading/trailing dead air and normalizes every mp3 under
+assets/audio/voice to config.json's normalize_target_dbfs, in place
+
+Each file is decoded to a NumPy buffer; silence is found with a vectorized
+10 ms frame-energy pass (audio.silence_trimming threshold_db / padding_ms) and
+the gain is set from the level of the voiced frames, capped so peaks stay
+under -1 dBFS. Files run in a process pool, and a state file of content
+hashes skips lines that haven't changed since they were last processed.
+
+Usage:
+    python postprocess_voice.py                 # Process new/changed lines
+    python postprocess_voice.py --dry-run       # Report trims/gains, write nothing
+    python postprocess_voice.py --force         # Reprocess everything
+    python postprocess_voice.py --workers 4
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from voice_config import audio_settings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.decode import DecodeError, decode_audio, encode_audio, probe_audio
+from common.paths import VOICE_DIR
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(SCRIPT_DIR, ".postprocess_state.json")
+
+FRAME_MS = 10
+PEAK_CEILING_DBFS = -1.0
+MP3_ARGS = ["-c:a", "libmp3lame", "-b:a", "128k"]  # Same as ElevenLabs' mp3_44100_128 output
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def frame_levels_db(samples, frame_len):
+    """RMS level of each full frame in dBFS (vectorized over all frames)"""
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.empty(0)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+def trim_bounds(levels, frame_len, n_samples, sample_rate, threshold_db, padding_ms):
+    """Sample range [start, end) from the first to the last voiced frame, plus padding"""
+    voiced = np.flatnonzero(levels > threshold_db)
+    if voiced.size == 0:
+        return 0, n_samples  # All silence: leave it alone
+    pad = int(sample_rate * padding_ms / 1000)
+    start = max(0, int(voiced[0]) * frame_len - pad)
+    end = min(n_samples, (int(voiced[-1]) + 1) * frame_len + pad)
+    return start, end
+
+def normalization_gain_db(samples, levels, threshold_db, target_dbfs, peak_ceiling=PEAK_CEILING_DBFS):
+    """Gain that brings the voiced frames' power-average level to target_dbfs, peak-limited"""
+    voiced = levels[levels > threshold_db]
+    if voiced.size == 0:
+        return 0.0
+    level = 10.0 * np.log10(np.mean(np.power(10.0, voiced / 10.0)))
+    gain = target_dbfs - level
+    peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+    if peak > 0:
+        gain = min(gain, peak_ceiling - 20.0 * np.log10(peak))
+    return float(gain)
+
+def process_samples(samples, sample_rate, settings):
+    """Trim and normalize a mono float32 buffer
+
+    Returns:
+        (processed samples, leading seconds trimmed, trailing seconds trimmed, gain dB)
+    """
+    trimming = settings['silence_trimming']
+    frame_len = max(1, sample_rate * FRAME_MS // 1000)
+    levels = frame_levels_db(samples, frame_len)
+
+    start, end = 0, len(samples)
+    if trimming['enabled']:
+        start, end = trim_bounds(levels, frame_len, len(samples), sample_rate,
+                                 trimming['threshold_db'], trimming['padding_ms'])
+    trimmed = samples[start:end]
+
+    gain_db = normalization_gain_db(trimmed, levels, trimming['threshold_db'],
+                                    settings['normalize_target_dbfs'])
+    processed = trimmed * np.float32(10.0 ** (gain_db / 20.0))
+    return processed, start / sample_rate, (len(samples) - end) / sample_rate, gain_db
+
+def process_file(path, settings, dry_run=False):
+    """Worker: decode, trim, normalize and re-encode one mp3 in place
+
+    Returns a dict of stats plus the new mtime/size/hash for the state file.
+    """
+    info = probe_audio(path)
+    samples = decode_audio(path, info.sample_rate, channels=1)
+    processed, lead, tail, gain_db = process_samples(samples, info.sample_rate, settings)
+
+    if not dry_run:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp.mp3")
+        os.close(fd)
+        try:
+            encode_audio(processed, info.sample_rate, tmp_path, MP3_ARGS + ["-ar", str(info.sample_rate)])
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    st = os.stat(path)
+    return {
+        'lead_trimmed': lead,
+        'tail_trimmed': tail,
+        'gain_db': gain_db,
+        'duration_before': len(samples) / info.sample_rate,
+        'duration_after': len(processed) / info.sample_rate,
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'hash': None if dry_run else file_md5(path)
+    }
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(files, path=STATE_PATH):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".part")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'files': files}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def find_voice_files(voice_dir=VOICE_DIR):
+    paths = []
+    for root, _dirs, files in os.walk(voice_dir):
+        for name in files:
+            if name.endswith('.mp3') and not name.endswith('.tmp.mp3'):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def select_changed(paths, state, voice_dir, force=False):
+    """Files whose content differs from what this tool last wrote
+
+    mtime + size short-circuits the hash for untouched files.
+    """
+    changed = []
+    for path in paths:
+        rel = os.path.relpath(path, voice_dir).replace(os.sep, '/')
+        entry = state.get(rel)
+        if force or entry is None:
+            changed.append((path, rel))
+            continue
+        st = os.stat(path)
+        if st.st_mtime_ns == entry['mtime_ns'] and st.st_size == entry['size']:
+            continue
+        if file_md5(path) == entry['hash']:
+            entry['mtime_ns'], entry['size'] = st.st_mtime_ns, st.st_size
+            continue
+        changed.append((path, rel))
+    return changed
+
+def postprocess_voice(voice_dir=VOICE_DIR, workers=None, force=False, dry_run=False, verbose=False):
+    settings = audio_settings()
+    voice_dir = str(voice_dir)
+    state = load_state()
+    paths = find_voice_files(voice_dir)
+    changed = select_changed(paths, state, voice_dir, force)
+    print(f"Voice lines: {len(paths)} ({len(paths) - len(changed)} already processed, {len(changed)} to process)")
+    if not changed:
+        return []
+
+    start = time.monotonic()
+    results = []
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(process_file, path, settings, dry_run): rel for path, rel in changed}
+        for future in as_completed(futures):
+            rel = futures[future]
+            try:
+                stats = future.result()
+            except (DecodeError, OSError, ValueError) as e:
+                failures.append((rel, str(e)))
+                continue
+            except Exception as e:  # Keep going; report it with the rest
+                failures.append((rel, f"{type(e).__name__}: {e}"))
+                continue
+            results.append((rel, stats))
+            if not dry_run:
+                state[rel] = {k: stats[k] for k in ('mtime_ns', 'size', 'hash')}
+            if verbose or dry_run:
+                print(f"  {rel}: -{stats['lead_trimmed']:.2f}s / -{stats['tail_trimmed']:.2f}s, "
+                      f"gain {stats['gain_db']:+.1f} dB")
+
+    if not dry_run:
+        save_state(state)
+
+    elapsed = time.monotonic() - start
+    trimmed = sum(s['duration_before'] - s['duration_after'] for _, s in results)
+    before = sum(s['duration_before'] for _, s in results)
+    print()
+    print(f"{'Analyzed' if dry_run else 'Processed'} {len(results)} files in {elapsed:.1f}s")
+    if results:
+        mean_gain = sum(s['gain_db'] for _, s in results) / len(results)
+        print(f"  Dead air trimmed: {trimmed:.1f}s of {before:.1f}s ({100 * trimmed / before if before else 0:.1f}%)")
+        print(f"  Mean gain:        {mean_gain:+.1f} dB")
+    if failures:
+        print(f"  Failed: {len(failures)}")
+        for rel, error in sorted(failures):
+            print(f"    {rel}: {error.splitlines()[-1] if error else 'unknown error'}")
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Trim silence and normalize generated voice lines')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Reprocess files even if unchanged')
+    parser.add_argument('--dry-run', action='store_true', help='Report trims and gains without writing')
+    parser.add_argument('--verbose', action='store_true', help='Print every file')
+
+    args = parser.parse_args()
+
+    postprocess_voice(workers=args.workers, force=args.force, dry_run=args.dry_run, verbose=args.verbose)
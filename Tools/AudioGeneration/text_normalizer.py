@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Text normalization applied to voiceText before synthesis
+Implements config.json's `text_processing` section: `{callerName}`-style
+placeholders are replaced and `*yawn*`-style stage directions are stripped, so
+they are neither spoken nor billed. Runs before the TTS cache key is computed.
+
+All placeholders are compiled into one alternation regex, so each line is
+scanned once per rule regardless of how many placeholders are configured.
+"""
+
+import re
+from collections import defaultdict
+
+from voice_config import text_settings
+
+SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.!?;:])")
+LEADING_PUNCTUATION = re.compile(r"^[\s,;:]+")
+WHITESPACE = re.compile(r"\s+")
+
+class TextNormalizer:
+    """
+    Compiled `text_processing` rules plus per-catalog stripped-character counts
+
+    Args:
+        settings: voice_config.text_settings() dict
+    """
+
+    def __init__(self, settings=None):
+        settings = settings or text_settings()
+        replacements = settings['placeholder_replacements'] if settings['strip_placeholders'] else {}
+        self.replacements = dict(replacements)
+        self.placeholders = None
+        if self.replacements:
+            # Longest first so a placeholder that prefixes another can't shadow it
+            keys = sorted(self.replacements, key=len, reverse=True)
+            self.placeholders = re.compile("|".join(re.escape(k) for k in keys))
+        self.stage_directions = None
+        if settings['strip_stage_directions'] and settings['stage_direction_pattern']:
+            self.stage_directions = re.compile(settings['stage_direction_pattern'])
+
+        # catalog -> [lines, lines changed, chars before, chars after]
+        self.stats = defaultdict(lambda: [0, 0, 0, 0])
+
+    def normalize(self, text):
+        """Spoken form of a line; unchanged lines are returned as-is"""
+        result = text
+        if self.placeholders is not None:
+            result = self.placeholders.sub(lambda m: self.replacements[m.group(0)], result)
+        if self.stage_directions is not None:
+            result = self.stage_directions.sub(" ", result)
+        if result == text:
+            return text  # Keep untouched lines' cache keys stable
+        result = WHITESPACE.sub(" ", result)
+        result = SPACE_BEFORE_PUNCTUATION.sub(r"\1", result)
+        return LEADING_PUNCTUATION.sub("", result).strip()
+
+    def apply(self, text, catalog):
+        """normalize() and count the characters saved under `catalog`"""
+        result = self.normalize(text)
+        stats = self.stats[catalog]
+        stats[0] += 1
+        stats[1] += result != text
+        stats[2] += len(text)
+        stats[3] += len(result)
+        return result
+
+    def print_report(self):
+        """Characters stripped per catalog (only catalogs where something changed)"""
+        changed = {name: s for name, s in self.stats.items() if s[1]}
+        if not changed:
+            return
+        print()
+        print(f"{'Text normalization':<32}{'changed':>7}{'chars':>10}{'stripped':>10}")
+        for name in sorted(changed):
+            lines, n_changed, before, after = changed[name]
+            print(f"  {name:<30}{n_changed:>7}{before:>10,}{before - after:>10,}")
+        before = sum(s[2] for s in self.stats.values())
+        after = sum(s[3] for s in self.stats.values())
+        print(f"  {'Total':<30}{sum(s[1] for s in changed.values()):>7}{before:>10,}{before - after:>10,}"
+              f"  ({100 * (before - after) / before if before else 0:.1f}% fewer billed characters)")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Transcode generated voice lines to compact game assets
+Converts every mp3 under assets/audio/voice to the format in config.json's
+`audio` section (mono, sample_rate 22050, ogg at ogg_quality 6), next to the
+mp3 master, and writes assets/dialogue/voice_paths.json mapping each line id
+to the res:// path the game should load
+
+The mp3 masters stay in place: the TTS cache, postprocess_voice.py and
+verify_audio.py all work on them. Exclude `assets/audio/voice/*.mp3` in the
+export preset to ship only the transcoded files.
+
+Usage:
+    python transcode_voice.py               # Transcode new/changed lines, report sizes
+    python transcode_voice.py --rebuild     # Re-encode everything
+    python transcode_voice.py -j 4
+    python transcode_voice.py --report      # Size report and path map only
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from voice_config import audio_settings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.build_manifest import BuildManifest
+from common.dialogue import load_catalog
+from common.ffmpeg import (FFmpegResult, check_ffmpeg, default_jobs, print_install_hint,
+                           print_summary, run_ffmpeg, run_parallel)
+from common.paths import VOICE_DIR, VOICE_PATH_MAP
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSCODE_MANIFEST = os.path.join(SCRIPT_DIR, ".transcode_manifest.json")
+RES_VOICE_PREFIX = "res://assets/audio/voice/"
+
+def codec_args(settings):
+    """ffmpeg output options for the configured format"""
+    fmt = settings['output_format']
+    if fmt == 'ogg':
+        return ["-c:a", "libvorbis", "-q:a", str(settings['ogg_quality'])]
+    raise ValueError(f"Unsupported audio.output_format in config.json: {fmt}")
+
+def encode_settings(settings):
+    """Everything that changes the transcoded bytes (keys the build manifest)"""
+    return {
+        'sample_rate': settings['sample_rate'],
+        'channels': 1,
+        'format': settings['output_format'],
+        'quality': settings['ogg_quality']
+    }
+
+def transcode_file(input_path, output_path, settings):
+    """Transcode one master to mono at the configured rate, replacing atomically"""
+    label = os.path.relpath(output_path, VOICE_DIR).replace(os.sep, '/')
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".tmp" + output_path.suffix)
+    os.close(fd)
+    try:
+        result = run_ffmpeg([
+            "-y",
+            "-i", str(input_path),
+            "-vn",
+            "-map_metadata", "-1",
+            "-ac", "1",
+            "-ar", str(settings['sample_rate']),
+            *codec_args(settings),
+            tmp_path
+        ], label)
+        if result.ok:
+            os.replace(tmp_path, output_path)
+        return result
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def find_masters(voice_dir=VOICE_DIR):
+    return sorted(p for p in Path(voice_dir).rglob("*.mp3") if not p.name.endswith(".tmp.mp3"))
+
+def topic_of(rel_path):
+    """Report bucket: the topic folder for arc lines, 'Broadcast' for Vern broadcast lines"""
+    parts = rel_path.split('/')
+    if parts[:2] == ['Vern', 'ConversationArcs'] and len(parts) > 2:
+        return parts[2]
+    if parts[0] == 'Callers' and len(parts) > 1:
+        return parts[1]
+    if parts[:2] == ['Vern', 'Broadcast']:
+        return 'Broadcast'
+    return parts[0]
+
+def size_report(masters, extension, voice_dir=VOICE_DIR):
+    """Print library size before/after and savings per topic; returns totals"""
+    before = defaultdict(int)
+    after = defaultdict(int)
+    for master in masters:
+        output = master.with_suffix(extension)
+        if not output.exists():
+            continue
+        topic = topic_of(master.relative_to(voice_dir).as_posix())
+        before[topic] += master.stat().st_size
+        after[topic] += output.stat().st_size
+
+    print()
+    print(f"{'Topic':<16}{'mp3':>12}{extension[1:]:>12}{'saved':>9}")
+    print("-" * 49)
+    for topic in sorted(before):
+        saved = 100 * (1 - after[topic] / before[topic]) if before[topic] else 0
+        print(f"{topic:<16}{before[topic] / 1e6:>10.2f}MB{after[topic] / 1e6:>10.2f}MB{saved:>8.1f}%")
+    total_before, total_after = sum(before.values()), sum(after.values())
+    saved = 100 * (1 - total_after / total_before) if total_before else 0
+    print("-" * 49)
+    print(f"{'Total':<16}{total_before / 1e6:>10.2f}MB{total_after / 1e6:>10.2f}MB{saved:>8.1f}%")
+    return total_before, total_after
+
+def write_path_map(extension, voice_dir=VOICE_DIR, path_map=VOICE_PATH_MAP):
+    """line id -> res:// path, preferring the transcoded file over the mp3 master"""
+    lines = {}
+    for line in load_catalog():
+        master = Path(voice_dir) / line.audio_path
+        for candidate in (master.with_suffix(extension), master):
+            if candidate.exists():
+                lines[line.line_id] = RES_VOICE_PREFIX + candidate.relative_to(voice_dir).as_posix()
+                break
+
+    data = {'version': 1, 'format': extension[1:], 'lines': dict(sorted(lines.items()))}
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path_map), suffix=".part")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path_map)
+    print(f"Path map: {len(lines)} lines -> {path_map}")
+
+def transcode_voice(jobs=None, rebuild=False, report_only=False):
+    settings = audio_settings()
+    codec_args(settings)  # Fail fast on an unsupported format
+    extension = "." + settings['output_format']
+    masters = find_masters()
+    print(f"Voice masters: {len(masters)} mp3 files")
+
+    if not report_only:
+        if not check_ffmpeg():
+            print_install_hint()
+            return []
+        manifest = BuildManifest(TRANSCODE_MANIFEST, VOICE_DIR)
+        tasks = [(master, master.with_suffix(extension)) for master in masters]
+        build = encode_settings(settings)
+        pending, up_to_date = manifest.plan(tasks, build, rebuild)
+        jobs = jobs or default_jobs()
+        print(f"Transcoding {len(pending)} files ({jobs} workers), {up_to_date} up to date")
+
+        def work(task) -> FFmpegResult:
+            input_path, output_path, input_hash = task
+            result = transcode_file(input_path, output_path, settings)
+            if result.ok:
+                manifest.record(output_path, input_path, input_hash, build)
+            return result
+
+        start = time.monotonic()
+        try:
+            results = run_parallel(pending, work, jobs)
+        finally:
+            manifest.save()
+        if results:
+            print_summary(results, time.monotonic() - start)
+
+        stale = manifest.stale_outputs(m.name for m in masters)
+        if stale:
+            print()
+            print("Stale outputs (mp3 master deleted):")
+            for output, input_name in stale:
+                print(f"  {output}")
+    else:
+        results = []
+
+    size_report(masters, extension)
+    print()
+    write_path_map(extension)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Transcode voice lines per config.json and write the path map')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help=f'Parallel ffmpeg workers (default: CPU count, {default_jobs()})')
+    parser.add_argument('--rebuild', action='store_true', help='Re-encode every line')
+    parser.add_argument('--report', action='store_true', help='Only print the size report and write the path map')
+
+    args = parser.parse_args()
+
+    transcode_voice(args.jobs, args.rebuild, args.report)
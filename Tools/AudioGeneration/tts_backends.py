@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Pluggable TTS backends for the KBTV audio generators
+A backend turns a TTSJob into an audio file at job.output_path and says how
+hard it may be driven (max_in_flight, rate). Two are available:
+
+- elevenlabs: the remote ElevenLabsVoiceCloner (rate-limited API)
+- piper: local Piper models from config.json's `voices` section, run in a
+  process pool where each worker loads a model once and keeps it warm
+
+config.json's `tts_backends` section routes each speaker to a backend, e.g.
+Piper for callers and ElevenLabs for Vern, so an offline catalog needs no
+network (beyond the first model download) and no rate limits.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import profiling
+from common.decode import encode_audio
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+VOICES_DIR = os.path.join(SCRIPT_DIR, "voices")
+PIPER_VOICES_URL = "https://huggingface.co/rhasspy/piper-voices/resolve/main"
+
+BACKENDS = ('elevenlabs', 'piper')
+PIPER_MODEL = "piper"  # TTSJob.model for Piper jobs (job.voice_id is the Piper voice name)
+MP3_ARGS = ["-c:a", "libmp3lame", "-b:a", "128k"]  # Same as the ElevenLabs mp3_44100_128 output
+
+class TTSBackend:
+    """Interface for a speech backend driven by ConcurrentTTSEngine"""
+    name = ""
+    max_in_flight = 1   # Concurrent synthesize_job calls the engine may make
+    rate = 1.0          # Calls per second the engine may start
+
+    def prepare(self, jobs):
+        """Called once with this backend's jobs before any are synthesized"""
+
+    def synthesize_job(self, job):
+        """Write job.output_path, raising on failure"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release connections, processes, etc."""
+
+class ElevenLabsBackend(TTSBackend):
+    """The ElevenLabs API through a pooled ElevenLabsVoiceCloner"""
+    name = 'elevenlabs'
+
+    def __init__(self, cloner, max_in_flight=2, rate=2.0):
+        self.cloner = cloner
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+
+    def synthesize_job(self, job):
+        return self.cloner.synthesize_job(job)
+
+    def close(self):
+        self.cloner.close()
+
+def piper_model_url(name):
+    """`en_US-ryan-medium` -> URL of its .onnx in the rhasspy/piper-voices repo"""
+    locale, voice, quality = name.split('-', 2)
+    return f"{PIPER_VOICES_URL}/{locale.split('_')[0]}/{locale}/{voice}/{quality}/{name}.onnx"
+
+def ensure_piper_model(name, voices_dir=VOICES_DIR):
+    """Path of a Piper model's .onnx, downloading it (and its .onnx.json) on first use"""
+    model_path = os.path.join(voices_dir, f"{name}.onnx")
+    os.makedirs(voices_dir, exist_ok=True)
+    for path, url in ((model_path, piper_model_url(name)),
+                      (model_path + ".json", piper_model_url(name) + ".json")):
+        if os.path.exists(path):
+            continue
+        print(f"Downloading Piper voice: {os.path.basename(path)}")
+        fd, tmp_path = tempfile.mkstemp(dir=voices_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f, requests.get(url, stream=True, timeout=(10, 300)) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return model_path
+
+# Loaded voices, per worker process: each model is loaded once and reused for every line
+_VOICES = {}
+
+def _piper_voice(model_path):
+    voice = _VOICES.get(model_path)
+    if voice is None:
+        from piper.voice import PiperVoice
+        voice = _VOICES[model_path] = PiperVoice.load(model_path)
+    return voice
+
+def pitch_filter(pitch, sample_rate):
+    """ffmpeg filter shifting pitch by `pitch` (1.0 = unchanged) without changing the tempo"""
+    if abs(pitch - 1.0) < 1e-3:
+        return []
+    return ["-af", f"asetrate={int(round(sample_rate * pitch))},aresample={sample_rate},atempo={1.0 / pitch:.6f}"]
+
+def piper_synthesize(model_path, text, output_path, length_scale=1.0, pitch=1.0):
+    """Worker: synthesize one line with a warm Piper voice and encode it to output_path"""
+    start = time.monotonic()
+    buffer = io.BytesIO()
+    from piper import SynthesisConfig
+    with wave.open(buffer, 'wb') as wav_file:
+        _piper_voice(model_path).synthesize_wav(text, wav_file,
+                                                syn_config=SynthesisConfig(length_scale=length_scale))
+    buffer.seek(0)
+    with wave.open(buffer, 'rb') as wav_file:
+        sample_rate = wav_file.getframerate()
+        pcm = wav_file.readframes(wav_file.getnframes())
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".tmp.mp3")
+    os.close(fd)
+    try:
+        encode_audio(samples, sample_rate, tmp_path, pitch_filter(pitch, sample_rate) + MP3_ARGS)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {'latency': time.monotonic() - start, 'bytes_received': os.path.getsize(output_path)}
+
+class PiperResult:
+    """Stats the engine reads from a synthesize() outcome"""
+
+    def __init__(self, latency, bytes_received):
+        self.latency = latency
+        self.bytes_received = bytes_received
+
+class PiperBackend(TTSBackend):
+    """
+    Local Piper synthesis on a warm process pool
+
+    Args:
+        workers: Worker processes (default: CPU count); the engine keeps them all busy
+        voices_dir: Where Piper models are cached
+    """
+    name = 'piper'
+    rate = 1000.0  # No API to protect; the pool size is the only limit
+
+    def __init__(self, workers=None, voices_dir=VOICES_DIR):
+        try:
+            import piper  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Piper backend needs piper-tts: pip install -r requirements.txt")
+        self.voices_dir = voices_dir
+        self.max_in_flight = workers or os.cpu_count() or 1
+        self.model_paths = {}
+        self._pool = None
+
+    def prepare(self, jobs):
+        # Download in the parent so workers never race on the same model file
+        for name in sorted({job.voice_id for job in jobs}):
+            self.model_paths[name] = ensure_piper_model(name, self.voices_dir)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_in_flight)
+
+    def synthesize_job(self, job):
+        if job.voice_id not in self.model_paths:
+            self.prepare([job])
+        settings = job.voice_settings
+        with profiling.stage("synthesis"):
+            stats = self._pool.submit(piper_synthesize, self.model_paths[job.voice_id], job.text,
+                                      job.output_path, settings.get('length_scale', 1.0),
+                                      settings.get('pitch', 1.0)).result()
+        return PiperResult(**stats)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
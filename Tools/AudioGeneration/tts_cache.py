@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Content-addressed TTS cache shared by the KBTV audio generators
+Audio is stored under a key derived from normalized text, voice, model and
+voice settings; voice_manifest.json records which key each line was built from
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unicodedata
+
+from elevenlabs_setup import DEFAULT_VOICE_SETTINGS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics, profiling
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".tts_cache")
+MANIFEST_PATH = os.path.join(SCRIPT_DIR, "..", "..", "assets", "dialogue", "voice_manifest.json")
+
+def normalize_text(text):
+    """Canonical form of a line for cache keys: NFC unicode, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def cache_key(text, voice_id, model, voice_settings=None):
+    """md5 over everything that changes the synthesized audio"""
+    settings = dict(DEFAULT_VOICE_SETTINGS)
+    settings.update(voice_settings or {})
+    payload = json.dumps({
+        "text": normalize_text(text),
+        "voice_id": voice_id,
+        "model": model,
+        "voice_settings": settings
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+def atomic_copy(src, dst):
+    """Copy src to dst via a temp file so dst is never left half-written"""
+    dst_dir = os.path.dirname(dst) or "."
+    os.makedirs(dst_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dst_dir, suffix=".part")
+    os.close(fd)
+    try:
+        with profiling.stage("disk_write"), \
+                metrics.timed("file_write", method="copy", path=os.path.basename(dst)) as fields:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dst)
+            fields["bytes"] = os.path.getsize(dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_link(src, dst):
+    """Hardlink src to dst (replacing dst); falls back to a copy across devices
+
+    Safe for the generated voice files: every tool that rewrites one
+    (postprocess_voice.py, the generators) replaces it with a new file rather
+    than writing into it, which breaks the link instead of changing the cache.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return  # Already linked (rename() between links to one file is a no-op)
+    dst_dir = os.path.dirname(dst) or "."
+    os.makedirs(dst_dir, exist_ok=True)
+    tmp_path = os.path.join(dst_dir, f".{os.path.basename(dst)}.{os.getpid()}.{threading.get_ident()}.link")
+    try:
+        with profiling.stage("disk_write"), metrics.timed("file_write", method="link", path=os.path.basename(dst)):
+            os.link(src, tmp_path)
+            os.replace(tmp_path, dst)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        atomic_copy(src, dst)
+
+class TTSCache:
+    """
+    Content-addressed store of synthesized audio plus per-line key records
+
+    Args:
+        cache_dir: Where audio objects are stored (one file per key)
+        manifest_path: voice_manifest.json; its `generated` map holds line_id -> key
+        link: Hardlink cached audio into place instead of copying it, so lines
+            sharing a key share one file on disk
+        journal: Optional tts_journal.TTSJournal; when given, line records are
+            committed to it one at a time and the manifest is only a snapshot
+            exported by save()
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, manifest_path=MANIFEST_PATH, link=True, journal=None):
+        self.cache_dir = cache_dir
+        self.manifest_path = manifest_path
+        self.link = link
+        self.journal = journal
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        self.generated = self.manifest.setdefault('generated', {})
+        if journal is not None:
+            journal.import_generated(self.generated)
+
+    def object_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def has(self, key):
+        return os.path.exists(self.object_path(key))
+
+    def store(self, key, audio_path):
+        """Add a generated file to the cache (no-op if the key is already cached)"""
+        if not self.has(key):
+            if self.link:
+                atomic_link(audio_path, self.object_path(key))
+            else:
+                atomic_copy(audio_path, self.object_path(key))
+
+    def materialize(self, key, output_path):
+        """Write cached audio for `key` to output_path"""
+        if self.link:
+            atomic_link(self.object_path(key), output_path)
+        else:
+            atomic_copy(self.object_path(key), output_path)
+
+    def recorded_key(self, line_id):
+        if self.journal is not None:
+            return self.journal.recorded_key(line_id)
+        return self.generated.get(line_id)
+
+    def record(self, line_id, key):
+        if self.journal is not None:
+            if self.journal.recorded_key(line_id) != key:
+                self.journal.record(line_id, key)
+                with self._lock:
+                    self._dirty = True
+            return
+        with self._lock:
+            if self.generated.get(line_id) != key:
+                self.generated[line_id] = key
+                self._dirty = True
+
+    def save(self):
+        """Write the manifest back atomically if any line records changed"""
+        with self._lock:
+            if self.journal is not None:
+                # Also catches records committed by a run that crashed before its save()
+                generated = self.journal.generated()
+                self._dirty = self._dirty or generated != self.generated
+                self.manifest['generated'] = self.generated = generated
+            if not self._dirty:
+                return
+            manifest_dir = os.path.dirname(self.manifest_path) or "."
+            with profiling.stage("disk_write"):
+                fd, tmp_path = tempfile.mkstemp(dir=manifest_dir, suffix=".part")
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.manifest_path)
+            self._dirty = False
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Concurrent TTS generation engine for KBTV
+Runs text-to-speech jobs on a bounded worker pool with a token-bucket rate
+limiter and adaptive (AIMD) concurrency that backs off on 429/5xx responses
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from tts_cache import cache_key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import metrics
+
+
+@dataclass
+class TTSJob:
+    """A single line of dialogue waiting to be synthesized"""
+    line_id: str
+    text: str
+    output_path: str
+    voice_id: str
+    model: str = "eleven_flash_v2"
+    voice_settings: dict = field(default_factory=dict)
+    tags: dict = field(default_factory=dict)  # arc / topic / speaker, for metrics only
+
+    @property
+    def cache_key(self):
+        return cache_key(self.text, self.voice_id, self.model, self.voice_settings)
+
+
+@dataclass
+class JobResult:
+    """Outcome of a TTS job after all retries"""
+    job: TTSJob
+    ok: bool
+    attempts: int = 0
+    error: Optional[str] = None
+    latency: float = 0.0
+    bytes_received: int = 0
+    source: str = "api"  # "api", "cache" or "up_to_date"
+    queue_wait: float = 0.0  # Seconds from submission to the first request (pool + rate limits)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """
+    Limits in-flight requests with additive-increase / multiplicative-decrease.
+
+    The limit halves whenever the API throttles or fails server-side and grows
+    by one after `increase_after` consecutive successes, up to `max_in_flight`.
+    """
+
+    def __init__(self, max_in_flight, min_in_flight=1, increase_after=4):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.min_in_flight = max(1, min(int(min_in_flight), self.max_in_flight))
+        self.increase_after = increase_after
+        self.limit = self.max_in_flight
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.max_in_flight:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self._successes = 0
+            self.limit = max(self.min_in_flight, self.limit // 2)
+
+
+def is_retryable(error):
+    """True for errors worth retrying (rate limits, 5xx, dropped connections)"""
+    return bool(getattr(error, 'retryable', False))
+
+
+class ConcurrentTTSEngine:
+    """
+    Runs TTSJobs through a `synthesize(job)` callable concurrently.
+
+    Args:
+        synthesize: Callable that generates audio for a job, raising on failure
+        max_in_flight: Upper bound on simultaneous API requests
+        rate: Requests per second allowed by the token bucket
+        max_retries: Retries per job for retryable errors
+        backoff_base: First backoff delay in seconds (doubles per attempt)
+        backoff_max: Cap on a single backoff delay in seconds
+        verbose: Print retry/backoff details
+        cache: Optional TTSCache; lines whose key is unchanged are skipped and
+            cached keys are served without an API call
+        force: Synthesize every job even if its key is cached
+        progress: Optional ProgressReporter told about each finished API job
+        journal: Optional tts_journal.TTSJournal; every line's state and API
+            attempts are committed as they change, so an interrupted run can resume
+    """
+
+    def __init__(self, synthesize: Callable[[TTSJob], object], max_in_flight=2, rate=2.0,
+                 max_retries=4, backoff_base=1.0, backoff_max=30.0, verbose=False,
+                 cache=None, force=False, progress=None, journal=None):
+        self.synthesize = synthesize
+        self.journal = journal
+        self.progress = progress
+        self.cache = cache
+        self.force = force
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.bucket = TokenBucket(rate, capacity=self.max_in_flight)
+        self.limiter = AdaptiveLimiter(self.max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.verbose = verbose
+        self._print_lock = threading.Lock()
+        self._first_attempt = {}  # id(job) -> when its first request started
+
+    def _log(self, message):
+        with self._print_lock:
+            print(message)
+
+    def _backoff_delay(self, attempt, error):
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass  # HTTP-date form; fall back to exponential backoff
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(delay / 2, delay)  # Jitter so workers don't retry in lockstep
+
+    def _run_job(self, job: TTSJob, queued_at=None) -> JobResult:
+        result = self._attempt_job(job)
+        if queued_at is not None:
+            result.queue_wait = max(0.0, self._first_attempt.pop(id(job), queued_at) - queued_at)
+        return result
+
+    def _attempt_job(self, job: TTSJob) -> JobResult:
+        attempts = 0
+        while True:
+            attempts += 1
+            self.bucket.acquire()
+            self.limiter.acquire()
+            self._first_attempt.setdefault(id(job), time.monotonic())
+            if self.journal is not None:
+                self.journal.start(job.line_id)
+            start = time.monotonic()
+            try:
+                outcome = self.synthesize(job)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.limiter.on_throttle()
+                if retryable and attempts <= self.max_retries:
+                    delay = self._backoff_delay(attempts, e)
+                    if self.verbose:
+                        self._log(f"RETRY: {job.line_id} in {delay:.1f}s "
+                                  f"(attempt {attempts}, limit {self.limiter.limit}): {e}")
+                    self.limiter.release()
+                    time.sleep(delay)
+                    continue
+                self.limiter.release()
+                self._log(f"ERROR generating {job.line_id}: {e}")
+                if self.progress:
+                    self.progress.advance(ok=False)
+                return JobResult(job, ok=False, attempts=attempts, error=str(e))
+
+            # Prefer the backend's own timing (e.g. cloner SynthesisResult) when it reports one
+            latency = getattr(outcome, 'latency', time.monotonic() - start)
+            bytes_received = getattr(outcome, 'bytes_received', 0)
+            self.limiter.on_success()
+            self.limiter.release()
+            self._log(f"GENERATED: {job.line_id}")
+            if self.progress:
+                self.progress.advance(ok=True)
+            return JobResult(job, ok=True, attempts=attempts, latency=latency,
+                             bytes_received=bytes_received)
+
+    def _plan(self, jobs):
+        """
+        Split jobs into those needing the API and those the cache can satisfy.
+
+        Returns (results, leaders, followers): finished cache/up-to-date results,
+        one job per distinct key to synthesize, and duplicate jobs per key that
+        are filled from the leader's audio once it exists.
+        """
+        results = {}
+        leaders = {}
+        followers = {}
+        for job in jobs:
+            key = job.cache_key
+            exists = os.path.exists(job.output_path)
+            if not self.force:
+                recorded = self.cache.recorded_key(job.line_id)
+                if exists and recorded in (key, None):
+                    # Unchanged line, or audio generated before the cache existed: adopt it
+                    if recorded is None:
+                        self.cache.store(key, job.output_path)
+                        self.cache.record(job.line_id, key)
+                    if self.verbose:
+                        self._log(f"SKIPPING: {job.line_id} (up to date)")
+                    results[id(job)] = JobResult(job, ok=True, source="up_to_date")
+                    continue
+                if self.cache.has(key):
+                    self.cache.materialize(key, job.output_path)
+                    self.cache.record(job.line_id, key)
+                    self._log(f"CACHED: {job.line_id}")
+                    results[id(job)] = JobResult(job, ok=True, source="cache")
+                    continue
+            if key in leaders:
+                followers.setdefault(key, []).append(job)
+            else:
+                leaders[key] = job
+        return results, leaders, followers
+
+    def _record_results(self, results):
+        """Journal and metrics for finished jobs"""
+        for result in results:
+            job = result.job
+            if self.journal is not None:
+                self.journal.finish(job.line_id, result.ok, result.error)
+            metrics.event("tts_job", line_id=job.line_id, model=job.model, source=result.source,
+                          ok=result.ok, chars=len(job.text), bytes=result.bytes_received,
+                          seconds=round(result.latency, 6), attempts=result.attempts,
+                          retries=max(0, result.attempts - 1), queue_wait=round(result.queue_wait, 6),
+                          **job.tags)
+
+    def _finish(self, result, followers, results):
+        """Store a finished API job and fill its duplicates as soon as it completes"""
+        finished = [result]
+        if result.ok and self.cache is not None:
+            job = result.job
+            key = job.cache_key
+            self.cache.store(key, job.output_path)
+            self.cache.record(job.line_id, key)
+            for duplicate in followers.get(key, []):
+                self.cache.materialize(key, duplicate.output_path)
+                self.cache.record(duplicate.line_id, key)
+                self._log(f"CACHED: {duplicate.line_id}")
+                results[id(duplicate)] = JobResult(duplicate, ok=True, source="cache")
+                finished.append(results[id(duplicate)])
+        self._record_results(finished)
+
+    def run(self, jobs):
+        """Generate every job, returning JobResults in submission order"""
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        if self.journal is not None:
+            self.journal.begin_run(jobs)
+        if self.cache is None:
+            to_run, results, followers = jobs, {}, {}
+        else:
+            results, leaders, followers = self._plan(jobs)
+            to_run = list(leaders.values())
+        self._record_results(results.values())
+
+        try:
+            if to_run:
+                if self.progress:
+                    self.progress.start(len(to_run))
+                with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+                    futures = [pool.submit(self._run_job, job, time.monotonic()) for job in to_run]
+                    try:
+                        for future in as_completed(futures):
+                            result = future.result()
+                            results[id(result.job)] = result
+                            self._finish(result, followers, results)
+                    except BaseException:
+                        # Interrupted: don't start queued jobs; the journal keeps them for --resume
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        raise
+                if self.progress:
+                    self.progress.finish()
+
+            failed = []
+            for key, duplicates in followers.items():
+                for duplicate in duplicates:
+                    if id(duplicate) not in results:
+                        results[id(duplicate)] = JobResult(duplicate, ok=False,
+                                                           error="duplicate of a failed line")
+                        failed.append(results[id(duplicate)])
+            self._record_results(failed)
+        finally:
+            if self.cache is not None:
+                self.cache.save()
+
+        return [results[id(job)] for job in jobs]
+
+
+class ProgressReporter:
+    """Prints done/total, throughput and ETA at most every `interval` seconds"""
+
+    def __init__(self, label="lines", interval=5.0):
+        self.label = label
+        self.interval = interval
+        self._lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self._start = 0.0
+        self._last_print = 0.0
+
+    def start(self, total):
+        with self._lock:
+            self.total = total
+            self.done = self.failed = 0
+            self._start = self._last_print = time.monotonic()
+        print(f"Generating {total} {self.label}...")
+
+    def advance(self, ok=True):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            now = time.monotonic()
+            if now - self._last_print < self.interval and self.done < self.total:
+                return
+            self._last_print = now
+            print(self._format(now))
+
+    def finish(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._start
+        print(f"Finished {self.done}/{self.total} {self.label} in {format_duration(elapsed)}"
+              f" ({self.failed} failed)")
+
+    def _format(self, now):
+        elapsed = now - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+        return (f"[{self.done}/{self.total} {percent:5.1f}%] {rate:.2f} {self.label}/s, "
+                f"elapsed {format_duration(elapsed)}, ETA {format_duration(remaining)}")
+
+
+def format_duration(seconds):
+    """Seconds as h:mm:ss / m:ss"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def print_summary(results):
+    """Print generated/cached/skipped/failed counts for a run"""
+    generated_count = sum(1 for r in results if r.ok and r.source == "api")
+    cached_count = sum(1 for r in results if r.source == "cache")
+    skipped_count = sum(1 for r in results if r.source == "up_to_date")
+    failed_count = sum(1 for r in results if not r.ok)
+    print(f"\nCompleted: {generated_count} generated, {cached_count} from cache, "
+          f"{skipped_count} skipped, {failed_count} failed")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Turn dialogue catalog lines into TTS jobs
+Voice selection (Vern clone + mood settings, caller archetypes, or Piper
+models from config.json when a speaker is routed to Piper) and output paths
+shared by generate_arc_audio, generate_break_audio and generate_catalog_audio
+"""
+
+import os
+import sys
+
+from elevenlabs_setup import resolve_voice_id
+from text_normalizer import TextNormalizer
+from tts_backends import PIPER_MODEL
+from tts_engine import TTSJob
+from voice_config import piper_voices
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import profiling
+from common.paths import VOICE_DIR
+
+VOICE_OUTPUT_DIR = str(VOICE_DIR)
+
+def get_caller_archetype(arc_id):
+    """Get appropriate caller voice archetype based on arc characteristics"""
+    # This is a simplified mapping - in practice you'd use the callerPersonality from JSON
+    if "compelling" in arc_id:
+        return "enthusiastic"  # Credible, compelling callers
+    elif "credible" in arc_id:
+        return "default_male"  # Standard credible witnesses
+    elif "questionable" in arc_id:
+        return "nervous"  # Hesitant, questionable claims
+    elif "fake" in arc_id:
+        return "conspiracy"  # Intense conspiracy theorists
+    else:
+        return "default_male"  # Default
+
+def get_vern_voice_settings(mood):
+    """Mood-based voice settings for Vern's conversation arc lines"""
+    stability = 0.5
+    similarity_boost = 0.8
+    style = 0.5
+
+    if mood == 'tired':
+        stability = 0.3  # Less stable for tired
+        style = 0.3
+    elif mood == 'energized':
+        stability = 0.7
+        style = 0.8  # More expressive
+    elif mood == 'irritated':
+        stability = 0.6
+        style = 0.4
+    elif mood == 'amused':
+        stability = 0.6
+        style = 0.7
+    elif mood == 'focused':
+        stability = 0.8
+        style = 0.3
+    elif mood == 'gruff':
+        stability = 0.7
+        style = 0.2
+
+    return {'stability': stability, 'similarity_boost': similarity_boost, 'style': style}
+
+def get_mood_voice_settings(mood):
+    """Get voice settings based on mood (Vern's broadcast lines)"""
+    base_settings = {
+        'stability': 0.5,
+        'similarity_boost': 0.8,
+        'style': 0.5
+    }
+
+    mood_settings = {
+        'neutral': {'stability': 0.5, 'similarity_boost': 0.8, 'style': 0.5},
+        'tired': {'stability': 0.3, 'similarity_boost': 0.7, 'style': 0.3},
+        'energized': {'stability': 0.7, 'similarity_boost': 0.9, 'style': 0.8},
+        'irritated': {'stability': 0.6, 'similarity_boost': 0.8, 'style': 0.4},
+        'amused': {'stability': 0.6, 'similarity_boost': 0.8, 'style': 0.7},
+        'focused': {'stability': 0.8, 'similarity_boost': 0.8, 'style': 0.3},
+        'gruff': {'stability': 0.7, 'similarity_boost': 0.7, 'style': 0.2}
+    }
+
+    return mood_settings.get(mood, base_settings)
+
+def get_piper_voice(line, voices=None):
+    """Piper model name and voice settings for a line, from config.json `voices`"""
+    voices = voices or piper_voices()
+    if line.speaker == 'vern':
+        vern = voices['vern']
+        adjustments = {mood.lower(): values for mood, values in vern.get('mood_adjustments', {}).items()}
+        values = adjustments.get((line.mood or '').lower(), adjustments.get('neutral', {}))
+        model = vern['model']
+    else:
+        callers = voices['callers']
+        values = callers.get(get_caller_archetype(line.arc_prefix), callers['default_male'])
+        model = values['model']
+    return model, {
+        'length_scale': round(1.0 / values.get('speed', 1.0), 4),  # Piper: >1 is slower
+        'pitch': values.get('pitch', 1.0)
+    }
+
+def catalog_name(line):
+    """Bucket for the text normalization report"""
+    return f"arcs/{line.topic}" if line.source == 'arc' else f"vern/{line.group}"
+
+def job_for_line(line, vern_voice_id, output_root=VOICE_OUTPUT_DIR, text=None, backend='elevenlabs'):
+    """Build the TTSJob for a common.dialogue.DialogueLine (None if it can't be voiced)
+
+    text overrides the line's voiceText (build_jobs passes the normalized text).
+    """
+    output_path = os.path.join(output_root, *line.audio_path.split("/"))
+    text = line.voice_text if text is None else text
+    tags = {'arc': line.group, 'topic': line.topic or 'Broadcast', 'speaker': line.speaker}
+    if backend == 'piper':
+        model, voice_settings = get_piper_voice(line)
+        return TTSJob(line_id=line.line_id, text=text, output_path=output_path,
+                      voice_id=model, model=PIPER_MODEL, voice_settings=voice_settings, tags=tags)
+    if line.speaker == 'vern':
+        if not vern_voice_id:
+            return None
+        if line.source == 'arc':
+            voice_settings = get_vern_voice_settings(line.mood)
+        else:
+            voice_settings = get_mood_voice_settings(line.mood)
+        voice_id = vern_voice_id  # Art Bell clone
+    else:
+        voice_id = resolve_voice_id(get_caller_archetype(line.arc_prefix))
+        voice_settings = {}
+    return TTSJob(line_id=line.line_id, text=text, output_path=output_path,
+                  voice_id=voice_id, voice_settings=voice_settings, tags=tags)
+
+def build_jobs(lines, vern_voice_id, output_root=VOICE_OUTPUT_DIR, speaker_filter='both', verbose=False,
+               normalizer=None, routes=None):
+    """Build TTS jobs for catalog lines, applying the speaker filter
+
+    voiceText goes through the config.json text_processing rules first, so
+    stage directions and placeholders are neither spoken nor part of the cache key.
+    routes maps each speaker to a backend name (default: ElevenLabs for both).
+    """
+    normalizer = normalizer or TextNormalizer()
+    jobs = []
+    for line in lines:
+        if not line.line_id or not line.voice_text:
+            print(f"Skipping invalid line: {line.line_id or line.source_file}")
+            continue
+
+        # Apply speaker filter
+        if speaker_filter != 'both' and line.speaker != speaker_filter:
+            if verbose:
+                print(f"SKIPPING: {line.line_id} (speaker filter: {speaker_filter})")
+            continue
+
+        if line.speaker not in ('vern', 'caller'):
+            print(f"WARNING: Unknown speaker '{line.speaker}' for line {line.line_id}, skipping")
+            continue
+
+        with profiling.stage("text_prep"):
+            text = normalizer.apply(line.voice_text, catalog_name(line))
+        if not text:
+            print(f"Skipping {line.line_id}: nothing left to say after text processing")
+            continue
+
+        backend = (routes or {}).get(line.speaker, 'elevenlabs')
+        job = job_for_line(line, vern_voice_id, output_root, text, backend)
+        if job is None:
+            print(f"ERROR: No Vern voice ID available for {line.line_id}")
+            continue
+        jobs.append(job)
+    normalizer.print_report()
+    return jobs
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Crash-safe job journal for the TTS generators
+A SQLite database in WAL mode that records every line of a run as queued,
+in_flight, done or failed (with attempt counts and the last error), plus the
+cache key each line's audio was built from. Every update is one small
+committed transaction, so a crash loses at most the line being written and an
+interrupted run can be resumed exactly where it stopped (--resume).
+
+voice_manifest.json's `generated` map is seeded into the journal the first
+time it is opened and exported back at the end of each run, so it stays a
+readable snapshot; it is no longer the store that is rewritten per line.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.path.join(SCRIPT_DIR, ".tts_journal.sqlite")
+
+QUEUED = "queued"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+UNFINISHED = (QUEUED, IN_FLIGHT, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    line_id TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    line_id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state);
+"""
+
+class TTSJournal:
+    """
+    Per-line job states and recorded cache keys, shared by the generator threads
+
+    Args:
+        path: SQLite database file (created on first use)
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit: each statement is its own durable transaction
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # Recorded keys (what voice_manifest.json's `generated` map used to hold)
+
+    def import_generated(self, generated):
+        """Seed line records from an existing manifest; no-op once the journal has any"""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM lines LIMIT 1").fetchone():
+                return
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany("INSERT OR REPLACE INTO lines VALUES (?, ?)", generated.items())
+
+    def recorded_key(self, line_id):
+        rows = self._execute("SELECT key FROM lines WHERE line_id = ?", (line_id,))
+        return rows[0][0] if rows else None
+
+    def record(self, line_id, key):
+        self._execute("INSERT OR REPLACE INTO lines VALUES (?, ?)", (line_id, key))
+
+    def generated(self):
+        return dict(self._execute("SELECT line_id, key FROM lines ORDER BY line_id"))
+
+    # Job states
+
+    def begin_run(self, jobs):
+        """Queue a run's jobs; attempts carry over unless the line's key changed"""
+        now = time.time()
+        rows = [(job.line_id, job.cache_key, QUEUED, now) for job in jobs]
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany("""
+                    INSERT INTO jobs (line_id, key, state, attempts, error, updated)
+                    VALUES (?, ?, ?, 0, NULL, ?)
+                    ON CONFLICT(line_id) DO UPDATE SET
+                        attempts = CASE WHEN jobs.key = excluded.key THEN jobs.attempts ELSE 0 END,
+                        key = excluded.key, state = excluded.state,
+                        error = NULL, updated = excluded.updated
+                """, rows)
+
+    def start(self, line_id):
+        """An API attempt is about to be made"""
+        self._execute("UPDATE jobs SET state = ?, attempts = attempts + 1, updated = ? WHERE line_id = ?",
+                      (IN_FLIGHT, time.time(), line_id))
+
+    def finish(self, line_id, ok, error=None):
+        self._execute("UPDATE jobs SET state = ?, error = ?, updated = ? WHERE line_id = ?",
+                      (DONE if ok else FAILED, error, time.time(), line_id))
+
+    def unfinished(self):
+        """line_id -> state for lines an earlier run queued but didn't finish (or that failed)"""
+        placeholders = ", ".join("?" * len(UNFINISHED))
+        return dict(self._execute(f"SELECT line_id, state FROM jobs WHERE state IN ({placeholders})",
+                                  UNFINISHED))
+
+    def counts(self):
+        return dict(self._execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
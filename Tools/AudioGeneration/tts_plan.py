@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Character-budget planner for TTS runs
+Groups jobs by cache key (normalized voiceText + voice + model + settings),
+the same grouping ConcurrentTTSEngine uses to synthesize each distinct request
+once and fan it out to every line that shares it, and reports what a run
+would send to ElevenLabs and roughly what it would cost. Nothing is written.
+"""
+
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from tts_cache import normalize_text
+
+# ElevenLabs bills credits per character; Flash/Turbo models cost half a credit.
+# Local Piper lines are free.
+CREDITS_PER_CHAR = {
+    "piper": 0.0,
+    "eleven_flash_v2": 0.5,
+    "eleven_flash_v2_5": 0.5,
+    "eleven_turbo_v2": 0.5,
+    "eleven_turbo_v2_5": 0.5
+}
+DEFAULT_USD_PER_1K_CREDITS = 0.30  # Creator plan overage rate; pass your own with --usd-per-1k-credits
+
+@dataclass
+class BudgetPlan:
+    """What a run would do, in lines and characters"""
+    lines: int = 0
+    total_chars: int = 0          # Every line, as if each were sent on its own
+    unique_requests: int = 0      # Distinct cache keys
+    unique_chars: int = 0         # Characters after deduplication
+    up_to_date: int = 0           # Lines whose audio already matches
+    from_cache: int = 0           # Lines the TTS cache can fill without a request
+    api_requests: int = 0         # Requests this run would send
+    api_chars: int = 0
+    credits: float = 0.0
+    shared: list = field(default_factory=list)  # (lines sharing a key, chars, sample line id), largest first
+
+    def cost(self, usd_per_1k_credits=DEFAULT_USD_PER_1K_CREDITS):
+        return self.credits / 1000 * usd_per_1k_credits
+
+def plan_budget(jobs, cache=None, force=False):
+    """Classify jobs the way ConcurrentTTSEngine would, without touching any files"""
+    plan = BudgetPlan()
+    by_key = defaultdict(list)
+    for job in jobs:
+        by_key[job.cache_key].append(job)
+        plan.lines += 1
+        plan.total_chars += len(normalize_text(job.text))
+
+    for key, group in by_key.items():
+        chars = len(normalize_text(group[0].text))
+        plan.unique_requests += 1
+        plan.unique_chars += chars
+        if len(group) > 1:
+            plan.shared.append((len(group), chars, group[0].line_id))
+
+        needs_audio = []
+        for job in group:
+            if cache is not None and not force:
+                recorded = cache.recorded_key(job.line_id)
+                if os.path.exists(job.output_path) and recorded in (key, None):
+                    plan.up_to_date += 1
+                    continue
+            needs_audio.append(job)
+        if not needs_audio:
+            continue
+        if cache is not None and not force and cache.has(key):
+            plan.from_cache += len(needs_audio)
+            continue
+        # One request for the key; every other line gets a link to its audio
+        plan.api_requests += 1
+        plan.api_chars += chars
+        plan.credits += chars * CREDITS_PER_CHAR.get(group[0].model, 1.0)
+        plan.from_cache += len(needs_audio) - 1
+
+    plan.shared.sort(reverse=True)
+    return plan
+
+def print_plan(plan, usd_per_1k_credits=DEFAULT_USD_PER_1K_CREDITS, top=10):
+    saved = plan.total_chars - plan.unique_chars
+    print()
+    print("TTS budget plan")
+    print(f"  Lines:              {plan.lines}")
+    print(f"  Total characters:   {plan.total_chars:,}")
+    print(f"  Deduped characters: {plan.unique_chars:,} in {plan.unique_requests} distinct requests "
+          f"({100 * saved / plan.total_chars if plan.total_chars else 0:.1f}% shared)")
+    print(f"  Up to date:         {plan.up_to_date} lines")
+    print(f"  From cache/links:   {plan.from_cache} lines")
+    print(f"  To synthesize:      {plan.api_requests} requests, {plan.api_chars:,} characters")
+    print(f"  Estimated cost:     {plan.credits:,.0f} credits, "
+          f"${plan.cost(usd_per_1k_credits):.2f} at ${usd_per_1k_credits:.2f}/1k credits")
+    if plan.shared and top:
+        print()
+        print("Most shared requests:")
+        for count, chars, line_id in plan.shared[:top]:
+            print(f"  {count:>4} lines x {chars:>4} chars  e.g. {line_id}")
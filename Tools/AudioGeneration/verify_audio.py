@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Indexed, incremental missing-audio verifier
+Compares the lines in assets/dialogue against the files in assets/audio/voice
+and writes a JSON index of expected, present, missing and orphaned audio per
+arc / Vern line type and speaker
+
+A stat cache keeps each dialogue file's parsed lines (keyed on mtime + size)
+and each voice directory's listing (keyed on the directory mtime), so reruns
+only re-read what changed.
+
+Usage:
+    python verify_audio.py                    # Summary + voice_audio_index.json
+    python verify_audio.py --strict           # Exit 1 if anything is missing (CI)
+    python verify_audio.py --output -         # Print the JSON index to stdout
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.dialogue import arc_files, load_arc_file, load_vern_file, vern_files
+from common.paths import DIALOGUE_DIR, VOICE_DIR
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STAT_CACHE_PATH = os.path.join(SCRIPT_DIR, ".audio_index_cache.json")
+DEFAULT_INDEX_PATH = os.path.join(SCRIPT_DIR, "voice_audio_index.json")
+
+AUDIO_EXTENSIONS = ('.mp3', '.ogg', '.wav')
+CACHE_VERSION = 1
+
+class StatCache:
+    """mtime-keyed cache of parsed dialogue files and voice directory listings"""
+
+    def __init__(self, path=STAT_CACHE_PATH, enabled=True):
+        self.path = path
+        self.data = {"version": CACHE_VERSION, "dialogue": {}, "dirs": {}}
+        self.hits = 0
+        self.misses = 0
+        if enabled:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.data = data
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+
+    def dialogue_lines(self, path, loader):
+        """Expected lines for a dialogue file as [line_id, speaker, source, group, topic, audio_path]"""
+        st = os.stat(path)
+        key = str(path)
+        entry = self.data["dialogue"].get(key)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            self.hits += 1
+            return entry["lines"]
+        self.misses += 1
+        lines = [[l.line_id, l.speaker, l.source, l.group, l.topic, l.audio_path]
+                 for l in loader(path) if l.line_id]
+        self.data["dialogue"][key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "lines": lines}
+        return lines
+
+    def listing(self, directory):
+        """(subdirs, files) of a directory, re-scanned only when its mtime changed"""
+        st = os.stat(directory)
+        key = str(directory)
+        entry = self.data["dirs"].get(key)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns:
+            self.hits += 1
+            return entry["subdirs"], entry["files"]
+        self.misses += 1
+        subdirs, files = [], []
+        with os.scandir(directory) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    subdirs.append(e.name)
+                elif e.name.lower().endswith(AUDIO_EXTENSIONS):
+                    files.append(e.name)
+        subdirs.sort()
+        files.sort()
+        self.data["dirs"][key] = {"mtime_ns": st.st_mtime_ns, "subdirs": subdirs, "files": files}
+        return subdirs, files
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+def scan_voice_files(stat_cache, voice_dir=VOICE_DIR):
+    """Relative paths (forward slashes) of every audio file under voice_dir"""
+    found = []
+    if not os.path.isdir(voice_dir):
+        return found
+    pending = [""]
+    while pending:
+        rel = pending.pop()
+        subdirs, files = stat_cache.listing(os.path.join(voice_dir, rel) if rel else str(voice_dir))
+        prefix = f"{rel}/" if rel else ""
+        found.extend(prefix + name for name in files)
+        pending.extend(prefix + name for name in subdirs)
+    return found
+
+def expected_lines(stat_cache, dialogue_dir=DIALOGUE_DIR):
+    lines = []
+    for path in arc_files(dialogue_dir):
+        lines.extend(stat_cache.dialogue_lines(path, load_arc_file))
+    for path in vern_files(dialogue_dir):
+        lines.extend(stat_cache.dialogue_lines(path, load_vern_file))
+    return lines
+
+def build_index(stat_cache, dialogue_dir=DIALOGUE_DIR, voice_dir=VOICE_DIR):
+    """Index of expected/present/missing/orphaned audio per group and speaker"""
+    present_files = scan_voice_files(stat_cache, voice_dir)
+    # A line counts as present in any supported format (mp3 from TTS, ogg after transcoding)
+    present_by_stem = {os.path.splitext(path)[0]: path for path in present_files}
+
+    groups = {}
+    expected_stems = set()
+    for line_id, speaker, source, group, topic, audio_path in expected_lines(stat_cache, dialogue_dir):
+        stem = os.path.splitext(audio_path)[0]
+        expected_stems.add(stem)
+        group_key = f"{source}:{topic}/{group}" if source == "arc" else f"{source}:{group}"
+        entry = groups.setdefault(group_key, {"source": source, "topic": topic, "group": group,
+                                              "speakers": {}})
+        counts = entry["speakers"].setdefault(speaker, {"expected": 0, "present": 0, "missing": []})
+        counts["expected"] += 1
+        if stem in present_by_stem:
+            counts["present"] += 1
+        else:
+            counts["missing"].append(line_id)
+
+    orphaned = sorted(path for stem, path in present_by_stem.items() if stem not in expected_stems)
+    totals = {"expected": 0, "present": 0, "missing": 0, "orphaned": len(orphaned)}
+    for entry in groups.values():
+        for counts in entry["speakers"].values():
+            totals["expected"] += counts["expected"]
+            totals["present"] += counts["present"]
+            totals["missing"] += len(counts["missing"])
+
+    return {
+        "version": 1,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "voice_dir": "assets/audio/voice",
+        "totals": totals,
+        "groups": dict(sorted(groups.items())),
+        "orphaned": orphaned
+    }
+
+def missing_line_ids(index, source=None, speaker=None):
+    """Flat list of missing line ids, optionally filtered by source and speaker"""
+    missing = []
+    for entry in index["groups"].values():
+        if source and entry["source"] != source:
+            continue
+        for name, counts in entry["speakers"].items():
+            if speaker and name != speaker:
+                continue
+            missing.extend(counts["missing"])
+    return missing
+
+def print_summary(index, verbose=False):
+    totals = index["totals"]
+    print("Voice Audio Status")
+    print("=" * 60)
+    for key, entry in index["groups"].items():
+        parts = []
+        for speaker, counts in sorted(entry["speakers"].items()):
+            parts.append(f"{speaker} {counts['present']}/{counts['expected']}")
+        missing = sum(len(c["missing"]) for c in entry["speakers"].values())
+        marker = "[OK]" if not missing else "[--]"
+        if missing or verbose:
+            print(f"  {marker} {key}: {', '.join(parts)}")
+    print()
+    print(f"Expected: {totals['expected']}  Present: {totals['present']}  "
+          f"Missing: {totals['missing']}  Orphaned: {totals['orphaned']}")
+
+def run(output=DEFAULT_INDEX_PATH, use_cache=True, strict=False, verbose=False):
+    start = time.monotonic()
+    stat_cache = StatCache(enabled=use_cache)
+    index = build_index(stat_cache)
+    if use_cache:
+        stat_cache.save()
+
+    if output == "-":
+        json.dump(index, sys.stdout, indent=2)
+        print()
+    else:
+        print_summary(index, verbose)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        elapsed = time.monotonic() - start
+        print(f"Index written to {output} in {elapsed * 1000:.0f} ms "
+              f"({stat_cache.hits} cached, {stat_cache.misses} rescanned)")
+
+    if strict and index["totals"]["missing"]:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Verify voice audio against assets/dialogue')
+    parser.add_argument('--output', default=DEFAULT_INDEX_PATH,
+                        help='Where to write the JSON index ("-" for stdout)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not update the stat cache')
+    parser.add_argument('--strict', action='store_true', help='Exit with status 1 if any audio is missing')
+    parser.add_argument('--verbose', action='store_true', help='List complete groups too')
+
+    args = parser.parse_args()
+
+    sys.exit(run(args.output, not args.no_cache, args.strict, args.verbose))
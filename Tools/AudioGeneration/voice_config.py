@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Access to config.json for the voice tools
+`audio`, `text_processing`, `tts_backends` and `voices` (the Piper models)
+are used; `paths` describes the old Piper setup and is ignored
+"""
+
+import json
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(SCRIPT_DIR, "config.json")
+
+def load_config(path=CONFIG_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def audio_settings(config=None):
+    """The `audio` section with defaults for anything missing"""
+    audio = (config or load_config()).get('audio', {})
+    trimming = audio.get('silence_trimming', {})
+    return {
+        'sample_rate': audio.get('sample_rate', 22050),
+        'output_format': audio.get('output_format', 'ogg'),
+        'ogg_quality': audio.get('ogg_quality', 6),
+        'normalize_target_dbfs': audio.get('normalize_target_dbfs', -20),
+        'silence_trimming': {
+            'enabled': trimming.get('enabled', True),
+            'threshold_db': trimming.get('threshold_db', -40),
+            'padding_ms': trimming.get('padding_ms', 100)
+        }
+    }
+
+def text_settings(config=None):
+    """The `text_processing` section with defaults for anything missing"""
+    text = (config or load_config()).get('text_processing', {})
+    return {
+        'strip_placeholders': text.get('strip_placeholders', True),
+        'placeholder_replacements': text.get('placeholder_replacements', {}),
+        'strip_stage_directions': text.get('strip_stage_directions', True),
+        'stage_direction_pattern': text.get('stage_direction_pattern', r"\*[^*]+\*")
+    }
+
+def backend_routes(config=None):
+    """Backend name per speaker from the `tts_backends` section (default: ElevenLabs for both)"""
+    routes = (config or load_config()).get('tts_backends', {})
+    return {
+        'vern': routes.get('vern', 'elevenlabs'),
+        'caller': routes.get('caller', 'elevenlabs')
+    }
+
+def piper_voices(config=None):
+    """The `voices` section: Piper model, speed and pitch for Vern's moods and caller archetypes"""
+    return (config or load_config())['voices']
@@ -12,29 +12,46 @@ Usage:
     python generate_bumpers.py prompts          # Print Suno prompts for all bumpers
     python generate_bumpers.py prompts <id>     # Print prompt for specific bumper
     python generate_bumpers.py process          # Process downloaded MP3s to OGG
+    python generate_bumpers.py process -j 4     # ...with 4 ffmpeg workers (default: CPU count)
+    python generate_bumpers.py process --temp-wav   # Legacy two-pass mode via a temp WAV
+    python generate_bumpers.py process --rebuild    # Re-encode even up-to-date outputs
+    python generate_bumpers.py process --profile    # Where the time goes (hash, loudness, ffmpeg, disk)
     python generate_bumpers.py status           # Show which bumpers have audio
 """
 
+import argparse
 import json
 import os
 import sys
-import subprocess
 from pathlib import Path
 from typing import Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.ffmpeg import FFmpegResult, check_duration, run_ffmpeg, run_pipeline
+from common import metrics, process_downloads, profiling
+from common.loudness import gain_filter
+from common.paths import BUMPER_AUDIO_DIR
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 BUMPERS_DIR = SCRIPT_DIR / "bumpers"
 DOWNLOADS_DIR = SCRIPT_DIR / "downloads"
-OUTPUT_BASE = SCRIPT_DIR.parent.parent / "kbtv" / "Assets" / "Audio" / "Bumpers"
+OUTPUT_BASE = BUMPER_AUDIO_DIR
 OUTPUT_INTRO = OUTPUT_BASE / "Intro"
 OUTPUT_RETURN = OUTPUT_BASE / "Return"
+LOUDNESS_CACHE = SCRIPT_DIR / ".loudness_cache.json"
+BUILD_MANIFEST = SCRIPT_DIR / ".build_manifest.json"
 
 # Audio settings
 TARGET_SAMPLE_RATE = 44100
 TARGET_CHANNELS = 2
 TARGET_FORMAT = "ogg"
 NORMALIZE_LUFS = -16  # Broadcast standard
+TRUE_PEAK_DBTP = -1.5
+VORBIS_QUALITY = 6
+
+ENCODE_SETTINGS = process_downloads.encode_settings(TARGET_SAMPLE_RATE, TARGET_CHANNELS, VORBIS_QUALITY,
+                                                    NORMALIZE_LUFS, TRUE_PEAK_DBTP, TARGET_FORMAT)
 
 
 def load_bumper(bumper_id: str) -> dict:
@@ -42,7 +59,7 @@ def load_bumper(bumper_id: str) -> dict:
     path = BUMPERS_DIR / f"{bumper_id}.json"
     if not path.exists():
         raise FileNotFoundError(f"Bumper not found: {bumper_id}")
-    with open(path, "r", encoding="utf-8") as f:
+    with profiling.stage("json_load"), open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
@@ -50,7 +67,7 @@ def load_all_bumpers() -> list:
     """Load all bumper JSON files."""
     bumpers = []
     for path in sorted(BUMPERS_DIR.glob("*.json")):
-        with open(path, "r", encoding="utf-8") as f:
+        with profiling.stage("json_load"), open(path, "r", encoding="utf-8") as f:
             bumpers.append(json.load(f))
     return bumpers
 
@@ -115,80 +132,74 @@ def cmd_prompts(bumper_id: Optional[str] = None):
             print_suno_prompt(bumper)
 
 
-def check_ffmpeg() -> bool:
-    """Check if ffmpeg is available."""
-    try:
-        subprocess.run(
-            ["ffmpeg", "-version"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            check=True
-        )
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
-
-
-def process_audio(input_path: Path, output_path: Path) -> bool:
-    """Process audio file: normalize and convert to OGG for Unity.
-    
-    Uses intermediate WAV to ensure clean OGG encoding without truncation issues.
+def decode_args(input_path: Path, gain_db: float) -> list:
+    """Input, cleanup filters and output format shared by both process modes."""
+    return [
+        "-i", str(input_path),
+        "-vn",  # No video - strip album art
+        "-map_metadata", "-1",  # Strip all metadata
+        "-af", f"{gain_filter(gain_db)},aresample=resampler=soxr",  # Loudness gain + high-quality resample
+        "-ar", str(TARGET_SAMPLE_RATE),
+        "-ac", str(TARGET_CHANNELS),
+    ]
+
+
+def process_audio_piped(input_path: Path, output_path: Path, gain_db: float, label: str) -> FFmpegResult:
+    """Decode to raw PCM and pipe it straight into the Vorbis encoder.
+
+    The encoder sees a plain timestamp-free s16le stream, same as it would from
+    the temp WAV, so it can't truncate on the MP3's padding/timestamps.
     """
+    pcm_format = ["-f", "s16le", "-ar", str(TARGET_SAMPLE_RATE), "-ac", str(TARGET_CHANNELS)]
+    return run_pipeline(
+        decode_args(input_path, gain_db) + ["-f", "s16le", "pipe:1"],
+        ["-y"] + pcm_format + ["-i", "pipe:0", "-c:a", "libvorbis", "-q:a", str(VORBIS_QUALITY), str(output_path)],
+        label
+    )
+
+
+def process_audio_temp_wav(input_path: Path, output_path: Path, gain_db: float, label: str) -> FFmpegResult:
+    """Original two-step mode: clean WAV on disk, then a second ffmpeg to OGG."""
+    temp_wav = output_path.with_suffix('.tmp.wav')
     try:
-        # Ensure output directory exists
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Create temp WAV path
-        temp_wav = output_path.with_suffix('.tmp.wav')
-        
         # Step 1: Convert to clean WAV (strips metadata, album art, normalizes)
-        wav_cmd = [
-            "ffmpeg", "-y",
-            "-i", str(input_path),
-            "-vn",  # No video - strip album art
-            "-map_metadata", "-1",  # Strip all metadata
-            "-af", f"volume=0.9,aresample=resampler=soxr",  # Simple volume + high-quality resample
-            "-ar", str(TARGET_SAMPLE_RATE),
-            "-ac", str(TARGET_CHANNELS),
-            "-c:a", "pcm_s16le",
-            str(temp_wav)
-        ]
-        
-        result = subprocess.run(
-            wav_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True
-        )
+        decode = run_ffmpeg(["-y"] + decode_args(input_path, gain_db) + ["-c:a", "pcm_s16le", str(temp_wav)], label)
+        if not decode.ok:
+            return decode
         
         # Step 2: Convert WAV to OGG with clean encoding
-        ogg_cmd = [
-            "ffmpeg", "-y",
+        ogg_args = [
+            "-y",
             "-i", str(temp_wav),
             "-c:a", "libvorbis",
-            "-q:a", "6",
+            "-q:a", str(VORBIS_QUALITY),
             str(output_path)
         ]
         
-        result = subprocess.run(
-            ogg_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True
-        )
-        
+        encode = run_ffmpeg(ogg_args, label)
+        encode.elapsed += decode.elapsed
+        encode.media_seconds = decode.media_seconds or encode.media_seconds
+        return encode
+    finally:
         # Clean up temp file
         if temp_wav.exists():
             temp_wav.unlink()
-        
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error processing {input_path.name}: {e.stderr.decode()}")
-        # Clean up temp file on error
-        temp_wav = output_path.with_suffix('.tmp.wav')
-        if temp_wav.exists():
-            temp_wav.unlink()
-        return False
+
+
+def encode_ogg(temp_wav: bool = False) -> process_downloads.Encoder:
+    """Encoder for process_downloads: normalize and convert to OGG for Godot.
+    
+    Pipes PCM between decoder and encoder by default; `temp_wav` selects the
+    older intermediate-WAV path. Either way the OGG must be as long as the
+    input MP3, otherwise it is reported as failed (and deleted).
+    """
+    def encode(input_path: Path, output_path: Path, gain_db: float, label: str) -> FFmpegResult:
+        if temp_wav:
+            result = process_audio_temp_wav(input_path, output_path, gain_db, label)
+        else:
+            result = process_audio_piped(input_path, output_path, gain_db, label)
+        return check_duration(result, input_path, output_path)
+    return encode
 
 
 def get_output_dir(bumper_type: str) -> Path:
@@ -201,15 +212,8 @@ def get_output_dir(bumper_type: str) -> Path:
         raise ValueError(f"Unknown bumper type: {bumper_type}")
 
 
-def cmd_process():
-    """Process downloaded MP3s to OGG format."""
-    if not check_ffmpeg():
-        print("Error: ffmpeg not found. Please install ffmpeg.")
-        print("  Windows: choco install ffmpeg")
-        print("  Mac: brew install ffmpeg")
-        print("  Linux: sudo apt install ffmpeg")
-        return
-    
+def cmd_process(jobs: Optional[int] = None, temp_wav: bool = False, rebuild: bool = False):
+    """Process downloaded MP3s to OGG format (see common/process_downloads.py)."""
     # Ensure downloads directory exists
     DOWNLOADS_DIR.mkdir(exist_ok=True)
     
@@ -228,18 +232,16 @@ def cmd_process():
     for bumper in load_all_bumpers():
         bumpers_by_id[bumper["id"]] = bumper
     
-    processed = 0
-    failed = 0
-    
+    tasks = []
     for mp3_path in mp3_files:
         # Parse filename: {id}_v{n}.mp3
         name = mp3_path.stem  # e.g., "intro_01_v1"
-        parts = name.rsplit("_v", 1)
-        if len(parts) != 2:
+        take = process_downloads.split_take_name(name)
+        if take is None:
             print(f"Skipping {mp3_path.name}: invalid filename format (expected {{id}}_v{{n}}.mp3)")
             continue
         
-        bumper_id = parts[0]  # e.g., "intro_01"
+        bumper_id = take[0]  # e.g., "intro_01"
         
         # Look up bumper type
         if bumper_id not in bumpers_by_id:
@@ -252,24 +254,12 @@ def cmd_process():
         # Determine output path
         output_dir = get_output_dir(bumper_type)
         output_path = output_dir / f"{name}.ogg"
-        
-        print(f"Processing: {mp3_path.name} -> {output_path.relative_to(OUTPUT_BASE)}")
-        
-        if process_audio(mp3_path, output_path):
-            processed += 1
-        else:
-            failed += 1
-    
-    print()
-    print(f"Processed: {processed} files")
-    if failed:
-        print(f"Failed: {failed} files")
+        tasks.append((mp3_path, output_path))
     
-    if processed > 0:
-        print()
-        print("Next steps:")
-        print("  1. Open Godot")
-        print("  2. Import the generated audio files")
+    process_downloads.process_downloads(
+        tasks, encode_ogg(temp_wav), ENCODE_SETTINGS, OUTPUT_BASE, BUILD_MANIFEST, LOUDNESS_CACHE,
+        (p.name for p in mp3_files), DOWNLOADS_DIR, jobs, rebuild
+    )
 
 
 def cmd_status():
@@ -325,18 +315,27 @@ def main():
         print(__doc__)
         return
     
-    command = sys.argv[1].lower()
+    parser = argparse.ArgumentParser(description="Suno station bumper generation helper")
+    subparsers = parser.add_subparsers(dest="command")
+    prompts = subparsers.add_parser("prompts", help="Print Suno prompts for bumpers")
+    prompts.add_argument("bumper_id", nargs="?", help="Only this bumper")
+    process = subparsers.add_parser("process", help="Process downloaded MP3s to OGG")
+    process_downloads.add_arguments(process)
+    process.add_argument("--temp-wav", action="store_true",
+                         help="Decode to a temporary WAV and encode in a second pass (legacy mode)")
+    profiling.add_arguments(process)
+    subparsers.add_parser("status", help="Show which bumpers have audio")
+    
+    args = parser.parse_args([sys.argv[1].lower()] + sys.argv[2:])
     
-    if command == "prompts":
-        bumper_id = sys.argv[2] if len(sys.argv) > 2 else None
-        cmd_prompts(bumper_id)
-    elif command == "process":
-        cmd_process()
-    elif command == "status":
+    if args.command == "prompts":
+        cmd_prompts(args.bumper_id)
+    elif args.command == "process":
+        metrics.configure("generate_bumpers")
+        profiling.configure("generate_bumpers", args.profile, args.profile_out)
+        cmd_process(args.jobs, args.temp_wav, args.rebuild)
+    elif args.command == "status":
         cmd_status()
-    else:
-        print(f"Unknown command: {command}")
-        print(__doc__)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Regression test for the bumper OGG encode (the truncated-OGG problem)
+
+Encodes a generated tone through the piped and the temp-WAV paths and checks
+both OGGs are as long as the input MP3. Needs ffmpeg and ffprobe on PATH;
+those tests are skipped without them.
+
+    python -m pytest Tools/BumperGeneration/test_generate_bumpers.py
+"""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import generate_bumpers
+from common import ffmpeg
+from common.ffmpeg import FFmpegResult, check_duration, probe_duration
+
+TONE_SECONDS = 5.0
+TOLERANCE = 0.1
+
+needs_ffmpeg = pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+                                  reason="ffmpeg/ffprobe not installed")
+
+
+@pytest.fixture
+def tone_mp3(tmp_path: Path) -> Path:
+    path = tmp_path / "tone.mp3"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", f"sine=frequency=440:duration={TONE_SECONDS}",
+                    "-ac", "2", "-c:a", "libmp3lame", "-b:a", "128k", str(path)], check=True)
+    return path
+
+
+@needs_ffmpeg
+def test_piped_and_temp_wav_keep_the_input_length(tone_mp3: Path, tmp_path: Path):
+    expected = probe_duration(tone_mp3)
+    assert expected == pytest.approx(TONE_SECONDS, abs=TOLERANCE)
+
+    durations = {}
+    for mode, process in (("piped", generate_bumpers.process_audio_piped),
+                          ("temp_wav", generate_bumpers.process_audio_temp_wav)):
+        output = tmp_path / mode / "tone.ogg"
+        output.parent.mkdir()
+        result = check_duration(process(tone_mp3, output, 0.0, mode), tone_mp3, output)
+        assert result.ok, result.error
+        durations[mode] = probe_duration(output)
+
+    assert durations["piped"] == pytest.approx(expected, abs=TOLERANCE)
+    assert durations["temp_wav"] == pytest.approx(durations["piped"], abs=TOLERANCE)
+
+
+@needs_ffmpeg
+def test_truncated_output_fails(tone_mp3: Path, tmp_path: Path):
+    output = tmp_path / "short.ogg"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(tone_mp3),
+                    "-t", "2", "-c:a", "libvorbis", str(output)], check=True)
+    result = check_duration(FFmpegResult("short", ok=True), tone_mp3, output)
+    assert not result.ok
+    assert "Duration mismatch" in result.error
+
+
+def test_unprobeable_file_fails(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(ffmpeg, "probe_duration", lambda path: None)
+    result = check_duration(FFmpegResult("x", ok=True), tmp_path / "in.mp3", tmp_path / "out.ogg")
+    assert not result.ok
+    assert "couldn't probe" in result.error
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+compile_catalog.py - Precompiled dialogue catalog
+
+Compiles every arc JSON (assets/dialogue/arcs) and Vern line-type JSON
+(assets/dialogue/vern) into one compact catalog so the game parses a single
+file at startup instead of 25:
+
+- every string is interned into one `strings` table and referenced by index
+- `voiceText` is stored only when it differs from `text`
+- lookup tables by topic, legitimacy, mood and line type are precomputed
+- optionally sharded per topic, so TopicLoader can load just the active topic
+
+Usage:
+    python compile_catalog.py                    # assets/dialogue/compiled/catalog.json
+    python compile_catalog.py --shard            # ...plus catalog.<topic>.json shards
+    python compile_catalog.py --verify           # Check the catalog expands back to the source
+    python compile_catalog.py --benchmark        # Load time / memory vs the raw JSON, parsed and expanded
+
+Compiled layout:
+    {
+      "version": 1,
+      "strings": ["...", ...],
+      "arcs": [{"meta": {key: s}, "arcLines": [[speaker_s, [line, ...]], ...]}, ...],
+      "vern": [{"lineType": s, "description": s, "lines": [line, ...]}, ...],
+      "lookup": {"topic": {...}, "legitimacy": {...}, "mood": {...}, "lineType": {...}}
+    }
+    line = [id_s, text_s, mood_s or -1]
+           + [voiceText_s or -1]      (only if voiceText differs, or extras follow)
+           + [{key: s, ...}]          (only if the line has other keys, e.g. topic)
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.dialogue import arc_files, load_json, vern_files
+from common.paths import DIALOGUE_DIR
+
+COMPILED_DIR = DIALOGUE_DIR / "compiled"
+CATALOG_VERSION = 1
+COMMON_SHARD = "common"  # Vern lines that aren't tied to a topic
+
+LINE_KEYS = ("id", "text", "voiceText", "mood")
+
+
+class StringTable:
+    """Interns strings, handing out stable indices in first-seen order."""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def compile_line(line: dict, intern: StringTable) -> list:
+    text = line.get("text", "")
+    voice_text = line.get("voiceText", text)
+    mood = line.get("mood")
+    extras = {k: intern(v) for k, v in line.items() if k not in LINE_KEYS and isinstance(v, str)}
+
+    compiled = [intern(line.get("id", "")), intern(text), intern(mood) if mood is not None else -1]
+    if voice_text != text or extras:
+        compiled.append(intern(voice_text) if voice_text != text else -1)
+    if extras:
+        compiled.append(extras)
+    return compiled
+
+
+def expand_line(compiled: list, strings: List[str]) -> dict:
+    line = {"id": strings[compiled[0]], "text": strings[compiled[1]]}
+    voice = compiled[3] if len(compiled) > 3 else -1
+    line["voiceText"] = strings[voice] if voice >= 0 else line["text"]
+    if compiled[2] >= 0:
+        line["mood"] = strings[compiled[2]]
+    if len(compiled) > 4:
+        line.update({k: strings[v] for k, v in compiled[4].items()})
+    return line
+
+
+def compile_arc(arc: dict, intern: StringTable) -> dict:
+    meta = {k: intern(v) for k, v in arc.items() if k != "arcLines" and isinstance(v, str)}
+    compiled = {"meta": meta}
+    raw = {k: v for k, v in arc.items() if k != "arcLines" and not isinstance(v, str)}
+    if raw:
+        compiled["raw"] = raw
+    compiled["arcLines"] = [
+        [intern(group.get("speaker", "")), [compile_line(line, intern) for line in group.get("lines", [])]]
+        for group in arc.get("arcLines", [])
+    ]
+    return compiled
+
+
+def compile_vern(vern: dict, intern: StringTable) -> dict:
+    return {
+        "lineType": intern(vern.get("lineType", "")),
+        "description": intern(vern.get("description", "")),
+        "lines": [compile_line(line, intern) for line in vern.get("lines", [])]
+    }
+
+
+def build_lookup(arcs: List[dict], verns: List[dict]) -> dict:
+    """Precomputed indexes; keys are the strings themselves, values are positions.
+
+    topic:      lowercase topic -> {"arcs": [arc index], "vern": {lineType: [line index]}}
+    legitimacy: legitimacy -> [arc index]
+    mood:       mood -> {lineType: [line index]} for Vern lines
+    lineType:   lineType -> index into "vern"
+    """
+    topic: Dict[str, dict] = {}
+    legitimacy: Dict[str, List[int]] = {}
+    mood: Dict[str, Dict[str, List[int]]] = {}
+    line_type: Dict[str, int] = {}
+
+    for i, arc in enumerate(arcs):
+        key = arc.get("topic", "").lower()
+        topic.setdefault(key, {"arcs": [], "vern": {}})["arcs"].append(i)
+        legitimacy.setdefault(arc.get("legitimacy", ""), []).append(i)
+
+    for v, vern in enumerate(verns):
+        lt = vern.get("lineType", "")
+        line_type[lt] = v
+        for j, line in enumerate(vern.get("lines", [])):
+            if line.get("mood"):
+                mood.setdefault(line["mood"], {}).setdefault(lt, []).append(j)
+            if line.get("topic"):
+                bucket = topic.setdefault(line["topic"].lower(), {"arcs": [], "vern": {}})
+                bucket["vern"].setdefault(lt, []).append(j)
+
+    return {"topic": topic, "legitimacy": legitimacy, "mood": mood, "lineType": line_type}
+
+
+def compile_catalog(arcs: List[dict], verns: List[dict]) -> dict:
+    intern = StringTable()
+    compiled_arcs = [compile_arc(arc, intern) for arc in arcs]
+    compiled_vern = [compile_vern(vern, intern) for vern in verns]
+    return {
+        "version": CATALOG_VERSION,
+        "strings": intern.strings,
+        "arcs": compiled_arcs,
+        "vern": compiled_vern,
+        "lookup": build_lookup(arcs, verns)
+    }
+
+
+def expand_catalog(catalog: dict) -> dict:
+    """Inverse of compile_catalog: {"arcs": [arc JSON], "vern": [Vern JSON]}."""
+    strings = catalog["strings"]
+    arcs = []
+    for arc in catalog["arcs"]:
+        expanded = {k: strings[v] for k, v in arc["meta"].items()}
+        expanded.update(arc.get("raw", {}))
+        expanded["arcLines"] = [
+            {"speaker": strings[speaker], "lines": [expand_line(line, strings) for line in lines]}
+            for speaker, lines in arc["arcLines"]
+        ]
+        arcs.append(expanded)
+    verns = [
+        {"lineType": strings[v["lineType"]], "description": strings[v["description"]],
+         "lines": [expand_line(line, strings) for line in v["lines"]]}
+        for v in catalog["vern"]
+    ]
+    return {"arcs": arcs, "vern": verns}
+
+
+def load_sources(dialogue_dir: Path = DIALOGUE_DIR):
+    arcs = [load_json(path) for path in arc_files(dialogue_dir)]
+    verns = [load_json(path) for path in vern_files(dialogue_dir)]
+    return arcs, verns
+
+
+def shard_sources(arcs: List[dict], verns: List[dict]) -> Dict[str, tuple]:
+    """Split arcs and Vern lines by lowercase topic; topic-less Vern lines go to COMMON_SHARD."""
+    shards: Dict[str, tuple] = {}
+    for arc in arcs:
+        shards.setdefault(arc.get("topic", "").lower() or COMMON_SHARD, ([], {}))[0].append(arc)
+    for vern in verns:
+        for line in vern.get("lines", []):
+            key = (line.get("topic") or COMMON_SHARD).lower()
+            by_type = shards.setdefault(key, ([], {}))[1]
+            by_type.setdefault(vern.get("lineType", ""), dict(vern, lines=[]))["lines"].append(line)
+    return {key: (arcs, list(by_type.values())) for key, (arcs, by_type) in sorted(shards.items())}
+
+
+def write_catalog(catalog: dict, path: Path) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".part")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+def cmd_compile(output_dir: Path = COMPILED_DIR, shard: bool = False, verify: bool = False) -> bool:
+    arcs, verns = load_sources()
+    source_bytes = sum(p.stat().st_size for p in arc_files() + vern_files())
+    catalog = compile_catalog(arcs, verns)
+
+    if verify and not verify_catalog(catalog, arcs, verns):
+        return False
+
+    size = write_catalog(catalog, output_dir / "catalog.json")
+    print(f"Compiled {len(arcs)} arcs + {len(verns)} Vern files "
+          f"({len(catalog['strings'])} unique strings)")
+    print(f"  catalog.json: {size / 1024:.1f} KB (source JSON: {source_bytes / 1024:.1f} KB)")
+
+    if shard:
+        for key, (shard_arcs, shard_verns) in shard_sources(arcs, verns).items():
+            shard_catalog = compile_catalog(shard_arcs, shard_verns)
+            if verify and not verify_catalog(shard_catalog, shard_arcs, shard_verns):
+                return False
+            size = write_catalog(shard_catalog, output_dir / f"catalog.{key}.json")
+            print(f"  catalog.{key}.json: {size / 1024:.1f} KB "
+                  f"({len(shard_arcs)} arcs, {sum(len(v['lines']) for v in shard_verns)} Vern lines)")
+    return True
+
+
+def verify_catalog(catalog: dict, arcs: List[dict], verns: List[dict]) -> bool:
+    expanded = expand_catalog(catalog)
+    if expanded["arcs"] == arcs and expanded["vern"] == verns:
+        return True
+    print("Error: compiled catalog does not expand back to the source JSON")
+    return False
+
+
+def _measure(load) -> tuple:
+    """(best wall time over 5 runs, peak traced memory of one run) for a loader."""
+    best = float("inf")
+    for _ in range(5):
+        gc.collect()
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def cmd_benchmark(output_dir: Path = COMPILED_DIR, topic: Optional[str] = None) -> bool:
+    """Compare parsing the raw JSON tree with parsing the compiled catalog.
+
+    The compiled catalog is timed twice: the bare parse, and parse plus
+    expand_catalog, which is what a loader that needs the arc/Vern dicts pays.
+    """
+    catalog_path = output_dir / (f"catalog.{topic.lower()}.json" if topic else "catalog.json")
+    if not catalog_path.exists():
+        print(f"Error: {catalog_path} not found; run compile first" + (" with --shard" if topic else ""))
+        return False
+
+    paths = arc_files() + vern_files()
+
+    def load_raw():
+        return [load_json(path) for path in paths]
+
+    def load_compiled():
+        return load_json(catalog_path)
+
+    def load_expanded():
+        return expand_catalog(load_json(catalog_path))
+
+    raw_time, raw_peak = _measure(load_raw)
+    compiled_time, compiled_peak = _measure(load_compiled)
+    expanded_time, expanded_peak = _measure(load_expanded)
+    raw_bytes = sum(p.stat().st_size for p in paths)
+    compiled_bytes = catalog_path.stat().st_size
+
+    print("Dialogue Load Benchmark (Python json parser)")
+    print("=" * 60)
+    print(f"{'':<22}{'files':>7}{'bytes':>12}{'time':>10}{'peak mem':>11}")
+    print(f"{'raw JSON':<22}{len(paths):>7}{raw_bytes:>12,}{raw_time * 1000:>8.2f}ms{raw_peak / 1024:>9.0f}KB")
+    print(f"{catalog_path.name:<22}{1:>7}{compiled_bytes:>12,}"
+          f"{compiled_time * 1000:>8.2f}ms{compiled_peak / 1024:>9.0f}KB")
+    print(f"{'  + expand_catalog':<22}{'':>7}{'':>12}"
+          f"{expanded_time * 1000:>8.2f}ms{expanded_peak / 1024:>9.0f}KB")
+    print()
+    print(f"Size: {100 * compiled_bytes / raw_bytes:.0f}% of raw")
+    for name, elapsed, peak in (("Parse only", compiled_time, compiled_peak),
+                                ("Parse + expand", expanded_time, expanded_peak)):
+        print(f"{name}: {raw_time / elapsed:.1f}x speedup, peak memory {100 * peak / raw_peak:.0f}% of raw")
+    return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile assets/dialogue into a compact catalog")
+    parser.add_argument("--output-dir", type=Path, default=COMPILED_DIR, help="Where to write the catalog")
+    parser.add_argument("--shard", action="store_true", help="Also write one catalog per topic")
+    parser.add_argument("--verify", action="store_true", help="Check the catalog expands back to the source")
+    parser.add_argument("--benchmark", action="store_true", help="Compare load time and memory with the raw JSON")
+    parser.add_argument("--topic", help="Benchmark this topic shard instead of the full catalog")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        if not cmd_benchmark(args.output_dir, args.topic):
+            sys.exit(1)
+        return
+    if not cmd_compile(args.output_dir, args.shard, args.verify):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
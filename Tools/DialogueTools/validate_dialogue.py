@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+validate_dialogue.py - Dialogue JSON validator
+
+Checks every arc and Vern line-type JSON under assets/dialogue:
+
+- the file parses, has its required fields, and its lists and lines have
+  the expected JSON types
+- every line has an id and non-empty text / voiceText
+- ids are unique, within a file and across the whole tree
+- arc ids follow `{arc}_vern_{mood}_{n}` / `{arc}_caller_{n}` with one
+  `{arc}` prefix per file, and the id's mood matches the `mood` field
+- every Vern group in an arc covers the same moods, once each, and every arc
+  covers the moods most arcs use
+
+Files are checked in parallel and results are cached by content hash, so an
+unchanged tree validates in milliseconds (suitable for a pre-commit hook).
+Exits 1 when there are errors (or warnings, with --strict).
+
+Usage:
+    python validate_dialogue.py                  # Human-readable report
+    python validate_dialogue.py --json           # Diagnostics as JSON on stdout
+    python validate_dialogue.py --output report.json
+    python validate_dialogue.py --no-cache
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.dialogue import arc_files, vern_files
+from common.paths import DIALOGUE_DIR, REPO_ROOT
+
+SCRIPT_DIR = Path(__file__).parent
+CACHE_PATH = SCRIPT_DIR / ".validate_cache.json"
+
+# Bump when rules change so cached results are re-checked
+VALIDATOR_VERSION = 2
+
+# Below this many files the process pool costs more than it saves
+PARALLEL_THRESHOLD = 8
+
+VERN_ID = re.compile(r"^(?P<prefix>.+)_vern_(?P<mood>[a-z]+)_(?P<n>\d+)$")
+CALLER_ID = re.compile(r"^(?P<prefix>.+)_caller_(?P<n>\d+)$")
+REQUIRED_ARC_FIELDS = ("arcId", "topic", "legitimacy", "arcLines")
+REQUIRED_VERN_FIELDS = ("lineType", "lines")
+
+
+@dataclass
+class Diagnostic:
+    file: str
+    severity: str           # "error" or "warning"
+    code: str               # Stable, machine-readable rule name
+    message: str
+    line_id: Optional[str] = None
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.md5(path.read_bytes()).hexdigest()
+
+
+def list_field(data: dict, field: str, where: str, file: str, diags: List[Diagnostic]) -> list:
+    """data[field] if it is a list (or absent), else [] with an invalid-structure error"""
+    value = data.get(field, [])
+    if not isinstance(value, list):
+        diags.append(Diagnostic(file, "error", "invalid-structure",
+                                f"{where}'{field}' is a {type(value).__name__}, expected a list"))
+        return []
+    return value
+
+
+def object_items(items: list, where: str, file: str, diags: List[Diagnostic]) -> List[dict]:
+    """The dicts in `items`, with an invalid-structure error for anything else"""
+    objects = []
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            objects.append(item)
+        else:
+            diags.append(Diagnostic(file, "error", "invalid-structure",
+                                    f"{where}[{i}] is a {type(item).__name__}, expected an object"))
+    return objects
+
+
+def check_line_text(line: dict, file: str, diags: List[Diagnostic]) -> str:
+    """Check a line's id and text; returns its id ("" if missing or not a string)"""
+    line_id = line.get("id")
+    if line_id is not None and not isinstance(line_id, str):
+        diags.append(Diagnostic(file, "error", "invalid-id",
+                                f"id {line_id!r} is a {type(line_id).__name__}, expected a string"))
+        line_id = None
+    elif not line_id:
+        diags.append(Diagnostic(file, "error", "missing-id", "Line has no id"))
+    for field in ("text", "voiceText"):
+        value = line.get(field)
+        if not isinstance(value, str) or not value.strip():
+            diags.append(Diagnostic(file, "error", f"empty-{field.lower()}",
+                                    f"Line has no {field}", line_id))
+    return line_id or ""
+
+
+def line_mood(line: dict, line_id: str, file: str, diags: List[Diagnostic]) -> Optional[str]:
+    """A line's mood, or None (with an invalid-structure error) if it isn't a string"""
+    mood = line.get("mood")
+    if mood is not None and not isinstance(mood, str):
+        diags.append(Diagnostic(file, "error", "invalid-structure",
+                                f"mood is a {type(mood).__name__}, expected a string", line_id or None))
+        return None
+    return mood
+
+
+def check_duplicates(ids: List[str], file: str, diags: List[Diagnostic]):
+    for line_id, count in Counter(ids).items():
+        if count > 1:
+            diags.append(Diagnostic(file, "error", "duplicate-id",
+                                    f"id appears {count} times in this file", line_id))
+
+
+def validate_arc(data: dict, file: str) -> Tuple[List[Diagnostic], dict]:
+    diags: List[Diagnostic] = []
+    for field in REQUIRED_ARC_FIELDS:
+        if field not in data:
+            diags.append(Diagnostic(file, "error", "missing-field", f"Arc has no '{field}'"))
+
+    ids: List[str] = []
+    prefixes = Counter()
+    group_moods: List[List[str]] = []
+    groups = list_field(data, "arcLines", "", file, diags)
+    for g, group in enumerate(groups):
+        if not isinstance(group, dict):
+            diags.append(Diagnostic(file, "error", "invalid-structure",
+                                    f"arcLines[{g}] is a {type(group).__name__}, expected an object"))
+            continue
+        speaker = group.get("speaker")
+        lines = object_items(list_field(group, "lines", f"arcLines[{g}] ", file, diags),
+                             f"arcLines[{g}].lines", file, diags)
+        if speaker not in ("vern", "caller"):
+            diags.append(Diagnostic(file, "error", "bad-speaker",
+                                    f"arcLines[{g}] has speaker {speaker!r}"))
+        if not lines:
+            diags.append(Diagnostic(file, "error", "empty-group", f"arcLines[{g}] has no lines"))
+
+        moods = []
+        for line in lines:
+            line_id = check_line_text(line, file, diags)
+            ids.append(line_id)
+            pattern = VERN_ID if speaker == "vern" else CALLER_ID
+            match = pattern.match(line_id)
+            if not match:
+                expected = "{arc}_vern_{mood}_{n}" if speaker == "vern" else "{arc}_caller_{n}"
+                diags.append(Diagnostic(file, "error", "bad-id",
+                                        f"id doesn't match {expected}", line_id or None))
+                continue
+            prefixes[match.group("prefix")] += 1
+            if speaker == "vern":
+                mood = line_mood(line, line_id, file, diags)
+                if not mood:
+                    diags.append(Diagnostic(file, "error", "missing-mood", "Vern line has no mood", line_id))
+                elif mood != match.group("mood"):
+                    diags.append(Diagnostic(file, "error", "mood-mismatch",
+                                            f"mood is '{mood}' but the id says '{match.group('mood')}'",
+                                            line_id))
+                moods.append(mood or match.group("mood"))
+        if speaker == "vern":
+            group_moods.append(moods)
+
+    check_duplicates(ids, file, diags)
+
+    if len(prefixes) > 1:
+        main_prefix = prefixes.most_common(1)[0][0]
+        for prefix in prefixes:
+            if prefix != main_prefix:
+                diags.append(Diagnostic(file, "error", "inconsistent-prefix",
+                                        f"{prefixes[prefix]} id(s) use prefix '{prefix}', "
+                                        f"the rest use '{main_prefix}'"))
+
+    # Every Vern group should offer the same moods, once each
+    all_moods = sorted({m for moods in group_moods for m in moods})
+    for g, moods in enumerate(group_moods):
+        repeated = sorted(m for m, count in Counter(moods).items() if count > 1)
+        missing = sorted(set(all_moods) - set(moods))
+        if repeated:
+            diags.append(Diagnostic(file, "error", "repeated-mood",
+                                    f"Vern group {g + 1} repeats mood(s): {', '.join(repeated)}"))
+        if missing:
+            diags.append(Diagnostic(file, "error", "mood-coverage",
+                                    f"Vern group {g + 1} is missing mood(s): {', '.join(missing)}"))
+
+    return diags, {"ids": ids, "moods": all_moods}
+
+
+def validate_vern(data: dict, file: str) -> Tuple[List[Diagnostic], dict]:
+    diags: List[Diagnostic] = []
+    for field in REQUIRED_VERN_FIELDS:
+        if field not in data:
+            diags.append(Diagnostic(file, "error", "missing-field", f"Vern file has no '{field}'"))
+    ids = []
+    for line in object_items(list_field(data, "lines", "", file, diags), "lines", file, diags):
+        line_id = check_line_text(line, file, diags)
+        ids.append(line_id)
+        if not line_mood(line, line_id, file, diags):
+            diags.append(Diagnostic(file, "error", "missing-mood", "Vern line has no mood", line_id or None))
+    check_duplicates(ids, file, diags)
+    return diags, {"ids": ids, "moods": None}
+
+
+def validate_file(path: str, kind: str, rel: str) -> dict:
+    """Worker: validate one file. Returns a picklable cache entry."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        diags, facts = [Diagnostic(rel, "error", "invalid-json", str(e))], {"ids": [], "moods": None}
+    else:
+        if isinstance(data, dict):
+            validate = validate_arc if kind == "arc" else validate_vern
+            diags, facts = validate(data, rel)
+        else:
+            diags = [Diagnostic(rel, "error", "invalid-structure",
+                                f"Top level is a JSON {type(data).__name__}, expected an object")]
+            facts = {"ids": [], "moods": None}
+    return {"diagnostics": [asdict(d) for d in diags], "facts": facts}
+
+
+def check_tree(entries: Dict[str, dict], kinds: Dict[str, str]) -> List[Diagnostic]:
+    """Rules that need every file: cross-file ids and arc mood coverage."""
+    diags: List[Diagnostic] = []
+
+    owners: Dict[str, List[str]] = {}
+    for rel, entry in entries.items():
+        for line_id in set(entry["facts"]["ids"]):
+            if line_id:
+                owners.setdefault(line_id, []).append(rel)
+    for line_id, files in sorted(owners.items()):
+        if len(files) > 1:
+            for rel in sorted(files):
+                others = ", ".join(f for f in sorted(files) if f != rel)
+                diags.append(Diagnostic(rel, "error", "duplicate-id-across-files",
+                                        f"id also used in {others}", line_id))
+
+    mood_sets = Counter(tuple(entry["facts"]["moods"]) for rel, entry in entries.items()
+                        if kinds[rel] == "arc" and entry["facts"]["moods"])
+    if mood_sets:
+        expected = set(mood_sets.most_common(1)[0][0])
+        for rel, entry in sorted(entries.items()):
+            moods = entry["facts"]["moods"]
+            if kinds[rel] != "arc" or moods is None:
+                continue
+            missing = sorted(expected - set(moods))
+            if missing:
+                diags.append(Diagnostic(rel, "error", "arc-mood-coverage",
+                                        f"Arc is missing mood(s) most arcs have: {', '.join(missing)}"))
+            extra = sorted(set(moods) - expected)
+            if extra:
+                diags.append(Diagnostic(rel, "warning", "arc-extra-moods",
+                                        f"Arc has mood(s) most arcs don't: {', '.join(extra)}"))
+    return diags
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == VALIDATOR_VERSION:
+            return data.get("files", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {}
+
+
+def save_cache(path: Path, files: dict):
+    tmp_path = path.with_suffix(".part")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": VALIDATOR_VERSION, "files": files}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def validate_dialogue(dialogue_dir: Path = DIALOGUE_DIR, use_cache: bool = True,
+                      workers: Optional[int] = None) -> Tuple[List[Diagnostic], dict]:
+    """Validate the tree. Returns (diagnostics, stats)."""
+    targets = [(p, "arc") for p in arc_files(dialogue_dir)] + [(p, "vern") for p in vern_files(dialogue_dir)]
+    cache = load_cache(CACHE_PATH) if use_cache else {}
+
+    entries: Dict[str, dict] = {}
+    kinds: Dict[str, str] = {}
+    pending = []
+    for path, kind in targets:
+        rel = Path(os.path.relpath(path, REPO_ROOT)).as_posix()
+        kinds[rel] = kind
+        st = path.stat()
+        cached = cache.get(rel)
+        # mtime + size avoids even reading the file; the hash catches touched-but-same files
+        if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+            entries[rel] = cached
+            continue
+        digest = file_hash(path)
+        if cached and cached["hash"] == digest:
+            cached.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+            entries[rel] = cached
+            continue
+        pending.append((str(path), kind, rel, digest, st))
+
+    if len(pending) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(validate_file, *zip(*[(p, k, r) for p, k, r, _, _ in pending])))
+    else:
+        results = [validate_file(p, k, r) for p, k, r, _, _ in pending]
+
+    for (_, _, rel, digest, st), result in zip(pending, results):
+        entries[rel] = dict(result, hash=digest, mtime_ns=st.st_mtime_ns, size=st.st_size)
+
+    if use_cache:
+        save_cache(CACHE_PATH, entries)
+
+    diags = [Diagnostic(**d) for entry in entries.values() for d in entry["diagnostics"]]
+    diags.extend(check_tree(entries, kinds))
+    diags.sort(key=lambda d: (d.file, d.line_id or "", d.code))
+    return diags, {"files": len(targets), "checked": len(pending), "cached": len(targets) - len(pending)}
+
+
+def print_report(diags: List[Diagnostic], stats: dict, elapsed: float):
+    current = None
+    for d in diags:
+        if d.file != current:
+            current = d.file
+            print(current)
+        where = f" [{d.line_id}]" if d.line_id else ""
+        print(f"  {d.severity.upper():<7} {d.code}{where}: {d.message}")
+    errors = sum(1 for d in diags if d.severity == "error")
+    warnings = len(diags) - errors
+    if diags:
+        print()
+    print(f"{stats['files']} files ({stats['checked']} checked, {stats['cached']} cached) "
+          f"in {elapsed * 1000:.0f} ms: {errors} error(s), {warnings} warning(s)")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate the dialogue JSON in assets/dialogue")
+    parser.add_argument("--json", action="store_true", help="Print diagnostics as JSON")
+    parser.add_argument("--output", type=Path, help="Also write the JSON diagnostics to this file")
+    parser.add_argument("--no-cache", action="store_true", help="Re-check every file")
+    parser.add_argument("--strict", action="store_true", help="Fail on warnings too")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    diags, stats = validate_dialogue(use_cache=not args.no_cache, workers=args.workers)
+    elapsed = time.monotonic() - start
+
+    report = {
+        "version": VALIDATOR_VERSION,
+        "stats": stats,
+        "errors": sum(1 for d in diags if d.severity == "error"),
+        "warnings": sum(1 for d in diags if d.severity == "warning"),
+        "diagnostics": [asdict(d) for d in diags]
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(diags, stats, elapsed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = report["errors"] or (args.strict and report["warnings"])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Shared helpers for the KBTV asset tools
+
+Scripts in the sibling tool folders put Tools/ on sys.path and import from here:
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from common.dialogue import load_catalog
+"""
@@ -0,0 +1,274 @@
+"""
+Audio duration and format from file headers, without decoding
+
+- MP3: the first valid frame header (after any ID3v2 tag), then a Xing/Info
+  tag (frame count, plus LAME encoder delay/padding for gapless length) or a
+  VBRI tag; plain CBR files are measured from the audio byte count
+- OGG: the Vorbis or Opus identification header on the first page and the
+  granule position of the stream's last page
+- WAV: the `fmt ` and `data` chunks
+
+Reads at most a few KB from each end of a file.
+"""
+
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+
+class HeaderError(Exception):
+    """A file's headers couldn't be parsed."""
+
+
+@dataclass
+class AudioHeader:
+    format: str             # "mp3", "ogg" (vorbis/opus) or "wav"
+    duration: float         # Seconds
+    sample_rate: int
+    channels: int
+    bitrate: int            # Average kbit/s
+    method: str             # How the duration was found: xing, lame, vbri, cbr, granule, wav
+
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64 * 1024
+
+# MPEG audio tables, indexed [version][layer] / [version]; version: 0 = MPEG1, 1 = MPEG2, 2 = MPEG2.5
+MPEG_VERSIONS = {0b11: 0, 0b10: 1, 0b00: 2}
+MPEG_LAYERS = {0b11: 1, 0b10: 2, 0b01: 3}
+MPEG_SAMPLE_RATES = ((44100, 48000, 32000), (22050, 24000, 16000), (11025, 12000, 8000))
+MPEG1_BITRATES = {
+    1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+}
+MPEG2_BITRATES = {
+    1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+
+@dataclass
+class MPEGFrame:
+    version: int
+    layer: int
+    bitrate: int        # kbit/s
+    sample_rate: int
+    padding: int
+    channels: int
+
+    @property
+    def samples(self) -> int:
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and self.version != 0:
+            return 576
+        return 1152
+
+    @property
+    def length(self) -> int:
+        """Frame size in bytes, header included"""
+        if self.layer == 1:
+            return (12 * self.bitrate * 1000 // self.sample_rate + self.padding) * 4
+        return self.samples // 8 * self.bitrate * 1000 // self.sample_rate + self.padding
+
+    @property
+    def side_info(self) -> int:
+        """Bytes between the 4-byte header and a Xing tag (layer III side info)"""
+        if self.version == 0:
+            return 17 if self.channels == 1 else 32
+        return 9 if self.channels == 1 else 17
+
+
+def parse_frame_header(data: bytes, offset: int) -> Optional[MPEGFrame]:
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = MPEG_VERSIONS.get((b1 >> 3) & 0b11)
+    layer = MPEG_LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 0b11
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # Free-format (0) isn't supported; 15 and rate 3 are invalid
+    table = MPEG1_BITRATES if version == 0 else MPEG2_BITRATES
+    return MPEGFrame(version=version, layer=layer, bitrate=table[layer][bitrate_index],
+                     sample_rate=MPEG_SAMPLE_RATES[version][rate_index],
+                     padding=(b2 >> 1) & 1, channels=1 if (b3 >> 6) == 0b11 else 2)
+
+
+def id3v2_size(data: bytes) -> int:
+    """Bytes taken by an ID3v2 tag at the start of `data` (0 if none)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)  # Syncsafe integer
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def find_first_frame(data: bytes, start: int = 0) -> Tuple[int, MPEGFrame]:
+    """Offset and header of the first frame whose successor also parses (rules out false syncs)"""
+    offset = data.find(b"\xff", start)
+    while offset != -1 and offset + 4 <= len(data):
+        frame = parse_frame_header(data, offset)
+        if frame is not None:
+            following = offset + frame.length
+            if following + 4 > len(data) or parse_frame_header(data, following) is not None:
+                return offset, frame
+        offset = data.find(b"\xff", offset + 1)
+    raise HeaderError("No MPEG audio frame found")
+
+
+def read_head_tail(f: BinaryIO, size: int) -> Tuple[bytes, bytes]:
+    head = f.read(min(size, HEAD_BYTES))
+    if size <= HEAD_BYTES:
+        return head, head
+    f.seek(max(0, size - TAIL_BYTES))
+    return head, f.read()
+
+
+def mp3_header(f: BinaryIO, size: int) -> AudioHeader:
+    head, tail = read_head_tail(f, size)
+    base = id3v2_size(head)
+    if base:
+        # Skip the ID3v2 tag (it may hold cover art far bigger than HEAD_BYTES)
+        f.seek(base)
+        head = f.read(HEAD_BYTES)
+    offset, frame = find_first_frame(head)
+
+    # A trailing ID3v1 tag isn't audio
+    audio_end = size - 128 if tail[-128:-125] == b"TAG" else size
+
+    xing = offset + 4 + frame.side_info
+    vbri = offset + 4 + 32
+    if head[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", head[xing + 4:xing + 8])[0]
+        pos = xing + 8
+        frames = audio_bytes = None
+        if flags & 0x1:
+            frames = struct.unpack(">I", head[pos:pos + 4])[0]
+            pos += 4
+        if flags & 0x2:
+            audio_bytes = struct.unpack(">I", head[pos:pos + 4])[0]
+            pos += 4
+        pos += 100 if flags & 0x4 else 0    # Seek table
+        pos += 4 if flags & 0x8 else 0      # Quality
+        if frames:
+            samples = frames * frame.samples
+            method = "xing"
+            # LAME tag: 9-byte version string, then delay/padding 21 bytes in (12 bits each)
+            if head[pos:pos + 4] in (b"LAME", b"Lavc", b"Lavf") and pos + 24 <= len(head):
+                b0, b1, b2 = head[pos + 21:pos + 24]
+                delay, padding = (b0 << 4) | (b1 >> 4), ((b1 & 0x0F) << 8) | b2
+                if delay + padding < samples:
+                    samples -= delay + padding
+                    method = "lame"
+            duration = samples / frame.sample_rate
+            audio_bytes = audio_bytes or (audio_end - base - offset)
+            return AudioHeader("mp3", duration, frame.sample_rate, frame.channels,
+                               round(audio_bytes * 8 / duration / 1000) if duration else frame.bitrate,
+                               method)
+    if head[vbri:vbri + 4] == b"VBRI":
+        audio_bytes, frames = struct.unpack(">II", head[vbri + 10:vbri + 18])
+        duration = frames * frame.samples / frame.sample_rate
+        return AudioHeader("mp3", duration, frame.sample_rate, frame.channels,
+                           round(audio_bytes * 8 / duration / 1000) if duration else frame.bitrate,
+                           "vbri")
+
+    # No tag: assume constant bitrate
+    duration = (audio_end - base - offset) * 8 / (frame.bitrate * 1000)
+    return AudioHeader("mp3", duration, frame.sample_rate, frame.channels, frame.bitrate, "cbr")
+
+
+def ogg_page(data: bytes, offset: int) -> Tuple[int, int, int, int]:
+    """(header type, granule position, serial, page length) of the page at `offset`"""
+    if data[offset:offset + 4] != b"OggS" or offset + 27 > len(data):
+        raise HeaderError("Not an Ogg page")
+    header_type, granule, serial = struct.unpack("<BqI", data[offset + 5:offset + 18])
+    segments = data[offset + 26]
+    table = data[offset + 27:offset + 27 + segments]
+    return header_type, granule, serial, 27 + segments + sum(table)
+
+
+def ogg_header(f: BinaryIO, size: int) -> AudioHeader:
+    head, tail = read_head_tail(f, size)
+    _type, _granule, serial, _length = ogg_page(head, 0)
+    packet = head[27 + head[26]:]
+    if packet[:7] == b"\x01vorbis":
+        channels, sample_rate = struct.unpack("<BI", packet[11:16])
+        granule_rate, pre_skip = sample_rate, 0
+    elif packet[:8] == b"OpusHead":
+        channels, pre_skip, sample_rate = struct.unpack("<BHI", packet[9:16])
+        granule_rate = 48000  # Opus granules always count 48 kHz samples
+        sample_rate = sample_rate or 48000
+    else:
+        raise HeaderError("Unsupported Ogg codec (expected Vorbis or Opus)")
+
+    # Last page of this logical stream: scan the tail backwards for a capture pattern
+    granule = -1
+    offset = tail.rfind(b"OggS")
+    while offset != -1:
+        try:
+            _type, page_granule, page_serial, _length = ogg_page(tail, offset)
+        except (HeaderError, struct.error, IndexError):
+            page_granule, page_serial = -1, None
+        if page_serial == serial and page_granule >= 0:
+            granule = page_granule
+            break
+        offset = tail.rfind(b"OggS", 0, offset)
+    if granule < 0:
+        raise HeaderError("No Ogg page with a granule position in the last "
+                          f"{TAIL_BYTES // 1024} KB")
+    duration = max(0, granule - pre_skip) / granule_rate
+    bitrate = round(size * 8 / duration / 1000) if duration else 0
+    return AudioHeader("ogg", duration, sample_rate, channels, bitrate, "granule")
+
+
+def wav_header(f: BinaryIO, size: int) -> AudioHeader:
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] not in (b"RIFF", b"RF64") or riff[8:12] != b"WAVE":
+        raise HeaderError("Not a RIFF/WAVE file")
+    fmt = None
+    position = 12
+    while position + 8 <= size:
+        f.seek(position)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise HeaderError("WAV data chunk before fmt chunk")
+            _tag, channels, sample_rate, byte_rate, block_align, _bits = fmt
+            # Streaming writers leave the size at 0 / 0xFFFFFFFF; the rest of the file is audio
+            available = size - position - 8
+            data_size = available if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, available)
+            # Trust block_align over byte_rate: players count frames, and some writers
+            # get byte_rate wrong (silence_4sec.wav declares twice its real rate)
+            if block_align:
+                duration = data_size // block_align / sample_rate if sample_rate else 0.0
+                byte_rate = sample_rate * block_align
+            else:
+                duration = data_size / byte_rate if byte_rate else 0.0
+            return AudioHeader("wav", duration, sample_rate, channels, round(byte_rate * 8 / 1000), "wav")
+        position += 8 + chunk_size + (chunk_size & 1)  # Chunks are word-aligned
+    raise HeaderError("No WAV data chunk")
+
+
+READERS = {".mp3": mp3_header, ".ogg": ogg_header, ".wav": wav_header}
+
+
+def read_header(path: Path) -> AudioHeader:
+    """Duration and format of an .mp3/.ogg/.wav file from its headers alone."""
+    path = Path(path)
+    reader = READERS.get(path.suffix.lower())
+    if reader is None:
+        raise HeaderError(f"Unsupported audio format: {path.suffix}")
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        try:
+            return reader(f, size)
+        except (struct.error, IndexError, ValueError) as e:
+            raise HeaderError(f"Truncated or corrupt header: {e}") from e
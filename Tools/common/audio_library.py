@@ -0,0 +1,124 @@
+"""
+The game's audio library as the analysis tools see it
+
+Every audio file under assets/audio plus the processed ad and bumper OGGs,
+each tagged with a category (voice, ads, bumpers, music, sfx, other), the
+subset the game actually plays (a transcoded OGG over its master), and a
+content-hash table that only re-hashes files whose mtime or size changed.
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from common.loudness import file_hash
+from common.paths import AD_AUDIO_DIR, AUDIO_DIR, BUMPER_AUDIO_DIR, REPO_ROOT
+
+AUDIO_EXTENSIONS = (".mp3", ".ogg", ".wav")
+TRANSCODED_EXTENSION = ".ogg"  # transcode_voice.py output, what the game plays over the master
+CATEGORIES = ("voice", "ads", "bumpers", "music", "sfx", "other")
+
+# Root -> category for files that aren't sorted by their first folder
+LIBRARY_ROOTS = {
+    AUDIO_DIR: None,
+    AD_AUDIO_DIR: "ads",
+    BUMPER_AUDIO_DIR: "bumpers",
+}
+
+
+@dataclass(frozen=True)
+class LibraryFile:
+    path: Path
+    rel: str        # Repo-relative, forward slashes (stable cache key)
+    category: str
+
+
+def is_temp_file(name: str) -> bool:
+    """Partial writes left by the generators (.part, .tmp.mp3, .link, ...)"""
+    return name.startswith(".") or ".tmp." in name or name.endswith(".part")
+
+
+def category_for(root_category: Optional[str], rel_to_root: str) -> str:
+    if root_category:
+        return root_category
+    top = rel_to_root.split("/", 1)[0].lower()
+    return top if top in CATEGORIES else "other"
+
+
+def library_files(roots: Optional[Dict[Path, Optional[str]]] = None,
+                  extensions: Iterable[str] = AUDIO_EXTENSIONS) -> List[LibraryFile]:
+    """Every audio file under the library roots, sorted by path."""
+    extensions = tuple(extensions)
+    files = {}
+    for root, root_category in (roots or LIBRARY_ROOTS).items():
+        root = Path(root)
+        if not root.is_dir():
+            continue
+        for dirpath, _dirnames, names in os.walk(root):
+            for name in names:
+                if not name.lower().endswith(extensions) or is_temp_file(name):
+                    continue
+                path = Path(dirpath) / name
+                rel_to_root = path.relative_to(root).as_posix()
+                rel = Path(os.path.relpath(path, REPO_ROOT)).as_posix()
+                # Roots may nest (e.g. an output dir under assets/audio); the first wins
+                files.setdefault(rel, LibraryFile(path, rel, category_for(root_category, rel_to_root)))
+    return [files[rel] for rel in sorted(files)]
+
+
+def played_files(files: List[LibraryFile]) -> List[LibraryFile]:
+    """Drop masters whose transcoded sibling is also in `files`.
+
+    The game plays `line.ogg` when it exists and `line.mp3` only as a fallback,
+    so the pair is one line, not two copies of it.
+    """
+    rels = {file.rel for file in files}
+    return [file for file in files
+            if file.path.suffix.lower() == TRANSCODED_EXTENSION
+            or Path(file.rel).with_suffix(TRANSCODED_EXTENSION).as_posix() not in rels]
+
+
+class ContentHashes:
+    """rel path -> md5 of the file, trusting mtime + size for files seen before.
+
+    Stored as JSON next to the tool that owns it; call save() when done.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: Dict[str, dict] = {}
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("files", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def hash(self, file: LibraryFile) -> str:
+        st = file.path.stat()
+        entry = self._entries.get(file.rel)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry["hash"]
+        digest = file_hash(file.path)
+        self._entries[file.rel] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "hash": digest}
+        self._dirty = True
+        return digest
+
+    def prune(self, keep: Iterable[str]):
+        """Forget files that are no longer in the library."""
+        keep = set(keep)
+        for rel in [rel for rel in self._entries if rel not in keep]:
+            del self._entries[rel]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": self._entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
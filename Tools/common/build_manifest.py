@@ -0,0 +1,109 @@
+"""
+Make-style dependency tracking for processed audio outputs
+
+Each output records the content hash of the input it was built from and the
+encode settings used. An output is current when both still match and the file
+is still there, so `process` can skip it instead of re-encoding (and making
+Godot re-import it).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from common import profiling
+from common.loudness import file_hash
+
+MANIFEST_VERSION = 1
+
+
+def settings_hash(settings: dict) -> str:
+    """Stable hash of an encode settings dict."""
+    return hashlib.md5(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class BuildManifest:
+    """output path -> (input name, input hash, settings hash), stored as JSON.
+
+    Output paths are stored relative to `output_root`. Safe to update from
+    worker threads; call save() once the batch is done.
+    """
+
+    def __init__(self, path: Path, output_root: Path):
+        self.path = Path(path)
+        self.output_root = Path(output_root)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self._entries = data.get("outputs", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def _key(self, output_path: Path) -> str:
+        return Path(output_path).relative_to(self.output_root).as_posix()
+
+    def is_current(self, output_path: Path, input_hash: str, settings: dict) -> bool:
+        """True if `output_path` exists and was built from this input with these settings."""
+        with self._lock:
+            entry = self._entries.get(self._key(output_path))
+        return (entry is not None
+                and entry["input_hash"] == input_hash
+                and entry["settings"] == settings_hash(settings)
+                and Path(output_path).exists())
+
+    def plan(self, tasks: Iterable[Tuple[Path, Path]], settings: dict,
+             rebuild: bool = False) -> Tuple[List[Tuple[Path, Path, str]], int]:
+        """Split (input, output) pairs into work to do and a count of current outputs.
+
+        Returns ([(input, output, input_hash), ...], up_to_date_count).
+        `rebuild` treats every output as out of date.
+        """
+        pending = []
+        up_to_date = 0
+        for input_path, output_path in tasks:
+            input_hash = file_hash(input_path)
+            if not rebuild and self.is_current(output_path, input_hash, settings):
+                up_to_date += 1
+            else:
+                pending.append((input_path, output_path, input_hash))
+        return pending, up_to_date
+
+    def record(self, output_path: Path, input_path: Path, input_hash: str, settings: dict):
+        with self._lock:
+            self._entries[self._key(output_path)] = {
+                "input": Path(input_path).name,
+                "input_hash": input_hash,
+                "settings": settings_hash(settings)
+            }
+            self._dirty = True
+
+    def stale_outputs(self, input_names: Iterable[str]) -> List[Tuple[str, str]]:
+        """(output, input) pairs whose input is gone but whose output still exists."""
+        input_names = set(input_names)
+        with self._lock:
+            entries = dict(self._entries)
+        stale = []
+        for output, entry in sorted(entries.items()):
+            if entry["input"] not in input_names and (self.output_root / output).exists():
+                stale.append((output, entry["input"]))
+        return stale
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": MANIFEST_VERSION, "outputs": self._entries}
+            with profiling.stage("disk_write"):
+                fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".part")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            self._dirty = False
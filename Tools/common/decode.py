@@ -0,0 +1,84 @@
+"""
+Decode audio files to NumPy buffers (and back) through ffmpeg pipes
+
+Samples are float32 in [-1, 1], shape (frames,) for mono or (frames, channels).
+"""
+
+import json
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from common import profiling
+
+
+class DecodeError(Exception):
+    """ffmpeg/ffprobe couldn't read or write a file."""
+
+
+@dataclass
+class AudioInfo:
+    sample_rate: int
+    channels: int
+    duration: float
+    codec: str
+
+
+def probe_audio(path: Path) -> AudioInfo:
+    """Sample rate, channel count, duration and codec of the first audio stream."""
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "a:0",
+        "-show_entries", "stream=sample_rate,channels,codec_name:format=duration",
+        "-of", "json", str(path)
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise DecodeError(result.stderr.decode("utf-8", errors="replace").strip())
+    data = json.loads(result.stdout)
+    if not data.get("streams"):
+        raise DecodeError(f"No audio stream in {path}")
+    stream = data["streams"][0]
+    return AudioInfo(sample_rate=int(stream["sample_rate"]), channels=int(stream["channels"]),
+                     duration=float(data.get("format", {}).get("duration", 0.0)),
+                     codec=stream.get("codec_name", ""))
+
+
+def decode_audio(path: Path, sample_rate: int, channels: int = 1) -> np.ndarray:
+    """Decode `path` to float32 samples at `sample_rate` with `channels` channels."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error",
+        "-i", str(path), "-vn",
+        "-ac", str(channels), "-ar", str(sample_rate),
+        "-f", "f32le", "pipe:1"
+    ]
+    with profiling.stage("transcode"):
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise DecodeError(result.stderr.decode("utf-8", errors="replace").strip())
+    samples = np.frombuffer(result.stdout, dtype="<f4")
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+    return samples
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, output_path: Path,
+                 codec_args: Optional[List[str]] = None):
+    """Encode float32 samples to `output_path`; the container follows its extension.
+
+    `codec_args` are ffmpeg output options, e.g. ["-c:a", "libmp3lame", "-q:a", "2"].
+    """
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error", "-y",
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+        *(codec_args or []),
+        str(output_path)
+    ]
+    data = np.ascontiguousarray(np.clip(samples, -1.0, 1.0), dtype="<f4").tobytes()
+    with profiling.stage("transcode"):
+        result = subprocess.run(cmd, input=data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise DecodeError(result.stderr.decode("utf-8", errors="replace").strip())
@@ -0,0 +1,148 @@
+"""
+Dialogue catalog loader
+
+Reads every conversation arc (assets/dialogue/arcs/{Topic}/*.json) and every
+Vern line-type file (assets/dialogue/vern/*.json) into flat DialogueLine
+records, including where the game expects each line's audio to live.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from common import profiling
+from common.paths import ARCS_DIR, DIALOGUE_DIR, VERN_DIALOGUE_DIR
+
+# Voice lines live under res://assets/audio/voice/ using these layouts
+# (see AudioDialoguePlayer / DialogueExecutable / BroadcastStateMachine)
+ARC_VERN_AUDIO_DIR = "Vern/ConversationArcs"
+ARC_CALLER_AUDIO_DIR = "Callers"
+BROADCAST_AUDIO_DIR = "Vern/Broadcast"
+
+
+@dataclass(frozen=True)
+class DialogueLine:
+    """One voiced line from the dialogue catalog"""
+    line_id: str
+    speaker: str            # "vern" or "caller"
+    text: str
+    voice_text: str
+    mood: str
+    topic: str              # Topic folder, e.g. "UFOs" (empty for topic-less Vern lines)
+    source: str             # "arc" or "vern"
+    group: str              # Arc folder (arcId) or Vern line type, e.g. "pilot" / "openings"
+    arc_prefix: str         # Line-id prefix for arcs, e.g. "ufos_compelling_pilot"
+    legitimacy: str
+    source_file: str
+
+    @property
+    def audio_path(self) -> str:
+        """Audio path relative to assets/audio/voice, as the game loads it"""
+        if self.source == "vern":
+            return f"{BROADCAST_AUDIO_DIR}/{self.line_id}.mp3"
+        base = ARC_VERN_AUDIO_DIR if self.speaker == "vern" else ARC_CALLER_AUDIO_DIR
+        return f"{base}/{self.topic}/{self.group}/{self.line_id}.mp3"
+
+
+def load_json(path: Path) -> dict:
+    """Load a dialogue JSON file"""
+    with profiling.stage("json_load"), open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_arc_lines(arc_data: dict) -> Iterator[dict]:
+    """Yield every line in an arc, flattening the `arcLines` speaker groups"""
+    for line in arc_data.get("lines", []):
+        yield line
+    for group in arc_data.get("arcLines", []):
+        for line in group.get("lines", []):
+            yield dict(line, speaker=line.get("speaker", group.get("speaker", "")))
+
+
+def arc_prefix_from_id(line_id: str) -> str:
+    """`ufos_compelling_pilot_vern_neutral_1` -> `ufos_compelling_pilot`"""
+    for marker in ("_vern_", "_caller_"):
+        if marker in line_id:
+            return line_id.split(marker)[0]
+    return ""
+
+
+def load_arc_file(path: Path) -> List[DialogueLine]:
+    """Flatten one conversation arc JSON"""
+    path = Path(path)
+    arc_data = load_json(path)
+    topic = arc_data.get("topic") or path.parent.name
+    group = arc_data.get("arcId") or path.stem
+    lines = []
+    for line in iter_arc_lines(arc_data):
+        line_id = line.get("id", "")
+        text = line.get("text", "")
+        lines.append(DialogueLine(
+            line_id=line_id,
+            speaker=line.get("speaker", "").lower(),
+            text=text,
+            voice_text=line.get("voiceText") or text,
+            mood=line.get("mood", ""),
+            topic=topic,
+            source="arc",
+            group=group,
+            arc_prefix=arc_prefix_from_id(line_id),
+            legitimacy=arc_data.get("legitimacy", ""),
+            source_file=str(path)
+        ))
+    return lines
+
+
+def load_vern_file(path: Path) -> List[DialogueLine]:
+    """Flatten one Vern line-type JSON (openings, closings, dead-air-fillers, ...)"""
+    path = Path(path)
+    data = load_json(path)
+    line_type = data.get("lineType") or path.stem
+    lines = []
+    for line in data.get("lines", []):
+        text = line.get("text", "")
+        lines.append(DialogueLine(
+            line_id=line.get("id", ""),
+            speaker="vern",
+            text=text,
+            voice_text=line.get("voiceText") or text,
+            mood=line.get("mood", "neutral"),
+            topic=line.get("topic", ""),
+            source="vern",
+            group=line_type,
+            arc_prefix="",
+            legitimacy="",
+            source_file=str(path)
+        ))
+    return lines
+
+
+def arc_files(dialogue_dir: Path = DIALOGUE_DIR) -> List[Path]:
+    return sorted((Path(dialogue_dir) / ARCS_DIR.name).glob("*/*.json"))
+
+
+def vern_files(dialogue_dir: Path = DIALOGUE_DIR) -> List[Path]:
+    return sorted((Path(dialogue_dir) / VERN_DIALOGUE_DIR.name).glob("*.json"))
+
+
+def load_catalog(dialogue_dir: Path = DIALOGUE_DIR, include_arcs: bool = True,
+                 include_vern: bool = True) -> List[DialogueLine]:
+    """Every voiced line in assets/dialogue, arcs first, in file order"""
+    lines = []
+    if include_arcs:
+        for path in arc_files(dialogue_dir):
+            lines.extend(load_arc_file(path))
+    if include_vern:
+        for path in vern_files(dialogue_dir):
+            lines.extend(load_vern_file(path))
+    return lines
+
+
+def find_arc_lines(arc_id: str, dialogue_dir: Path = DIALOGUE_DIR) -> Optional[List[DialogueLine]]:
+    """Lines for an arc given its line-id prefix (`ufos_compelling_pilot`) or arcId (`pilot`)"""
+    for path in arc_files(dialogue_dir):
+        lines = load_arc_file(path)
+        if any(line.arc_prefix == arc_id or line.group == arc_id for line in lines):
+            return lines
+    return None
@@ -0,0 +1,270 @@
+"""
+ffmpeg helpers shared by the Suno ad and bumper tools
+
+Runs ffmpeg with `-progress pipe:1` so each file reports how much audio it
+processed and how fast, and fans files out over a worker pool. Failures are
+collected into the results instead of printed inline. Every pass and every
+pooled task is recorded with common.metrics.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+from common import metrics, profiling
+
+T = TypeVar("T")
+
+
+@dataclass
+class FFmpegResult:
+    """Outcome of processing one file (possibly several ffmpeg passes)."""
+    label: str
+    ok: bool
+    elapsed: float = 0.0          # Wall-clock seconds spent in ffmpeg
+    media_seconds: float = 0.0    # Seconds of audio ffmpeg reported processing
+    speed: float = 0.0            # ffmpeg's realtime factor for the last pass
+    error: str = ""
+    note: str = ""                # Extra detail for the progress line (e.g. applied gain)
+
+
+def check_ffmpeg() -> bool:
+    """Check if ffmpeg is available."""
+    try:
+        subprocess.run(
+            ["ffmpeg", "-version"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True
+        )
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+
+def print_install_hint():
+    print("Error: ffmpeg not found. Install ffmpeg first.")
+    print("  Windows: choco install ffmpeg")
+    print("  Mac: brew install ffmpeg")
+    print("  Linux: sudo apt install ffmpeg")
+
+
+def default_jobs() -> int:
+    """Default worker count for -j: one ffmpeg per CPU."""
+    return os.cpu_count() or 1
+
+
+def parse_progress_line(line: str, progress: Dict[str, str]) -> bool:
+    """Fold one `key=value` line of ffmpeg -progress output into `progress`.
+
+    Returns True when ffmpeg reports `progress=end`.
+    """
+    key, sep, value = line.strip().partition("=")
+    if not sep:
+        return False
+    progress[key] = value
+    return key == "progress" and value == "end"
+
+
+def _media_seconds(progress: Dict[str, str]) -> float:
+    # out_time_us is authoritative; older builds mislabel it as out_time_ms (also microseconds)
+    for key in ("out_time_us", "out_time_ms"):
+        try:
+            return max(0.0, int(progress[key]) / 1_000_000)
+        except (KeyError, ValueError):
+            continue
+    return 0.0
+
+
+def _speed(progress: Dict[str, str]) -> float:
+    try:
+        return float(progress.get("speed", "").rstrip("x"))
+    except ValueError:
+        return 0.0
+
+
+def run_ffmpeg(args: List[str], label: str) -> FFmpegResult:
+    """Run `ffmpeg <args>` with machine-readable progress on stdout.
+
+    `args` is everything after the executable name. stderr goes to a temp file
+    so a chatty ffmpeg can't fill the pipe while we read progress.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-progress", "pipe:1"] + list(args)
+    progress: Dict[str, str] = {}
+    start = time.monotonic()
+    with profiling.stage("transcode"), tempfile.TemporaryFile() as stderr:
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr,
+                                    stdin=subprocess.DEVNULL, text=True)
+        except FileNotFoundError as e:
+            return FFmpegResult(label, ok=False, error=str(e))
+        for line in proc.stdout:
+            parse_progress_line(line, progress)
+        returncode = proc.wait()
+        elapsed = time.monotonic() - start
+        error = ""
+        if returncode != 0:
+            stderr.seek(0)
+            error = stderr.read().decode("utf-8", errors="replace").strip()
+            error = error or f"ffmpeg exited with status {returncode}"
+
+    result = FFmpegResult(label, ok=returncode == 0, elapsed=elapsed,
+                          media_seconds=_media_seconds(progress), speed=_speed(progress),
+                          error=error)
+    record_pass(result, "ffmpeg")
+    return result
+
+
+def record_pass(result: FFmpegResult, mode: str):
+    metrics.event("ffmpeg", label=result.label, mode=mode, ok=result.ok,
+                  seconds=round(result.elapsed, 6), media_seconds=round(result.media_seconds, 3),
+                  speed=result.speed)
+
+
+def run_pipeline(decode_args: List[str], encode_args: List[str], label: str) -> FFmpegResult:
+    """Run two ffmpeg processes with the decoder's stdout piped into the encoder's stdin.
+
+    The decoder should write raw PCM to `pipe:1` and the encoder read it from
+    `pipe:0`; the OS pipe carries the audio, nothing touches disk. Progress
+    comes from the encoder, so media_seconds is the PCM it actually consumed.
+    """
+    decode_cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error"] + list(decode_args)
+    encode_cmd = ["ffmpeg", "-hide_banner", "-nostats", "-progress", "pipe:1"] + list(encode_args)
+    progress: Dict[str, str] = {}
+    start = time.monotonic()
+    with profiling.stage("transcode"), tempfile.TemporaryFile() as decode_err, \
+            tempfile.TemporaryFile() as encode_err:
+        try:
+            decoder = subprocess.Popen(decode_cmd, stdout=subprocess.PIPE, stderr=decode_err,
+                                       stdin=subprocess.DEVNULL)
+        except FileNotFoundError as e:
+            return FFmpegResult(label, ok=False, error=str(e))
+        try:
+            encoder = subprocess.Popen(encode_cmd, stdin=decoder.stdout, stdout=subprocess.PIPE,
+                                       stderr=encode_err, text=True)
+        except FileNotFoundError as e:
+            decoder.kill()
+            decoder.wait()
+            return FFmpegResult(label, ok=False, error=str(e))
+        # Only the encoder should hold the read end, so the decoder sees EPIPE if it dies
+        decoder.stdout.close()
+
+        for line in encoder.stdout:
+            parse_progress_line(line, progress)
+        encode_status = encoder.wait()
+        decode_status = decoder.wait()
+        elapsed = time.monotonic() - start
+
+        errors = []
+        for name, status, log in (("decode", decode_status, decode_err),
+                                  ("encode", encode_status, encode_err)):
+            if status != 0:
+                log.seek(0)
+                text = log.read().decode("utf-8", errors="replace").strip()
+                errors.append(f"{name}: {text or f'ffmpeg exited with status {status}'}")
+
+    result = FFmpegResult(label, ok=not errors, elapsed=elapsed,
+                          media_seconds=_media_seconds(progress), speed=_speed(progress),
+                          error="\n".join(errors))
+    record_pass(result, "pipeline")
+    return result
+
+
+def probe_duration(path: Path) -> Optional[float]:
+    """Container duration in seconds via ffprobe, or None if it can't be read."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        return float(result.stdout.strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def check_duration(result: FFmpegResult, input_path: Path, output_path: Path,
+                   tolerance: float = 0.1) -> FFmpegResult:
+    """Fail `result` unless the output is as long as the input (within `tolerance` seconds).
+
+    Guards against the truncated-OGG problem. Both sides are probed from their
+    containers, so a decoder that stops early can't shrink the expectation with
+    the output; a file that can't be probed fails the check rather than passing it.
+    """
+    if not result.ok:
+        return result
+    expected = probe_duration(input_path)
+    actual = probe_duration(output_path)
+    if not expected or actual is None:
+        missing = "input" if not expected else "output"
+        result.ok = False
+        result.error = f"Duration check failed: couldn't probe the {missing} duration with ffprobe"
+    elif abs(actual - expected) > tolerance:
+        result.ok = False
+        result.error = (f"Duration mismatch: output is {actual:.3f}s, "
+                        f"input is {expected:.3f}s")
+    return result
+
+
+def run_parallel(items: Iterable[T], worker: Callable[[T], FFmpegResult],
+                 jobs: Optional[int] = None) -> List[FFmpegResult]:
+    """Run `worker` over `items` on a pool of `jobs` threads.
+
+    Threads are enough: the work happens in the ffmpeg child processes. Prints
+    one line per finished file; exceptions become failed results.
+    """
+    items = list(items)
+    jobs = max(1, jobs or default_jobs())
+    results: List[FFmpegResult] = []
+    lock = threading.Lock()
+
+    def guarded(item: T, queued_at: float) -> FFmpegResult:
+        start = time.monotonic()
+        try:
+            result = worker(item)
+        except Exception as e:  # Keep going; report it with the rest
+            result = FFmpegResult(str(item), ok=False, error=f"{type(e).__name__}: {e}")
+        metrics.event("ffmpeg_task", label=result.label, ok=result.ok,
+                      seconds=round(time.monotonic() - start, 6),
+                      queue_wait=round(start - queued_at, 6), media_seconds=round(result.media_seconds, 3))
+        return result
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(guarded, item, time.monotonic()) for item in items]
+        for future in as_completed(futures):
+            result = future.result()
+            with lock:
+                results.append(result)
+                status = "OK  " if result.ok else "FAIL"
+                detail = f"{result.elapsed:.1f}s"
+                if result.ok and result.media_seconds:
+                    detail += f", {result.media_seconds:.1f}s audio"
+                if result.ok and result.speed:
+                    detail += f", {result.speed:.0f}x"
+                if result.ok and result.note:
+                    detail += f", {result.note}"
+                print(f"  [{len(results)}/{len(items)}] {status} {result.label} ({detail})")
+    return results
+
+
+def print_summary(results: List[FFmpegResult], wall_time: float):
+    """Totals, parallel speedup and every failure with the tail of its ffmpeg log."""
+    ok = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    busy = sum(r.elapsed for r in results)
+    print()
+    print(f"Processed {len(ok)}/{len(results)} files in {wall_time:.1f}s "
+          f"({busy:.1f}s of ffmpeg time, {busy / wall_time if wall_time else 0:.1f}x parallel)")
+    if failed:
+        print()
+        print(f"Failed: {len(failed)} file(s)")
+        for r in sorted(failed, key=lambda r: r.label):
+            print(f"  {r.label}:")
+            for line in r.error.splitlines()[-5:]:
+                print(f"    {line}")
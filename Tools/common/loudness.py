@@ -0,0 +1,147 @@
+"""
+Two-pass loudness normalization for the Suno ad and bumper tools
+
+Pass one runs ffmpeg's `loudnorm` analysis (EBU R128) to measure integrated
+loudness, true peak and loudness range. Pass two applies a plain linear gain,
+clamped so the true peak stays under the ceiling; this is accurate on short
+jingles where single-pass loudnorm's dynamic mode drifts.
+
+Measurements don't depend on the target, so they are cached per input content
+hash: re-processing, or changing the target LUFS, never re-analyzes a file.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from common import metrics, profiling
+
+DEFAULT_TRUE_PEAK = -1.5  # dBTP ceiling, matches the old single-pass loudnorm TP
+CACHE_VERSION = 1
+
+
+class LoudnessError(Exception):
+    """ffmpeg couldn't measure a file."""
+
+
+@dataclass
+class LoudnessMeasurement:
+    """loudnorm's first-pass analysis of one input."""
+    input_i: float       # Integrated loudness, LUFS
+    input_tp: float      # True peak, dBTP
+    input_lra: float     # Loudness range, LU
+    input_thresh: float  # Gating threshold, LUFS
+
+    @classmethod
+    def from_loudnorm(cls, stats: Dict[str, str]) -> "LoudnessMeasurement":
+        # loudnorm reports numbers as strings, and "-inf" for digital silence
+        return cls(input_i=float(stats["input_i"]), input_tp=float(stats["input_tp"]),
+                   input_lra=float(stats["input_lra"]), input_thresh=float(stats["input_thresh"]))
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """md5 of a file's contents, read in chunks."""
+    digest = hashlib.md5()
+    with profiling.stage("hash"), open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def measure_loudness(path: Path) -> LoudnessMeasurement:
+    """Run loudnorm in analysis mode over `path` (first pass)."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", str(path),
+        "-vn",
+        "-af", "loudnorm=print_format=json",
+        "-f", "null", "-"
+    ]
+    with profiling.stage("analysis"), metrics.timed("loudness_analysis", label=path.name) as fields:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        fields["ok"] = result.returncode == 0
+    stderr = result.stderr.decode("utf-8", errors="replace")
+    if result.returncode != 0:
+        raise LoudnessError(stderr.strip() or f"ffmpeg exited with status {result.returncode}")
+
+    # The JSON block is the last {...} loudnorm prints; newer ffmpeg adds a stats line after it
+    blocks = [block for block in re.findall(r"\{[^{}]*\}", stderr) if '"input_i"' in block]
+    if not blocks:
+        raise LoudnessError(f"No loudnorm measurement in ffmpeg output for {path.name}")
+    return LoudnessMeasurement.from_loudnorm(json.loads(blocks[-1]))
+
+
+def normalization_gain(measurement: LoudnessMeasurement, target_lufs: float,
+                       true_peak: float = DEFAULT_TRUE_PEAK) -> float:
+    """Linear gain in dB that moves the input to `target_lufs` without the true peak crossing `true_peak`."""
+    if not math.isfinite(measurement.input_i):
+        return 0.0  # Silence: nothing to normalize
+    gain = target_lufs - measurement.input_i
+    if math.isfinite(measurement.input_tp):
+        gain = min(gain, true_peak - measurement.input_tp)
+    return round(gain, 2)
+
+
+def gain_filter(gain_db: float) -> str:
+    """ffmpeg audio filter applying the second-pass gain."""
+    return f"volume={gain_db:+.2f}dB"
+
+
+class LoudnessCache:
+    """Loudness measurements keyed on input content hash, stored as JSON.
+
+    Safe to share between worker threads; call save() once the batch is done.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self._entries = data.get("measurements", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def get(self, key: str) -> Optional[LoudnessMeasurement]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return LoudnessMeasurement(**entry) if entry else None
+
+    def put(self, key: str, measurement: LoudnessMeasurement):
+        with self._lock:
+            self._entries[key] = asdict(measurement)
+            self._dirty = True
+
+    def measure(self, path: Path, key: Optional[str] = None) -> LoudnessMeasurement:
+        """Cached measurement for `path`, analyzing it only on a cache miss."""
+        key = key or file_hash(path)
+        measurement = self.get(key)
+        if measurement is None:
+            measurement = measure_loudness(path)
+            self.put(key, measurement)
+        return measurement
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": CACHE_VERSION, "measurements": self._entries}
+            with profiling.stage("disk_write"):
+                fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".part")
+                # JSON float() round-trips -inf as -Infinity, which json.load accepts
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            self._dirty = False
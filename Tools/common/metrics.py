@@ -0,0 +1,267 @@
+"""
+Run metrics for the asset tools
+
+Instrumented steps (TTS requests and jobs, ffmpeg passes, file writes) call
+`event()` or wrap themselves in `timed()`. Once a tool calls `configure()`,
+every event is appended to a JSONL log and aggregated into a Prometheus
+textfile (one per tool, for node_exporter's textfile collector) written when
+the tool exits, into $KBTV_PROM_DIR if set (the collector's own directory),
+else next to the log. Until then the calls are no-ops, so library code can be
+instrumented unconditionally.
+
+Common event fields: `seconds` (latency), `chars` (characters sent),
+`bytes`, `retries`, `queue_wait` (seconds queued before starting), `ok`.
+TTS events also carry `arc`, `topic` and `speaker`.
+
+Summaries:
+    cd Tools
+    python -m common.metrics report                     # Per event kind
+    python -m common.metrics report --by topic --kind tts_job
+    python -m common.metrics report --run last
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from common.paths import TOOLS_DIR
+
+METRICS_DIR = TOOLS_DIR / ".metrics"
+EVENTS_PATH = METRICS_DIR / "events.jsonl"
+PROM_DIR_ENV = "KBTV_PROM_DIR"  # node_exporter's --collector.textfile.directory
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SUM_FIELDS = ("chars", "bytes", "retries", "queue_wait")
+
+
+class Metrics:
+    """Event sink for one tool run.
+
+    Args:
+        tool: Tool name, e.g. "generate_catalog_audio" (labels every event)
+        events_path: JSONL log appended to by every run
+        prom_path: Prometheus textfile rewritten at close
+            (default: kbtv_<tool>.prom in $KBTV_PROM_DIR, else next to events_path)
+        enabled: False makes every call a no-op
+    """
+
+    def __init__(self, tool: str, events_path: Path = EVENTS_PATH,
+                 prom_path: Optional[Path] = None, enabled: bool = True):
+        self.tool = tool
+        self.enabled = enabled
+        self.run_id = f"{tool}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.events_path = Path(events_path)
+        prom_dir = Path(os.getenv(PROM_DIR_ENV) or self.events_path.parent)
+        self.prom_path = Path(prom_path) if prom_path else prom_dir / f"kbtv_{tool}.prom"
+        self._lock = threading.Lock()
+        self._file = None
+        # kind -> aggregate counters
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._buckets: Dict[str, List[int]] = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+
+    def event(self, kind: str, **fields):
+        """Record one event; `seconds`, `ok` and SUM_FIELDS feed the Prometheus aggregates."""
+        if not self.enabled:
+            return
+        record = {"ts": round(time.time(), 3), "run": self.run_id, "tool": self.tool, "kind": kind}
+        record.update(fields)
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.events_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.events_path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line)
+
+            totals = self._totals[kind]
+            totals["count"] += 1
+            totals["errors"] += not fields.get("ok", True)
+            seconds = fields.get("seconds")
+            if seconds is not None:
+                totals["timed"] += 1
+                totals["seconds"] += seconds
+                buckets = self._buckets[kind]
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if seconds <= bound:
+                        buckets[i] += 1
+            for name in SUM_FIELDS:
+                totals[name] += fields.get(name) or 0
+
+    @contextmanager
+    def timed(self, kind: str, **fields) -> Iterator[dict]:
+        """Time a block; the yielded dict can gain fields (bytes, ...) before it's recorded."""
+        start = time.monotonic()
+        try:
+            yield fields
+        except BaseException as e:
+            fields.setdefault("ok", False)
+            fields.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            fields.setdefault("ok", True)
+            self.event(kind, seconds=round(time.monotonic() - start, 6), **fields)
+
+    def write_prometheus(self):
+        if not self.enabled or not self._totals:
+            return
+        label = f'tool="{self.tool}"'
+        lines = [
+            "# HELP kbtv_tool_events_total Instrumented operations by kind and outcome",
+            "# TYPE kbtv_tool_events_total counter",
+        ]
+        with self._lock:
+            totals = {kind: dict(values) for kind, values in self._totals.items()}
+            buckets = {kind: list(values) for kind, values in self._buckets.items()}
+        for kind, values in sorted(totals.items()):
+            ok = values["count"] - values["errors"]
+            lines.append(f'kbtv_tool_events_total{{{label},kind="{kind}",status="ok"}} {ok:g}')
+            lines.append(f'kbtv_tool_events_total{{{label},kind="{kind}",status="error"}} {values["errors"]:g}')
+        lines += ["# HELP kbtv_tool_seconds Operation latency", "# TYPE kbtv_tool_seconds histogram"]
+        for kind, counts in sorted(buckets.items()):
+            for bound, count in zip(LATENCY_BUCKETS, counts):
+                lines.append(f'kbtv_tool_seconds_bucket{{{label},kind="{kind}",le="{bound:g}"}} {count}')
+            timed_count = totals[kind]["timed"]
+            lines.append(f'kbtv_tool_seconds_bucket{{{label},kind="{kind}",le="+Inf"}} {timed_count:g}')
+            lines.append(f'kbtv_tool_seconds_sum{{{label},kind="{kind}"}} {totals[kind]["seconds"]:.6f}')
+            lines.append(f'kbtv_tool_seconds_count{{{label},kind="{kind}"}} {timed_count:g}')
+        for name in SUM_FIELDS:
+            metric = f"kbtv_tool_{name}_total"
+            lines += [f"# TYPE {metric} counter"]
+            for kind, values in sorted(totals.items()):
+                if values.get(name):
+                    lines.append(f'{metric}{{{label},kind="{kind}"}} {values[name]:g}')
+        lines += ["# TYPE kbtv_tool_last_run_timestamp_seconds gauge",
+                  f"kbtv_tool_last_run_timestamp_seconds{{{label}}} {time.time():.0f}"]
+
+        self.prom_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.prom_path.parent, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        # mkstemp creates 0600; the collector usually runs as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.prom_path)
+
+    def close(self):
+        self.write_prometheus()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_current = Metrics("", enabled=False)
+
+
+def configure(tool: str, **kwargs) -> Metrics:
+    """Start recording for this process; the textfile is written at exit."""
+    global _current
+    _current.close()
+    _current = Metrics(tool, **kwargs)
+    atexit.register(_current.close)
+    return _current
+
+
+def event(kind: str, **fields):
+    _current.event(kind, **fields)
+
+
+def timed(kind: str, **fields):
+    return _current.timed(kind, **fields)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def load_events(path: Path = EVENTS_PATH, run: Optional[str] = None) -> List[dict]:
+    """Events from the log; run="last" keeps only the most recent run."""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # A run killed mid-write leaves at most one partial line
+    if run == "last" and events:
+        run = events[-1]["run"]
+    if run:
+        events = [e for e in events if e.get("run") == run]
+    return events
+
+
+def summarize(events: List[dict], by: str = "kind") -> Dict[str, dict]:
+    """Count, errors, throughput, latency percentiles and totals per `by` value."""
+    groups: Dict[str, List[dict]] = defaultdict(list)
+    for e in events:
+        groups[str(e.get(by, "-"))].append(e)
+    summary = {}
+    for key, group in sorted(groups.items()):
+        latencies = [e["seconds"] for e in group if e.get("seconds") is not None]
+        stamps = [e["ts"] for e in group]
+        span = max(stamps) - min(stamps) + (latencies[0] if len(group) == 1 and latencies else 0)
+        # Billed characters: only what actually went to an API (not cache hits or local Piper lines)
+        billed = sum(e.get("chars") or 0 for e in group
+                     if e.get("ok", True) and e.get("source", "api") == "api" and e.get("model") != "piper")
+        summary[key] = {
+            "count": len(group),
+            "errors": sum(1 for e in group if not e.get("ok", True)),
+            "per_second": len(group) / span if span > 0 else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else 0.0,
+            "chars": sum(e.get("chars") or 0 for e in group),
+            "billed_chars": billed,
+            "bytes": sum(e.get("bytes") or 0 for e in group),
+            "retries": sum(e.get("retries") or 0 for e in group),
+            "queue_wait": sum(e.get("queue_wait") or 0 for e in group) / len(group),
+        }
+    return summary
+
+
+def print_report(summary: Dict[str, dict], by: str):
+    print(f"{by:<28}{'count':>7}{'err':>5}{'/s':>7}{'p50':>8}{'p95':>8}{'p99':>8}"
+          f"{'billed':>10}{'MB':>8}{'retry':>6}{'wait':>7}")
+    print("-" * 102)
+    for key, s in summary.items():
+        print(f"{key[:27]:<28}{s['count']:>7}{s['errors']:>5}{s['per_second']:>7.1f}"
+              f"{s['p50']:>7.2f}s{s['p95']:>7.2f}s{s['p99']:>7.2f}s"
+              f"{s['billed_chars']:>10,}{s['bytes'] / 1e6:>8.2f}{s['retries']:>6}{s['queue_wait']:>6.2f}s")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize asset tool metrics")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report = subparsers.add_parser("report", help="Throughput, tail latency and billed characters")
+    report.add_argument("--by", default="kind",
+                        help="Group by this event field: kind, arc, topic, speaker, tool, run... (default: kind)")
+    report.add_argument("--kind", help="Only events of this kind (e.g. tts_job, tts_request, ffmpeg)")
+    report.add_argument("--run", help="Only this run id, or 'last'")
+    report.add_argument("--events", type=Path, default=EVENTS_PATH, help="Event log to read")
+    args = parser.parse_args()
+
+    if not args.events.exists():
+        print(f"No metrics recorded yet ({args.events})")
+        return
+    events = load_events(args.events, args.run)
+    if args.kind:
+        events = [e for e in events if e.get("kind") == args.kind]
+    print(f"{len(events)} events from {len({e['run'] for e in events})} run(s)")
+    print()
+    print_report(summarize(events, args.by), args.by)
+
+
+if __name__ == "__main__":
+    main()
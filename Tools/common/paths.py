@@ -0,0 +1,23 @@
+"""
+Canonical repository paths used by the asset tools
+"""
+
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = TOOLS_DIR.parent
+ASSETS_DIR = REPO_ROOT / "assets"
+DIALOGUE_DIR = ASSETS_DIR / "dialogue"
+ARCS_DIR = DIALOGUE_DIR / "arcs"
+VERN_DIALOGUE_DIR = DIALOGUE_DIR / "vern"
+AUDIO_DIR = ASSETS_DIR / "audio"
+VOICE_DIR = AUDIO_DIR / "voice"
+VOICE_PATH_MAP = DIALOGUE_DIR / "voice_paths.json"
+
+# Processed Suno ads and bumpers (generate_ads.py / generate_bumpers.py process)
+GAME_AUDIO_DIR = REPO_ROOT / "kbtv" / "Assets" / "Audio"
+AD_AUDIO_DIR = GAME_AUDIO_DIR / "Ads"
+BUMPER_AUDIO_DIR = GAME_AUDIO_DIR / "Bumpers"
+
+# Header-derived duration table for the runtime (AudioAnalysis/index_durations.py)
+AUDIO_DURATIONS = AUDIO_DIR / "audio_durations.json"
@@ -0,0 +1,133 @@
+"""
+The `process` command shared by the Suno ad and bumper tools
+
+Turns downloaded Suno takes into normalized OGGs in the game's asset folders:
+
+- loudness: each input's (cached) loudnorm measurement gives a linear gain
+  to the target LUFS, clamped under the true-peak ceiling (common.loudness)
+- incremental: outputs already built from the same input bytes with the same
+  encode settings are skipped (common.build_manifest)
+- parallel: files are encoded on a pool of ffmpeg workers (common.ffmpeg)
+
+Each tool supplies the (input, output) pairs and an `encode` function that
+writes one output with a given gain; everything else happens here.
+"""
+
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from common.build_manifest import BuildManifest
+from common.ffmpeg import (FFmpegResult, check_ffmpeg, default_jobs, print_install_hint,
+                           print_summary, run_parallel)
+from common.loudness import DEFAULT_TRUE_PEAK, LoudnessCache, LoudnessError, normalization_gain
+
+# encode(input_path, output_path, gain_db, label) -> FFmpegResult
+Encoder = Callable[[Path, Path, float, str], FFmpegResult]
+
+
+def encode_settings(sample_rate: int, channels: int, quality: int, lufs: float,
+                    true_peak: float = DEFAULT_TRUE_PEAK, format: str = "ogg") -> dict:
+    """Anything that changes the encoded audio; outputs built with other values are rebuilt."""
+    return {
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "format": format,
+        "quality": quality,
+        "lufs": lufs,
+        "true_peak": true_peak,
+    }
+
+
+def add_arguments(parser):
+    """Add -j/--jobs and --rebuild to a `process` subparser."""
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help=f"Parallel ffmpeg workers (default: CPU count, {default_jobs()})")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Re-encode every file, even outputs that are up to date")
+
+
+def split_take_name(stem: str) -> Optional[Tuple[str, str]]:
+    """`big_earls_auto_v2` -> ("big_earls_auto", "2"); None without a `_v{n}` suffix."""
+    parts = stem.rsplit("_v", 1)
+    return (parts[0], parts[1]) if len(parts) == 2 else None
+
+
+def normalize_file(input_path: Path, output_path: Path, encode: Encoder, loudness: LoudnessCache,
+                   settings: dict, input_hash: Optional[str] = None) -> FFmpegResult:
+    """Measure one input, encode it with the gain to settings["lufs"], and report the gain.
+
+    A failed output is deleted so it can't pass for a finished one.
+    """
+    label = f"{input_path.name} -> {output_path.parent.name}/{output_path.name}"
+    try:
+        measurement = loudness.measure(input_path, input_hash)
+    except LoudnessError as e:
+        return FFmpegResult(label, ok=False, error=f"Loudness analysis failed: {e}")
+    gain_db = normalization_gain(measurement, settings["lufs"], settings["true_peak"])
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    result = encode(input_path, output_path, gain_db, label)
+    result.note = f"{measurement.input_i:.1f} LUFS, gain {gain_db:+.1f} dB"
+    if not result.ok and output_path.exists():
+        output_path.unlink()
+    return result
+
+
+def process_downloads(tasks: List[Tuple[Path, Path]], encode: Encoder, settings: dict,
+                      output_root: Path, manifest_path: Path, loudness_cache_path: Path,
+                      input_names: Iterable[str], downloads_dir: Path,
+                      jobs: Optional[int] = None, rebuild: bool = False) -> List[FFmpegResult]:
+    """Build every out-of-date (input, output) pair on a pool of ffmpeg workers.
+
+    Args:
+        tasks: (downloaded file, output OGG) pairs
+        encode: Writes one output; see normalize_file
+        settings: encode_settings() for this tool
+        output_root: Outputs are recorded in the manifest relative to this
+        manifest_path: The tool's .build_manifest.json
+        loudness_cache_path: The tool's .loudness_cache.json
+        input_names: Every file name in downloads/, to report stale outputs
+        downloads_dir: Shown in the stale-output report
+        jobs: ffmpeg workers (default: CPU count)
+        rebuild: Re-encode outputs that are up to date
+    """
+    if not check_ffmpeg():
+        print_install_hint()
+        return []
+
+    manifest = BuildManifest(manifest_path, output_root)
+    pending, up_to_date = manifest.plan(tasks, settings, rebuild)
+    jobs = jobs or default_jobs()
+    print(f"Processing {len(pending)} files ({jobs} workers), {up_to_date} up to date")
+    loudness = LoudnessCache(loudness_cache_path)
+
+    def build(task) -> FFmpegResult:
+        input_path, output_path, input_hash = task
+        result = normalize_file(input_path, output_path, encode, loudness, settings, input_hash)
+        if result.ok:
+            manifest.record(output_path, input_path, input_hash, settings)
+        return result
+
+    start = time.monotonic()
+    try:
+        results = run_parallel(pending, build, jobs)
+    finally:
+        loudness.save()
+        manifest.save()
+    if results:
+        print_summary(results, time.monotonic() - start)
+
+    stale = manifest.stale_outputs(input_names)
+    if stale:
+        print()
+        print(f"Stale outputs (input no longer in {Path(downloads_dir).name}/):")
+        for output, input_name in stale:
+            print(f"  {output} (from {input_name})")
+
+    if any(r.ok for r in results):
+        print()
+        print("Next steps:")
+        print("  1. Open Godot")
+        print("  2. Import the generated audio files")
+    return results
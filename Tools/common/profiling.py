@@ -0,0 +1,255 @@
+"""
+--profile support for the asset tools
+
+Code marks its expensive steps with `stage()`:
+
+    with profiling.stage("transcode"):
+        run_ffmpeg(...)
+
+Stages used across the tools: json_load, text_prep, network (TTS API),
+synthesis (local TTS), transcode (ffmpeg), analysis (loudness), hash and
+disk_write. Stages nest; time spent in an inner stage is not counted again
+for the outer one. Until a tool calls `configure()` with profiling enabled,
+`stage()` costs one attribute check.
+
+At exit a profiled run prints a breakdown table. Per stage, `busy` is the
+time summed over all threads and `wall` is how much of the run had at least
+one thread in that stage. A stage whose wall share approaches 100% is what
+the batch is bound by.
+
+`--profile-out` also captures where the time went inside Python:
+    run.prof                  cProfile stats from every thread (snakeviz, pstats);
+                              on Python 3.12+ sampled stacks are written to run.collapsed
+    run.collapsed / .folded   sampled stacks for flamegraph.pl or speedscope
+"""
+
+import atexit
+import cProfile
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples for collapsed-stack output
+
+
+def add_arguments(parser):
+    """Add --profile and --profile-out to an argparse parser."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each stage (JSON load, text prep, network, transcode, disk write) "
+                             "and print a breakdown at exit")
+    parser.add_argument("--profile-out", type=Path, metavar="FILE",
+                        help="Also profile Python code (implies --profile): FILE.prof for cProfile, "
+                             "FILE.collapsed/.folded for flamegraph stacks")
+
+
+class Profiler:
+    """Stage timers (and optionally cProfile or a stack sampler) for one run.
+
+    Args:
+        tool: Tool name shown in the report
+        output: .prof file for cProfile, or any other suffix for collapsed stacks
+    """
+
+    def __init__(self, tool: str, output: Optional[Path] = None):
+        self.tool = tool
+        self.output = Path(output) if output else None
+        self.enabled = True
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # (stage, start, end) for every uninterrupted stretch spent in a stage
+        self._segments: List[Tuple[str, float, float]] = []
+        self._calls: Counter = Counter()
+        self._max: Dict[str, float] = defaultdict(float)
+        self._profiles: List[cProfile.Profile] = []
+        self._stacks: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        if self.output is None:
+            return
+        if self.output.suffix == ".prof" and sys.version_info >= (3, 12):
+            # cProfile runs on sys.monitoring there: only one profiler can be active, and it
+            # folds every thread into one call stack, so per-thread profiles aren't possible
+            self.output = self.output.with_suffix(".collapsed")
+            print(f"cProfile can't profile threads separately on Python 3.12+; "
+                  f"writing sampled stacks to {self.output} instead")
+        if self.output.suffix == ".prof":
+            # cProfile only sees the thread it is enabled on; give every new thread its own
+            threading.setprofile(self._profile_thread)
+            self._profile_thread()
+        else:
+            self._sampler = threading.Thread(target=self._sample, name="profiling-sampler", daemon=True)
+            self._sampler.start()
+
+    def _profile_thread(self, *_args):
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()  # Replaces the threading.setprofile hook for this thread
+
+    def _sample(self):
+        names = {}
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            for thread in threading.enumerate():
+                # Pool workers share one flame: "ThreadPoolExecutor-0_3" -> "ThreadPoolExecutor-0"
+                names[thread.ident] = re.sub(r"_\d+$", "", thread.name)
+            for ident, frame in sys._current_frames().items():
+                if ident == threading.get_ident():
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self._stacks[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        now = time.monotonic()
+        if stack:
+            self._close_segment(stack[-1], now)
+        # [name, start of the current stretch, self time so far]
+        entry = [name, now, 0.0]
+        stack.append(entry)
+        try:
+            yield
+        finally:
+            now = time.monotonic()
+            self._close_segment(entry, now)
+            stack.pop()
+            if stack:
+                stack[-1][1] = now
+            with self._lock:
+                self._calls[name] += 1
+                self._max[name] = max(self._max[name], entry[2])
+
+    def _close_segment(self, entry: list, now: float):
+        entry[2] += now - entry[1]
+        with self._lock:
+            self._segments.append((entry[0], entry[1], now))
+
+    def summary(self) -> Tuple[float, Dict[str, dict], float]:
+        """(run seconds, per-stage stats, seconds no thread was in any stage)."""
+        wall = time.monotonic() - self._start
+        with self._lock:
+            segments = list(self._segments)
+        by_stage: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+        for name, start, end in segments:
+            by_stage[name].append((start, end))
+        stages = {}
+        for name, spans in by_stage.items():
+            busy = sum(end - start for start, end in spans)
+            stages[name] = {
+                "calls": self._calls[name],
+                "busy": busy,
+                "wall": covered_seconds(spans),
+                "avg": busy / self._calls[name] if self._calls[name] else 0.0,
+                "max": self._max[name],
+            }
+        outside = max(0.0, wall - covered_seconds([(start, end) for _, start, end in segments]))
+        return wall, stages, outside
+
+    def print_report(self):
+        wall, stages, outside = self.summary()
+        print()
+        print(f"Profile: {self.tool}, {wall:.2f}s wall")
+        print(f"  {'stage':<18}{'calls':>7}{'busy':>10}{'wall':>10}{'% run':>8}{'avg':>10}{'max':>10}")
+        print("  " + "-" * 71)
+        ranked = sorted(stages.items(), key=lambda item: item[1]["wall"], reverse=True)
+        for name, s in ranked:
+            print(f"  {name:<18}{s['calls']:>7}{s['busy']:>9.2f}s{s['wall']:>9.2f}s"
+                  f"{100 * s['wall'] / wall if wall else 0:>7.1f}%"
+                  f"{1000 * s['avg']:>8.1f}ms{1000 * s['max']:>8.1f}ms")
+        print(f"  {'(no stage)':<18}{'':>7}{'':>10}{outside:>9.2f}s{100 * outside / wall if wall else 0:>7.1f}%")
+        if ranked and ranked[0][1]["wall"] >= outside:
+            name, s = ranked[0]
+            print(f"  Bound by: {name} ({100 * s['wall'] / wall if wall else 0:.0f}% of the run)")
+        elif ranked:
+            print("  Most of the run is outside the timed stages; see --profile-out")
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+        elif self.output is not None:
+            threading.setprofile(None)
+            for profile in self._profiles:
+                profile.disable()
+        self.print_report()
+        if self.output is None:
+            return
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        if self._sampler is not None:
+            with open(self.output, "w", encoding="utf-8") as f:
+                for stack, count in sorted(self._stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            print(f"  Collapsed stacks ({sum(self._stacks.values())} samples): {self.output}")
+        else:
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(str(self.output))
+            print(f"  cProfile stats ({len(self._profiles)} threads): {self.output}")
+
+
+def covered_seconds(spans: List[Tuple[float, float]]) -> float:
+    """Length of the union of (start, end) intervals."""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(spans):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+class _Disabled:
+    enabled = False
+
+    def close(self):
+        pass
+
+
+_current = _Disabled()
+
+
+def configure(tool: str, enabled: bool = False, output: Optional[Path] = None):
+    """Start profiling this process if --profile/--profile-out was given; reports at exit."""
+    global _current
+    if not (enabled or output):
+        return _current
+    _current.close()
+    _current = Profiler(tool, output)
+    atexit.register(_current.close)
+    return _current
+
+
+@contextmanager
+def _noop() -> Iterator[None]:
+    yield
+
+
+def stage(name: str):
+    """Context manager timing a block as `name`."""
+    if not _current.enabled:
+        return _noop()
+    return _current.stage(name)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Header-only durations (common.audio_headers) against ffprobe
+
+Encodes a short tone in each format the parser handles and checks
+read_header reports the same length as ffprobe (for gapless MP3s, as many
+samples as ffmpeg decodes, since ffprobe's container duration still counts the
+encoder delay and padding the LAME tag says to drop). Needs ffmpeg and ffprobe on
+PATH; those tests are skipped without them.
+
+    python -m pytest Tools/common/test_audio_headers.py
+"""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from common.audio_headers import read_header
+from common.ffmpeg import probe_duration
+from common.paths import AUDIO_DIR
+
+TONE_SECONDS = 3.0
+TOLERANCE = 0.03    # A little over one MP3 frame
+SILENCE_WAV = AUDIO_DIR / "silence_4sec.wav"
+
+needs_ffmpeg = pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+                                  reason="ffmpeg/ffprobe not installed")
+
+# name -> (file name, ffmpeg output options, expected method)
+CASES = {
+    "wav": ("tone.wav", ["-ar", "44100", "-c:a", "pcm_s16le"], "wav"),
+    "mp3 cbr": ("cbr.mp3", ["-ar", "44100", "-c:a", "libmp3lame", "-b:a", "128k",
+                            "-write_xing", "0"], "cbr"),
+    "mp3 xing/lame": ("vbr.mp3", ["-ar", "44100", "-c:a", "libmp3lame", "-q:a", "4"], "lame"),
+    "mp3 mpeg-2": ("mpeg2.mp3", ["-ar", "22050", "-c:a", "libmp3lame", "-q:a", "4"], "lame"),
+    "mp3 mpeg-2 cbr": ("mpeg2_cbr.mp3", ["-ar", "16000", "-c:a", "libmp3lame", "-b:a", "32k",
+                                         "-write_xing", "0"], "cbr"),
+    "vorbis": ("tone.ogg", ["-ar", "44100", "-c:a", "libvorbis", "-q:a", "4"], "granule"),
+    "opus": ("opus.ogg", ["-ar", "48000", "-c:a", "libopus", "-b:a", "64k"], "granule"),
+}
+
+
+def decoded_duration(path: Path, sample_rate: int) -> float:
+    """Seconds of mono 16-bit PCM ffmpeg decodes from `path`"""
+    pcm = subprocess.run(["ffmpeg", "-v", "error", "-i", str(path), "-f", "s16le", "-ac", "1", "-"],
+                         stdout=subprocess.PIPE, check=True).stdout
+    return len(pcm) / 2 / sample_rate
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("case", CASES)
+def test_duration_matches_ffprobe(case: str, tmp_path: Path):
+    name, options, method = CASES[case]
+    path = tmp_path / name
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", f"sine=frequency=440:duration={TONE_SECONDS}",
+                    "-ac", "1"] + options + [str(path)], check=True)
+    header = read_header(path)
+    assert header.method == method
+    if method == "lame":
+        expected = decoded_duration(path, header.sample_rate)
+    else:
+        expected = probe_duration(path)
+    assert header.duration == pytest.approx(expected, abs=TOLERANCE)
+
+
+def test_wav_length_comes_from_block_align():
+    # silence_4sec.wav declares byte_rate 44100 for 16-bit mono 44.1 kHz audio
+    header = read_header(SILENCE_WAV)
+    assert (header.sample_rate, header.channels) == (44100, 1)
+    assert header.duration == pytest.approx(33792 / 44100)
+    assert header.bitrate == 706
+
+
+@needs_ffmpeg
+def test_inconsistent_wav_matches_ffprobe():
+    assert read_header(SILENCE_WAV).duration == pytest.approx(probe_duration(SILENCE_WAV), abs=0.001)
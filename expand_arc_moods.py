@@ -2,15 +2,38 @@
 """
 Script to expand conversation arc JSON files from 7 to 12 mood variants.
 Adds 5 new moods: exhausted, depressed, angry, frustrated, obsessive, manic.
+
+Incremental: only the moods a Vern group is missing are added (derived from
+its neutral line), and a file is rewritten only when its content changes,
+keeping its key order, indentation and trailing newline. Works on both the
+`arcLines` speaker-group layout and the flat `lines` layout.
+
+Usage:
+    python expand_arc_moods.py                       # Expand in place
+    python expand_arc_moods.py --dry-run             # Show what would change
+    python expand_arc_moods.py --dry-run --profile   # ...with a per-stage timing breakdown
+    python expand_arc_moods.py --changes new_moods.json
+        # ...then synthesize just those lines:
+        # python Tools/AudioGeneration/generate_catalog_audio.py --lines-from new_moods.json
 """
 
 import json
 import os
+import re
+import sys
 import glob
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, 'Tools'))
+from common import profiling
+
+ARCS_DIR = os.path.join(SCRIPT_DIR, 'assets', 'dialogue', 'arcs')
+
 # New moods to add
 NEW_MOODS = ['exhausted', 'depressed', 'angry', 'frustrated', 'obsessive', 'manic']
 
+VERN_ID = re.compile(r'^(?P<prefix>.+)_vern_(?P<mood>[a-z]+)_(?P<n>\d+)$')
+
 # Template modifications for each new mood
 MOOD_TEMPLATES = {
     'exhausted': {
@@ -45,93 +68,183 @@ MOOD_TEMPLATES = {
     }
 }
 
-def expand_vern_lines(vern_lines, arc_id):
-    """Expand Vern lines from 7 to 12 mood variants."""
-    if len(vern_lines) != 7:
-        print(f"Warning: Expected 7 mood variants, got {len(vern_lines)}")
-        return vern_lines
+def mood_text(text, mood):
+    """Derive a new mood's text from the neutral line's text."""
+    if mood == 'exhausted':
+        return f"*yawn* {text.lower()}"
+    if mood == 'depressed':
+        return text.replace('?', '...').replace('!', '.')
+    if mood == 'angry':
+        return text.upper().replace('?', '?!').replace('.', '!')
+    if mood == 'frustrated':
+        return f"Ugh, {text.lower()}"
+    if mood == 'obsessive':
+        return f"{text} You know what this means?"
+    if mood == 'manic':
+        return f"{text.upper()}!!!"
+    return text
+
+def missing_moods(vern_lines):
+    """New moods this group of Vern variants doesn't have yet."""
+    existing = {line.get('mood') for line in vern_lines}
+    return [mood for mood in NEW_MOODS if mood not in existing]
+
+def new_mood_line(base_line, mood):
+    """Copy of base_line for mood; keeps the base line's key order."""
+    new_line = base_line.copy()
+
+    # Update ID: swap the mood segment of {arc}_vern_{mood}_{n}
+    match = VERN_ID.match(base_line['id'])
+    if match:
+        new_line['id'] = f"{match.group('prefix')}_vern_{mood}_{match.group('n')}"
+    else:
+        new_line['id'] = base_line['id'].replace('_neutral_', f'_{mood}_')
+
+    # Update mood
+    new_line['mood'] = mood
 
-    # Map existing moods to their indices
-    existing_moods = [line['mood'] for line in vern_lines]
+    # Modify text based on mood template
+    new_line['text'] = mood_text(base_line['text'], mood)
+    if 'voiceText' in base_line:
+        new_line['voiceText'] = mood_text(base_line['voiceText'], mood)
+    return new_line
+
+def expand_vern_lines(vern_lines, arc_id):
+    """Return (expanded lines, added lines) with only the missing moods added."""
+    moods = missing_moods(vern_lines)
+    if not moods or not vern_lines:
+        return vern_lines, []
 
     # Find neutral variant as base for new moods
-    neutral_idx = existing_moods.index('neutral') if 'neutral' in existing_moods else 0
-    base_line = vern_lines[neutral_idx]
-
-    expanded_lines = list(vern_lines)  # Copy existing
-
-    for mood in NEW_MOODS:
-        new_line = base_line.copy()
-
-        # Update ID
-        new_line['id'] = new_line['id'].replace('_neutral_', f'_{mood}_')
-
-        # Update mood
-        new_line['mood'] = mood
-
-        # Modify text based on mood template
-        template = MOOD_TEMPLATES[mood]
-        if mood == 'exhausted':
-            new_line['text'] = f"*yawn* {base_line['text'].lower()}"
-            new_line['voiceText'] = f"*yawn* {base_line['voiceText'].lower()}"
-        elif mood == 'depressed':
-            new_line['text'] = base_line['text'].replace('?', '...').replace('!', '.')
-            new_line['voiceText'] = base_line['voiceText'].replace('?', '...').replace('!', '.')
-        elif mood == 'angry':
-            new_line['text'] = base_line['text'].upper().replace('?', '?!').replace('.', '!')
-            new_line['voiceText'] = base_line['voiceText'].upper().replace('?', '?!').replace('.', '!')
-        elif mood == 'frustrated':
-            new_line['text'] = f"Ugh, {base_line['text'].lower()}"
-            new_line['voiceText'] = f"Ugh, {base_line['voiceText'].lower()}"
-        elif mood == 'obsessive':
-            new_line['text'] = f"{base_line['text']} You know what this means?"
-            new_line['voiceText'] = f"{base_line['voiceText']} You know what this means?"
-        elif mood == 'manic':
-            new_line['text'] = f"{base_line['text'].upper()}!!!"
-            new_line['voiceText'] = f"{base_line['voiceText'].upper()}!!!"
-
-        expanded_lines.append(new_line)
-
-    return expanded_lines
-
-def process_arc_file(filepath):
-    """Process a single arc JSON file."""
-    print(f"Processing {filepath}")
-
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    modified = False
-
-    for arc_line in data.get('arcLines', []):
-        if arc_line.get('speaker') == 'vern':
-            current_lines = arc_line.get('lines', [])
-            if len(current_lines) == 7:  # Only expand if exactly 7 variants
-                arc_line['lines'] = expand_vern_lines(current_lines, data.get('arcId', 'unknown'))
-                modified = True
-
-    if modified:
-        # Write back to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"  [EXPANDED] {filepath}")
+    existing_moods = [line.get('mood') for line in vern_lines]
+    if 'neutral' in existing_moods:
+        base_line = vern_lines[existing_moods.index('neutral')]
     else:
-        print(f"  [SKIPPED] No changes needed for {filepath}")
+        print(f"Warning: {arc_id} has a Vern group without a neutral line, using {vern_lines[0]['id']}")
+        base_line = vern_lines[0]
+
+    added = [new_mood_line(base_line, mood) for mood in moods]
+    return list(vern_lines) + added, added
+
+def expand_flat_lines(lines, arc_id):
+    """Flat `lines` layout: Vern variants of one step share the `_{n}` id suffix."""
+    groups = {}
+    for index, line in enumerate(lines):
+        match = VERN_ID.match(line.get('id', ''))
+        if line.get('speaker') == 'vern' and match:
+            groups.setdefault(match.group('n'), []).append(index)
+
+    inserts = {}  # index of the group's last line -> new lines to place after it
+    added = []
+    for indices in groups.values():
+        _expanded, new_lines = expand_vern_lines([lines[i] for i in indices], arc_id)
+        if new_lines:
+            inserts[indices[-1]] = new_lines
+            added.extend(new_lines)
+
+    if not added:
+        return lines, []
+    result = []
+    for index, line in enumerate(lines):
+        result.append(line)
+        result.extend(inserts.get(index, []))
+    return result, added
+
+def detect_format(raw):
+    """json.dump options that reproduce the file's current formatting."""
+    indent = 2
+    for line in raw.splitlines()[1:]:
+        stripped = line.lstrip(' \t')
+        if stripped and stripped != line:
+            whitespace = line[:len(line) - len(stripped)]
+            indent = '\t' if whitespace.startswith('\t') else len(whitespace)
+            break
+    return {
+        'indent': indent,
+        'ensure_ascii': raw.isascii() and '\\u' in raw,
+        'trailing_newline': raw.endswith('\n')
+    }
+
+def serialize(data, fmt):
+    text = json.dumps(data, indent=fmt['indent'], ensure_ascii=fmt['ensure_ascii'])
+    return text + '\n' if fmt['trailing_newline'] else text
+
+def process_arc_file(filepath, dry_run=False):
+    """Expand a single arc JSON file; returns the lines it added (or would add)."""
+    with profiling.stage('json_load'):
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            raw = f.read()
+        data = json.loads(raw)
+    arc_id = data.get('arcId', 'unknown')
+
+    added = []
+    with profiling.stage('text_prep'):
+        for arc_line in data.get('arcLines', []):
+            if arc_line.get('speaker') == 'vern':
+                arc_line['lines'], new_lines = expand_vern_lines(arc_line.get('lines', []), arc_id)
+                added.extend(new_lines)
+        if 'lines' in data:
+            data['lines'], new_lines = expand_flat_lines(data['lines'], arc_id)
+            added.extend(new_lines)
+
+        updated = serialize(data, detect_format(raw))
+        if '\r\n' in raw:
+            updated = updated.replace('\n', '\r\n')
+    if not added or updated == raw:
+        return []
+
+    rel = os.path.relpath(filepath, SCRIPT_DIR).replace(os.sep, '/')
+    print(f"  [{'WOULD EXPAND' if dry_run else 'EXPANDED'}] {rel}: +{len(added)} lines")
+    if not dry_run:
+        with profiling.stage('disk_write'), open(filepath, 'w', encoding='utf-8', newline='') as f:
+            f.write(updated)
+
+    return [{
+        'id': line['id'],
+        'mood': line['mood'],
+        'arcId': arc_id,
+        'topic': data.get('topic', ''),
+        'file': rel
+    } for line in added]
+
+def write_changes(path, changes, dry_run):
+    """Change list for the audio generators (generate_catalog_audio.py --lines-from)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'dryRun': dry_run, 'lines': changes}, f, indent=2)
+        f.write('\n')
+    print(f"Change list: {len(changes)} lines -> {path}")
 
 def main():
     """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Add missing mood variants to conversation arc Vern lines')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    parser.add_argument('--changes', help='Write the added line ids to this JSON file')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure('expand_arc_moods', args.profile, args.profile_out)
+
     # Find all arc JSON files
-    arc_files = glob.glob('assets/dialogue/arcs/**/*.json')
+    arc_files = sorted(glob.glob(os.path.join(ARCS_DIR, '**', '*.json'), recursive=True))
 
     print(f"Found {len(arc_files)} arc files to process")
 
+    changes = []
+    errors = 0
     for filepath in arc_files:
         try:
-            process_arc_file(filepath)
-        except Exception as e:
+            changes.extend(process_arc_file(filepath, args.dry_run))
+        except (OSError, ValueError, KeyError) as e:
             print(f"Error processing {filepath}: {e}")
+            errors += 1
 
-    print("Done!")
+    files = len({change['file'] for change in changes})
+    verb = 'would add' if args.dry_run else 'added'
+    print(f"Done! {verb} {len(changes)} lines in {files} files ({len(arc_files) - files} unchanged)")
+    if args.changes:
+        write_changes(args.changes, changes, args.dry_run)
+    return 1 if errors else 0
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    raise SystemExit(main())